@@ -0,0 +1,45 @@
+# app.py
+"""
+The whole backend API as one Flask app: /data, /search, /graph and /related
+(server.py), /publications and /summarize (article_summary.py), and /metrics.
+
+    python app.py                                   # development, port 5000
+    gunicorn -c gunicorn.conf.py wsgi:app           # production
+
+Importing this module and calling create_app() is cheap: pandas,
+BeautifulSoup, numpy/scipy and google.generativeai are imported, and the
+indexes built, by the first request that needs them. GOOGLE_API_KEY is only
+required once a summary actually has to be generated.
+"""
+from flask import Flask
+from flask_cors import CORS
+
+import article_summary
+import server
+from metrics import instrument
+from workers import FlightPool
+
+
+def create_app(config=None):
+    """
+    Builds the app. `config` overrides app.config, e.g. SUMMARY_WORKERS,
+    SUMMARY_QUEUE or TITLE_INDEX_REFRESH=False to skip the
+    background CSV refresh.
+    """
+    app = Flask(__name__)
+    app.config.update(
+        SUMMARY_WORKERS=article_summary.SUMMARY_WORKERS,
+        SUMMARY_QUEUE=article_summary.SUMMARY_QUEUE,
+        TITLE_INDEX_REFRESH=True,
+    )
+    app.config.update(config or {})
+    CORS(app)
+    app.register_blueprint(server.bp)
+    app.register_blueprint(article_summary.bp)
+    app.extensions["summaries"] = FlightPool("summarize", app.config["SUMMARY_WORKERS"], app.config["SUMMARY_QUEUE"])
+    instrument(app)
+    return app
+
+
+if __name__ == "__main__":
+    create_app().run(debug=True, port=5000)
@@ -1,92 +1,166 @@
-import google.generativeai as genai
-from flask import Flask, request, jsonify
-from flask_cors import CORS
-from scraper import scrape_article
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from summary_cache import cache_key, default_cache, url_key
+from metrics import log, timed
+from workers import Busy, once
 import json
-import pandas as pd
-import requests
-from bs4 import BeautifulSoup
-from dotenv import load_dotenv
 import os
-from io import StringIO
 
-load_dotenv()
-api_key = os.getenv("GOOGLE_API_KEY")
-if not api_key:
-    raise ValueError("[ERROR] Missing GOOGLE_API_KEY in environment or .env file.")
-genai.configure(api_key=api_key)
+# Served by app.create_app() together with the routes in server.py.
+bp = Blueprint("summaries", __name__)
 
-app = Flask(__name__)
-CORS(app)
+PUBLICATIONS_PATH = os.path.join(os.path.dirname(__file__), "publications.json")
 
-file_path = './publications.json'
-with open(file_path, 'r') as f:
-    data = json.load(f)
+SUMMARY_MODEL = "gemini-2.5-flash-lite"
+SUMMARY_PROMPT_VERSION = "summarize-v1"
+# Scrape + Gemini jobs run on a pool of SUMMARY_WORKERS threads, at most
+# SUMMARY_QUEUE at a time; a JSON request waits for its job to finish, as it
+# always has, and a streaming one follows its events.
+SUMMARY_WORKERS = int(os.getenv("SUMMARY_WORKERS", "8"))
+SUMMARY_QUEUE = int(os.getenv("SUMMARY_QUEUE", "64"))
+RETRY_AFTER = 5
 
-@app.route("/publications")
+
+@once
+def publications():
+    with open(PUBLICATIONS_PATH, 'r') as f:
+        return json.load(f)
+
+
+@once
+def title_index():
+    from csv_index import TitleIndex
+
+    index = TitleIndex()
+    if current_app.config.get("TITLE_INDEX_REFRESH", True):
+        index.start_background_refresh()
+    return index
+
+
+@bp.route("/publications")
 def members():
-    return data
+    return publications()
+
+
+def wants_stream():
+    """Streaming is opt-in: ?stream=1, or an Accept header that prefers text/event-stream."""
+    if request.args.get("stream", "").lower() in ("1", "true", "yes"):
+        return True
+    return request.accept_mimetypes.best_match(["application/json", "text/event-stream"]) == "text/event-stream"
+
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
-CSV_URL = "https://raw.githubusercontent.com/jgalazka/SB_publications/main/SB_publication_PMC.csv"
 
-@app.route("/summarize", methods=["POST"])
+def summary_prompt(content):
+    return f"Summarize the following text:\n\nc{content}"
+
+
+def summary_events(url):
+    """
+    Yields (event, data) pairs while summarizing the article at `url`:
+    progress updates, the summary text in chunks as Gemini produces it, then
+    done (or error). A summary cached for this URL is replayed straight away
+    without scraping the page again.
+    """
+    from llm_client import get_client
+    from scraper import scrape_article
+
+    by_url = url_key(SUMMARY_MODEL, SUMMARY_PROMPT_VERSION, url)
+    cached = default_cache.get(by_url)
+    if cached:
+        yield "chunk", {"text": cached}
+        yield "done", {"summary": cached, "cached": True}
+        return
+
+    yield "progress", {"stage": "scraping", "url": url}
+    content = scrape_article(url)
+    if not content:
+        yield "error", {"error": f"Could not scrape article at {url}", "status": 502}
+        return
+
+    by_content = cache_key(SUMMARY_MODEL, SUMMARY_PROMPT_VERSION, content)
+    cached = default_cache.get(by_content)
+    if cached:
+        default_cache.set(by_url, cached)
+        yield "chunk", {"text": cached}
+        yield "done", {"summary": cached, "cached": True}
+        return
+
+    yield "progress", {"stage": "summarizing", "chars": len(content)}
+    parts = []
+    for text in get_client().stream(SUMMARY_MODEL, summary_prompt(content)):
+        parts.append(text)
+        yield "chunk", {"text": text}
+    summary = "".join(parts)
+    if summary:
+        default_cache.set(by_content, summary)
+        default_cache.set(by_url, summary)
+    yield "done", {"summary": summary, "cached": False}
+
+
+def stream_summary(url, events):
+    def generate():
+        yield sse("progress", {"stage": "found", "url": url})
+        for event, data in events:
+            yield sse(event, data)
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return Response(stream_with_context(generate()), mimetype="text/event-stream", headers=headers)
+
+
+@bp.route("/summarize", methods=["POST"])
 def summary():
+    """
+    Summarizes a publication by title. The scrape and the Gemini call run on
+    the app's summary pool, and concurrent requests for the same article share
+    one job. JSON clients get the summary once the job finishes; answers 503
+    with Retry-After when the pool is full.
+    """
     data = request.get_json()
 
     if not data or 'title' not in data:
         return jsonify({'error': 'No title provided'}), 400
     article_title = data['title'].strip()
-    print(f"Recieved article title: {article_title}")
-
-    try:
-        response = requests.get(CSV_URL, timeout=10)
-        response.raise_for_status() # Raises an exception for bad status codes (4xx or 5xx)
-        # Use StringIO to read the response text as a file
-        df = pd.read_csv(StringIO(response.text))
-        print(f"Successfully loaded CSV with columns: {df.columns.tolist()}")
-
-    except requests.exceptions.RequestException as e:
-        error_msg = f"Failed to fetch CSV from URL: {e}"
-        print(f"ERROR: {error_msg}")
-        return jsonify({'error': error_msg}), 500
-    
-    print(article_title)
-    print(df['Title'][0])
-
-    for i in range(len(df['Title'])):
-        test = df['Title'][i].lower()
-        print(test)
-        if (test == article_title.lower()):
-            print('found')
-            break
-    
-    # 3. CORRECT MATCHING LOGIC using Pandas filtering
-    # Find all rows where the 'Title' column exactly matches the requested article_title
-    matching_rows = df[df['Title'].str.lower() == article_title.lower()]
-    print(matching_rows)
-
-    if matching_rows.empty:
-        print(f"ERROR: Article '{article_title}' URL not found in CSV.")
+    log("DEBUG", "Received article title: %s", article_title)
+
+    # O(1) lookup in the index loaded on first use instead of downloading and
+    # scanning the whole CSV on every request.
+    with timed("csv_lookup"):
+        url = title_index().lookup(article_title)
+    if not url:
+        log("WARN", "Article '%s' URL not found in CSV.", article_title)
         return jsonify({'error': f"Article '{article_title}' URL not found in CSV."}), 404
 
-    # Extract the 'Link' (URL) from the first matching row
-    url = matching_rows['Link'].iloc[0].strip()
+    log("DEBUG", "Found URL: %s", url)
+    stream = wants_stream()
 
-    print(f"Found URL: {url}")
-    
-    content = scrape_article(url)
+    # Cached summaries are answered here, without queueing behind slow jobs.
+    cached = default_cache.get(url_key(SUMMARY_MODEL, SUMMARY_PROMPT_VERSION, url))
+    if cached:
+        if stream:
+            return stream_summary(url, [("chunk", {"text": cached}), ("done", {"summary": cached, "cached": True})])
+        return jsonify({"summary": cached})
 
-    print("sending prompt")
-    prompt = f"Summarize the following text:\n\nc{content}"
+    try:
+        flight = current_app.extensions["summaries"].submit(url, lambda: summary_events(url))
+    except Busy as e:
+        log("WARN", "Rejected summary for %s: %s", url, e)
+        return jsonify({'error': "Too many summaries in progress, try again shortly."}), 503, \
+            {"Retry-After": str(RETRY_AFTER)}
 
-    model = genai.GenerativeModel("gemini-2.5-flash-lite")
-    response = model.generate_content(prompt)
+    if stream:
+        return stream_summary(url, flight.follow())
 
-    summary = response.text
+    flight.wait()
+    event, data = flight.events[-1]
+    if event == "error":
+        return jsonify({'error': data["error"]}), data.get("status", 500)
 
-    print(summary)
+    log("DEBUG", "Summary: %s", data["summary"])
 
-    return jsonify({"summary": summary})
+    return jsonify({"summary": data["summary"]})
 
 if __name__ == "__main__":
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    from app import create_app
+    create_app().run(debug=True, port=5000)
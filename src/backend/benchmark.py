@@ -0,0 +1,990 @@
+# benchmark.py
+"""
+Offline benchmarks for the backend.
+
+Nothing measured here touches the network: PMC pages and the publications
+CSV come from fixture_server.FixtureServer, Gemini is replaced by fakes.FakeGenerativeModel,
+and LLM outputs are cached in a temporary directory.
+
+    python benchmark.py                      # everything, results in bench-results/
+    python benchmark.py --quick --only scrape,endpoints
+    python benchmark.py --compare bench-results/old.json
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from io import StringIO
+
+from csv_index import CSV_PATH, TitleIndex
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(BACKEND_DIR, "fixtures")
+RESULTS_DIR = os.path.join(BACKEND_DIR, "bench-results")
+CSV_URL = "https://raw.githubusercontent.com/jgalazka/SB_publications/main/SB_publication_PMC.csv"
+
+
+def _rate(fn, n):
+    """Calls fn(i) n times and returns calls per second."""
+    start = time.perf_counter()
+    for i in range(n):
+        fn(i)
+    elapsed = time.perf_counter() - start
+    return n / elapsed if elapsed else float("inf")
+
+
+def bench_title_lookup(n=200):
+    """
+    Compares the old per-request CSV parse + scan used by /summarize with the
+    TitleIndex lookup. The old path is measured without its network download,
+    so the real-world gap is larger than reported here.
+    """
+    import pandas as pd
+
+    with open(CSV_PATH, "r", encoding="utf-8-sig") as f:
+        csv_text = f.read()
+    titles = pd.read_csv(StringIO(csv_text))["Title"].tolist()
+
+    def legacy(i):
+        df = pd.read_csv(StringIO(csv_text))
+        title = titles[i % len(titles)]
+        for t in df["Title"]:
+            if t.lower() == title.lower():
+                break
+        rows = df[df["Title"].str.lower() == title.lower()]
+        return rows["Link"].iloc[0].strip()
+
+    index = TitleIndex()
+
+    def indexed(i):
+        return index.lookup(titles[i % len(titles)])
+
+    before = _rate(legacy, n)
+    after = _rate(indexed, n * 1000)
+    print(f"[BENCH] title lookup  before: {before:,.0f} req/s  after: {after:,.0f} req/s  ({after / before:,.0f}x)")
+    return {"before_rps": before, "after_rps": after}
+
+
+def load_pmc_fixtures():
+    """Returns {name: html} for the saved PMC pages under fixtures/pmc."""
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "pmc", "*.html"))):
+        with open(path, "r", encoding="utf-8") as f:
+            pages[os.path.basename(path)] = f.read()
+    return pages
+
+
+def bench_extraction(n=20):
+    """
+    Parses the saved PMC fixtures the old way (one BeautifulSoup pass for the
+    metadata plus another for the text, both with html.parser) and with a single
+    extractor.parse_article() call on each available backend.
+    """
+    from bs4 import BeautifulSoup
+    import extractor
+
+    pages = list(load_pmc_fixtures().values())
+
+    def legacy(i):
+        html = pages[i % len(pages)]
+        soup = BeautifulSoup(html, 'html.parser')
+        soup.find('hgroup').text
+        soup = BeautifulSoup(html, 'html.parser')
+        for tag in soup(extractor.STRIP_TAGS):
+            tag.decompose()
+        return ' '.join(p.get_text(strip=True) for p in soup.find_all('p'))
+
+    results = {"legacy_pages_per_s": _rate(legacy, n)}
+    print(f"[BENCH] extraction  legacy (2x html.parser): {results['legacy_pages_per_s']:,.1f} pages/s")
+    backends = ["html.parser", "lxml", "selectolax"]
+    for backend in backends:
+        try:
+            rate = _rate(lambda i: extractor.parse_article(pages[i % len(pages)], backend=backend), n)
+        except Exception as e:
+            print(f"[BENCH] extraction  {backend}: unavailable ({e})")
+            continue
+        results[f"{backend}_pages_per_s"] = rate
+        print(f"[BENCH] extraction  single pass ({backend}): {rate:,.1f} pages/s")
+    return results
+
+
+def _percentiles(samples, points=(50, 99)):
+    samples = sorted(samples)
+    return {f"p{p}": samples[min(len(samples) - 1, int(len(samples) * p / 100))] for p in points}
+
+
+def synthetic_records(n, seed=0):
+    """
+    Builds n publication records shaped like nih_data.json entries (url, title,
+    authors, date, keywords), drawing words and names from the real file with a
+    skewed distribution so common terms have long postings lists.
+    """
+    rng = random.Random(seed)
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "nih_data.json"), "r", encoding="utf-8") as f:
+        real = json.load(f)
+    words = sorted({w for r in real for w in r.get("title", "").split() if len(w) > 3})
+    names = sorted({a.strip() for r in real for a in r.get("authors", "").split(",") if a.strip()})
+    weights = [1 / (i + 1) for i in range(len(words))]
+
+    records = []
+    for i in range(n):
+        title_words = rng.choices(words, weights, k=rng.randint(6, 14))
+        records.append({
+            "url": f"https://www.ncbi.nlm.nih.gov/pmc/articles/PMC{10_000_000 + i}/",
+            "title": " ".join(title_words),
+            "authors": ", ".join(rng.sample(names, rng.randint(1, 8))),
+            "date": str(rng.randint(1995, 2025)),
+            "keywords": ", ".join(rng.choices(words, weights, k=rng.randint(5, 20))),
+        })
+    return records
+
+
+def bench_search(n=100_000, queries=300):
+    """Builds a SearchIndex over a synthetic corpus and reports build time and p50/p99 query latency."""
+    from search_index import SearchIndex
+
+    records = synthetic_records(n)
+    start = time.perf_counter()
+    index = SearchIndex(records)
+    build = time.perf_counter() - start
+
+    rng = random.Random(1)
+    kinds = {
+        "text": lambda r: {"q": " ".join(r["title"].split()[:2])},
+        "author": lambda r: {"author": r["authors"].split(",")[0]},
+        "years": lambda r: {"year_from": 2010, "year_to": 2019},
+        "combined": lambda r: {"q": r["title"].split()[0], "year_from": 2000, "year_to": 2025},
+    }
+    results = {"records": n, "build_s": build}
+    print(f"[BENCH] search  built index over {n:,} records in {build:.2f}s")
+    for kind, make in kinds.items():
+        latencies = []
+        for _ in range(queries):
+            params = make(rng.choice(records))
+            start = time.perf_counter()
+            index.search(**params)
+            latencies.append((time.perf_counter() - start) * 1000)
+        stats = _percentiles(latencies)
+        results[kind] = stats
+        print(f"[BENCH] search  {kind:<9} p50 {stats['p50']:.2f} ms  p99 {stats['p99']:.2f} ms")
+    return results
+
+
+def bench_related(n=100_000, queries=300, added=1_000):
+    """
+    Builds a SimilarityIndex over a synthetic corpus and reports build time,
+    p50/p99 /related query latency, the cost of adding records incrementally,
+    and how long a restart takes to load the saved index.
+    """
+    from similarity import SimilarityIndex
+
+    records = synthetic_records(n + added)
+    directory = tempfile.mkdtemp(prefix="bench-similarity-")
+    try:
+        index = SimilarityIndex(directory)
+        start = time.perf_counter()
+        index.add_many(records[:n])
+        build = time.perf_counter() - start
+
+        rng = random.Random(2)
+        latencies = []
+        for _ in range(queries):
+            url = rng.choice(records[:n])["url"]
+            start = time.perf_counter()
+            index.related(url)
+            latencies.append((time.perf_counter() - start) * 1000)
+        stats = _percentiles(latencies)
+
+        start = time.perf_counter()
+        index.add_many(records[n:])
+        incremental = time.perf_counter() - start
+
+        start = time.perf_counter()
+        index.save()
+        save = time.perf_counter() - start
+        start = time.perf_counter()
+        reloaded = SimilarityIndex(directory)
+        load = time.perf_counter() - start
+        assert len(reloaded) == n + added
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    print(f"[BENCH] related  built index over {n:,} records in {build:.2f}s")
+    print(f"[BENCH] related  query p50 {stats['p50']:.2f} ms  p99 {stats['p99']:.2f} ms")
+    print(f"[BENCH] related  added {added:,} records in {incremental:.2f}s  save {save:.2f}s  load {load:.2f}s")
+    return {"records": n, "build_s": build, "query": stats, "incremental_s": incremental, "save_s": save, "load_s": load}
+
+
+SECTION_NAMES = ["Research Purpose", "Methods Used", "Key Findings", "Conclusions", "Implications & Future Work"]
+
+
+def synthetic_summaries(n, seed=0):
+    """Yields n data.json-style records: a url and a bulleted Gemini summary with bold section headings."""
+    rng = random.Random(seed)
+    words = ("mice spaceflight microgravity bone muscle gene expression radiation cells plants tissue "
+             "signaling loss stress response orbit astronauts protein analysis samples").split()
+    for i in range(n):
+        bullets = [f"*   **{name}:** " + " ".join(rng.choices(words, k=rng.randint(15, 40))) + "."
+                   for name in SECTION_NAMES]
+        yield {"url": f"https://www.ncbi.nlm.nih.gov/pmc/articles/PMC{20_000_000 + i}/",
+               "summary": "Here is a summary of the article by Smith et al.:\n\n" + "\n\n".join(bullets)}
+
+
+def bench_enrich(sizes=(10_000, 100_000, 1_000_000), workers=None):
+    """
+    Times data_processor.enrich_data over synthetic JSONL corpora of growing
+    size, each run in a fresh interpreter so its peak RSS can be reported,
+    plus the old section regex against the single-pass tokenizer.
+    """
+    import re
+
+    import data_processor
+
+    legacy = re.compile(r"\*\*\s*(.*?)\s*\*\*[:：]?\s*(.*?)(?=\n\*{2,}|$)", re.DOTALL)
+    sample = [r["summary"] for r in synthetic_summaries(2000)]
+    before = _rate(lambda i: legacy.findall(sample[i % len(sample)]), 20_000)
+    after = _rate(lambda i: data_processor.extract_sections(sample[i % len(sample)]), 20_000)
+    print(f"[BENCH] enrich  sections  regex: {before:,.0f}/s  tokenizer: {after:,.0f}/s")
+    results = {"regex_per_s": before, "tokenizer_per_s": after, "runs": []}
+
+    directory = tempfile.mkdtemp(prefix="bench-enrich-")
+    try:
+        for n in sizes:
+            source = os.path.join(directory, f"summaries-{n}.jsonl")
+            with open(source, "w", encoding="utf-8") as f:
+                for record in synthetic_summaries(n):
+                    f.write(json.dumps(record) + "\n")
+            code = ("import sys, resource, time, data_processor; t = time.perf_counter(); "
+                    f"data_processor.enrich_data({source!r}, {source + '.out.jsonl'!r}, workers={workers!r}); "
+                    "print(time.perf_counter() - t, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, file=sys.stderr)")
+            run = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+            elapsed, rss_kb = run.stderr.strip().splitlines()[-1].split()
+            elapsed = float(elapsed)
+            row = {"records": n, "seconds": elapsed, "records_per_s": n / elapsed, "peak_rss_mb": int(rss_kb) / 1024}
+            results["runs"].append(row)
+            print(f"[BENCH] enrich  {n:>9,} records  {elapsed:6.2f}s  {row['records_per_s']:,.0f} records/s  "
+                  f"peak RSS {row['peak_rss_mb']:.0f} MB")
+            os.remove(source)
+            os.remove(source + ".out.jsonl")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+def csv_titles():
+    with open(CSV_PATH, "r", encoding="utf-8-sig", newline="") as f:
+        return [row["Title"] for row in csv.DictReader(f)]
+
+
+def csv_links():
+    with open(CSV_PATH, "r", encoding="utf-8-sig", newline="") as f:
+        return list(dict.fromkeys(row["Link"].strip() for row in csv.DictReader(f)))
+
+
+@contextmanager
+def offline_backend(page_latency=0.02, model_latency=0.2, quiet=True, **model_kwargs):
+    """
+    Points the shared fetcher at a FixtureServer (each page answered after
+    `page_latency` seconds) and the shared LLM client at fake models, keeps
+    LLM outputs in a temporary cache, and restores everything afterwards.
+    Yields the FixtureServer.
+    """
+    import metrics
+    from fakes import fake_model_factory
+    from fetcher import set_fetcher
+    from fixture_server import FixtureServer
+    from llm_client import LLMClient, set_client
+    from summary_cache import default_cache
+
+    directory = tempfile.mkdtemp(prefix="bench-cache-")
+    saved_dir, saved_level = default_cache.directory, metrics.LOG_LEVEL
+    with FixtureServer(latency=page_latency) as server:
+        set_fetcher(server.fetcher())
+        set_client(LLMClient(model_factory=fake_model_factory(latency=model_latency, **model_kwargs),
+                             rpm=100_000, tpm=10 ** 9))
+        default_cache.directory = directory
+        default_cache._memory.clear()
+        if quiet:
+            metrics.LOG_LEVEL = metrics.LOG_LEVELS["WARN"]
+        try:
+            yield server
+        finally:
+            set_fetcher(None)
+            set_client(None)
+            default_cache.directory = saved_dir
+            default_cache._memory.clear()
+            metrics.LOG_LEVEL = saved_level
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+@contextmanager
+def serve(app):
+    """Runs a Flask app on a free local port in a background thread and yields its base URL."""
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=QuietHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+
+
+def load_test(requests_, concurrency=16):
+    """
+    Sends `requests_` (a list of (method, url, kwargs)) from `concurrency`
+    threads, each with its own keep-alive session. Returns throughput,
+    p50/p99 latency and the error count.
+    """
+    import requests
+    from concurrent.futures import ThreadPoolExecutor
+
+    local = threading.local()
+
+    def send(request):
+        method, url, kwargs = request
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        start = time.perf_counter()
+        try:
+            ok = session.request(method, url, timeout=120, **kwargs).status_code < 400
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(send, requests_))
+    elapsed = time.perf_counter() - start
+    stats = _percentiles([s[0] * 1000 for s in samples])
+    return {"requests": len(samples), "concurrency": concurrency, "requests_per_s": len(samples) / elapsed,
+            "p50_ms": stats["p50"], "p99_ms": stats["p99"], "errors": sum(1 for s in samples if not s[1])}
+
+
+_SNAPSHOT_CHILD = """
+import json, sys, time
+import numpy as np
+import snapshot
+from search_index import parse_year
+
+def memory_kb():
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    # Anonymous memory is this process's own; mapped file pages are shared through the page cache.
+    return fields["Rss"], fields["Anonymous"]
+
+kind, path, queries = sys.argv[1], sys.argv[2], json.loads(sys.argv[3])
+rss0, anon0 = memory_kb()
+start = time.perf_counter()
+if kind == "json":
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+else:
+    data = snapshot.Snapshot(path)
+load = time.perf_counter() - start
+rss1, anon1 = memory_kb()
+
+def scan(q):
+    if kind != "json":
+        return len(data.filter(**q))
+    # The frontend's filters over the parsed list.
+    title, author = (q.get("title") or "").lower(), (q.get("author") or "").lower()
+    lo, hi = q.get("year_from"), q.get("year_to")
+    n = 0
+    for r in data:
+        if title and title not in r["title"].lower():
+            continue
+        if author and author not in r["authors"].lower():
+            continue
+        year = parse_year(r) or 0
+        if lo is not None and year < lo or hi is not None and (year > hi or year == 0):
+            continue
+        n += 1
+    return n
+
+timings, matches = [], []
+for q in queries:
+    start = time.perf_counter()
+    matches.append(scan(q))
+    timings.append(time.perf_counter() - start)
+rss2, anon2 = memory_kb()
+print(json.dumps({"load_s": load, "scan_ms": 1000 * sum(timings) / len(timings), "matches": matches,
+                  "rss_mb": (rss2 - rss0) / 1024, "anon_mb": (anon2 - anon0) / 1024,
+                  "rss_after_load_mb": (rss1 - rss0) / 1024}))
+"""
+
+
+def bench_snapshot(scales=(1, 10, 100)):
+    """
+    The columnar snapshot against the JSON file it replaces, at multiples of
+    the current corpus size: load time, memory added per worker process
+    (RSS, and the anonymous part of it that cannot be shared with other
+    workers), and
+    the time for the frontend's title/author/year filters.
+    """
+    import snapshot
+
+    base = len(csv_links())
+    directory = tempfile.mkdtemp(prefix="bench-snapshot-")
+    results = {}
+    try:
+        for scale in scales:
+            records = synthetic_records(base * scale)
+            json_path = os.path.join(directory, f"data-{scale}.json")
+            snap_path = os.path.join(directory, f"data-{scale}.snapshot")
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump(records, f, indent=2)
+            start = time.perf_counter()
+            snapshot.write_snapshot(records, snap_path)
+            export = time.perf_counter() - start
+            sample = records[len(records) // 2]
+            queries = [{"title": sample["title"].split()[0]},
+                       {"author": sample["authors"].split(",")[0].split()[-1]},
+                       {"year_from": 2010, "year_to": 2019},
+                       {"title": sample["title"].split()[-1], "year_from": 2000, "year_to": 2025}]
+
+            runs = {}
+            for kind, path in (("json", json_path), ("snapshot", snap_path)):
+                run = subprocess.run([sys.executable, "-W", "ignore", "-c", _SNAPSHOT_CHILD, kind, path,
+                                      json.dumps(queries)], cwd=BACKEND_DIR, capture_output=True, text=True,
+                                     check=True)
+                runs[kind] = json.loads(run.stdout.strip().splitlines()[-1])
+                runs[kind]["file_mb"] = os.path.getsize(path) / 1e6
+            assert runs["json"]["matches"] == runs["snapshot"]["matches"], (runs["json"], runs["snapshot"])
+            results[f"{scale}x"] = dict(runs, records=len(records), export_s=export)
+            for kind, r in runs.items():
+                print(f"[BENCH] snapshot  {scale:>3}x {len(records):>7,} records  {kind:<8} {r['file_mb']:6.1f} MB  "
+                      f"load {r['load_s'] * 1000:8.1f} ms  RSS +{r['rss_mb']:6.1f} MB  "
+                      f"unshared +{r['anon_mb']:6.1f} MB  filter {r['scan_ms']:7.2f} ms")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+def bench_suggest(terms=1_000_000, queries=2_000, seed=0):
+    """
+    suggest.PrefixIndex over `terms` distinct author-like and keyword-like
+    terms with skewed counts: build time, the time a server process takes to
+    map the written index, then p50/p99 per prefix length for the index
+    lookup and for the whole /suggest answer (both fields merged, JSON
+    encoded, ETag computed), queried through the mapping.
+    """
+    from http_cache import PreparedBody
+    from snapshot import ColumnFile, write_columns
+    from suggest import PrefixIndex, index_columns, merge
+
+    rng = random.Random(seed)
+    words = sorted({w for r in synthetic_records(2_000, seed=seed) for w in r["keywords"].split(", ")})
+    counts = {}
+    while len(counts) < terms:
+        term = " ".join(rng.choices(words, k=rng.randint(1, 3)))
+        counts[term] = max(1, int(rng.paretovariate(1.2)))
+    start = time.perf_counter()
+    columns = index_columns(counts, "keyword")
+    build = time.perf_counter() - start
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.snapshot.suggest")
+        write_columns(path, columns)
+        start = time.perf_counter()
+        mapped = ColumnFile(path)
+        index = PrefixIndex(mapped.columns, "keyword", mapped.heap)
+        load = time.perf_counter() - start
+        results = {"terms": len(index), "build_s": build, "load_ms": load * 1000,
+                   "precomputed_prefixes": len(index._top)}
+        print(f"[BENCH] suggest  built index over {len(index):,} terms in {build:.2f}s "
+              f"({len(index._top):,} precomputed prefixes), mapped in {load * 1000:.1f} ms")
+        samples = rng.sample(list(counts), min(queries, len(counts)))
+        for length in (1, 2, 3, 4, 6, 8):
+            lookup, answer = [], []
+            for term in samples:
+                words_ = term.split()
+                prefix = rng.choice(words_)[:length]
+                t0 = time.perf_counter()
+                found = index.suggest(prefix, 10)
+                t1 = time.perf_counter()
+                body = json.dumps({"q": prefix, "suggestions": merge({"author": found, "keyword": found}, 10)},
+                                  separators=(",", ":")).encode("utf-8")
+                PreparedBody(body)
+                t2 = time.perf_counter()
+                lookup.append((t1 - t0) * 1000)
+                answer.append((t2 - t0) * 1000)
+            results[f"prefix_{length}"] = {"lookup": _percentiles(lookup), "answer": _percentiles(answer)}
+            print(f"[BENCH] suggest  prefix {length}  lookup p50 {_percentiles(lookup)['p50']:.3f} ms  "
+                  f"p99 {_percentiles(lookup)['p99']:.3f} ms  answer p99 {_percentiles(answer)['p99']:.3f} ms")
+    return results
+
+
+def bench_scrape(n=200, page_latency=0.05, workers=8):
+    """scraper.scrape_all_from_csv over n CSV rows against the stand-in server."""
+    from scraper import scrape_all_from_csv
+
+    with offline_backend(page_latency=page_latency) as server:
+        start = time.perf_counter()
+        texts = scrape_all_from_csv(server.local_url(CSV_URL), limit=n, fetcher=server.fetcher(max_workers=workers))
+        elapsed = time.perf_counter() - start
+    result = {"pages": n, "scraped": len(texts), "workers": workers, "page_latency_s": page_latency,
+              "seconds": elapsed, "pages_per_s": n / elapsed}
+    print(f"[BENCH] scrape  {n} pages ({page_latency * 1000:.0f} ms each, {workers} workers) in {elapsed:.2f}s  "
+          f"{result['pages_per_s']:,.1f} pages/s")
+    return result
+
+
+def bench_archive(n=200, page_latency=0.05, workers=8):
+    """
+    HTML archive: a cold fetch of n pages into an empty archive, a second
+    pass that only revalidates (304s), and an offline replay + re-parse of
+    everything archived, with the compression ratio.
+    """
+    from extractor import parse_article
+    from fetcher import Fetcher
+    from fixture_server import FixtureServer
+    from html_archive import HTMLArchive
+
+    directory = tempfile.mkdtemp(prefix="bench-archive-")
+    archive = HTMLArchive(directory)
+    urls = csv_links()[:n]
+    results = {"pages": len(urls), "codec": archive.codec}
+    try:
+        with FixtureServer(latency=page_latency) as server:
+            fetcher = server.fetcher(max_workers=workers, archive=archive)
+            for run in ("cold", "revalidate"):
+                before, not_modified = server.requests, server.not_modified
+                start = time.perf_counter()
+                fetcher.map(lambda url: parse_article(fetcher.get(url).text, url), urls, label=run)
+                elapsed = time.perf_counter() - start
+                results[run] = {"seconds": elapsed, "pages_per_s": len(urls) / elapsed,
+                                "requests": server.requests - before, "not_modified": server.not_modified - not_modified}
+                print(f"[BENCH] archive  {run:<10} {len(urls)} pages in {elapsed:.2f}s  "
+                      f"{results[run]['pages_per_s']:,.1f} pages/s  ({results[run]['not_modified']} x 304)")
+
+        replay = Fetcher(max_workers=1, archive=archive, replay=True)
+        start = time.perf_counter()
+        for url in urls:
+            parse_article(replay.get(url).text, url)
+        elapsed = time.perf_counter() - start
+        results["replay"] = {"seconds": elapsed, "pages_per_s": len(urls) / elapsed}
+        results["stats"] = stats = archive.stats()
+        print(f"[BENCH] archive  replay     {len(urls)} pages in {elapsed:.2f}s  "
+              f"{results['replay']['pages_per_s']:,.1f} pages/s  (no network)")
+        print(f"[BENCH] archive  {stats['raw_bytes'] / 1e6:.1f} MB raw -> {stats['stored_bytes'] / 1e6:.1f} MB "
+              f"{archive.codec} ({stats['ratio']:.1f}x)")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+def _near_copy(words, rng, changed=0.01):
+    """`words` with about `changed` of them replaced by others from the same text."""
+    words = list(words)
+    for i in rng.sample(range(len(words)), max(1, int(len(words) * changed))):
+        words[i] = rng.choice(words)
+    return words
+
+
+def bench_dedup(sizes=(10_000, 100_000), bodies=5_000, duplicates=0.05, seed=0):
+    """
+    dedup.py on synthetic publications where a `duplicates` share of rows
+    repeat an earlier one: under another URL form of the same PMC id, or
+    under a new PMC id with a retitled/re-cased title. Reports time per row
+    and recall, and how many signature comparisons LSH made against the
+    n*(n-1)/2 of comparing every pair. The body check runs on `bodies`
+    articles of ~800 words, a share of them with 1% of the words changed.
+    """
+    from dedup import BodyIndex, dedup_rows
+
+    rng = random.Random(seed)
+    results = {}
+    for n in sizes:
+        rows, expected_pmc, expected_title = [], 0, set()
+        for r in synthetic_records(n, seed=seed):
+            rows.append((r["title"], r["url"]))
+            if rng.random() < duplicates:
+                title, url = rows[rng.randrange(len(rows))]
+                if rng.random() < 0.5:
+                    rows.append((title, url.replace("www.ncbi.nlm.nih.gov/pmc/", "pmc.ncbi.nlm.nih.gov/")))
+                    expected_pmc += 1
+                else:
+                    copy = f"{title.upper()}." if rng.random() < 0.5 else f"{title}: a reprint"
+                    rows.append((copy, f"https://www.ncbi.nlm.nih.gov/pmc/articles/PMC{20_000_000 + len(rows)}/"))
+                    expected_title.add(rows[-1][1])
+        start = time.perf_counter()
+        kept, merges, similar = dedup_rows(rows)
+        elapsed = time.perf_counter() - start
+        found = {s["url"] for s in similar}
+        results[f"titles_{n}"] = run = {
+            "rows": len(rows), "seconds": elapsed, "us_per_row": elapsed / len(rows) * 1e6,
+            "pmc_merged": len(merges), "pmc_expected": expected_pmc,
+            "title_recall": len(found & expected_title) / max(1, len(expected_title)),
+            "title_false_positives": len(found - expected_title),
+        }
+        print(f"[BENCH] dedup  titles {len(rows):>8,} rows in {elapsed:.2f}s ({run['us_per_row']:.0f} us/row)  "
+              f"PMC merges {len(merges)}/{expected_pmc}  title recall {run['title_recall']:.1%}  "
+              f"false positives {run['title_false_positives']}")
+
+    vocabulary = sorted({w for r in synthetic_records(2_000, seed=seed) for w in r["keywords"].split(", ")})
+    index = BodyIndex()
+    texts, expected = [], set()
+    for i in range(bodies):
+        if texts and rng.random() < duplicates:
+            texts.append(" ".join(_near_copy(rng.choice(texts).split(), rng)))
+            expected.add(i)
+        else:
+            texts.append(" ".join(rng.choices(vocabulary, k=800)))
+    start = time.perf_counter()
+    found = {i for i, text in enumerate(texts) if index.check(i, text)[0] is not None}
+    elapsed = time.perf_counter() - start
+    pairs = bodies * (bodies - 1) // 2
+    results["bodies"] = {
+        "articles": bodies, "seconds": elapsed, "ms_per_article": elapsed / bodies * 1e3,
+        "recall": len(found & expected) / max(1, len(expected)), "false_positives": len(found - expected),
+        "comparisons": index.lsh.comparisons, "all_pairs": pairs,
+    }
+    print(f"[BENCH] dedup  bodies {bodies:>8,} articles in {elapsed:.2f}s "
+          f"({results['bodies']['ms_per_article']:.2f} ms/article)  recall {results['bodies']['recall']:.1%}  "
+          f"false positives {results['bodies']['false_positives']}  "
+          f"{index.lsh.comparisons:,} comparisons vs {pairs:,} pairs")
+    return results
+
+
+def bench_nih_scrape(n=100, page_latency=0.05, model_latency=0.2):
+    """collect_info.nih_scrape (fetch, parse, Gemini keywords) for n publications, cold and with cached keywords."""
+    from fetcher import get_fetcher
+
+    results = {"publications": n}
+    with offline_backend(page_latency=page_latency, model_latency=model_latency,
+                         respond=lambda prompt: "microgravity, mice, bone loss, spaceflight"):
+        import collect_info
+        urls = csv_links()[:n]
+        for run in ("cold", "cached"):
+            start = time.perf_counter()
+            records = get_fetcher().map(collect_info.nih_scrape, urls, label="nih_scrape")
+            elapsed = time.perf_counter() - start
+            results[run] = {"seconds": elapsed, "records_per_s": n / elapsed,
+                            "with_keywords": sum(1 for r in records if r and r.get("keywords"))}
+            print(f"[BENCH] nih_scrape  {run:<6} {n} publications in {elapsed:.2f}s  "
+                  f"{results[run]['records_per_s']:,.1f}/s")
+    return results
+
+
+def bench_save_results(n=10_000, batch=10):
+    """storage.upsert into a fresh database: pipeline-sized batches, one big batch, then updates."""
+    import storage
+
+    records = synthetic_records(n)
+    directory = tempfile.mkdtemp(prefix="bench-db-")
+    results = {"records": n}
+    try:
+        for name, size in (("batched", batch), ("single", n), ("update", n)):
+            conn = storage.connect(os.path.join(directory, f"{name if name != 'update' else 'single'}.db"))
+            rows = records if name != "update" else [dict(r, keywords="updated") for r in records]
+            start = time.perf_counter()
+            for i in range(0, n, size):
+                storage.upsert(rows[i:i + size], conn=conn)
+            elapsed = time.perf_counter() - start
+            results[name] = {"batch": size, "seconds": elapsed, "records_per_s": n / elapsed}
+            print(f"[BENCH] save_results  {name:<8} batch {size:>6}: {n / elapsed:,.0f} records/s")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+def bench_endpoints(requests_per_endpoint=1000, summarize_requests=100, concurrency=16,
+                    page_latency=0.05, model_latency=0.5):
+    """
+    Load-tests /data (full and paged), /publications and /summarize (cold,
+    then the same titles again) on a local app, `concurrency` clients at a time.
+    """
+    results = {}
+    with offline_backend(page_latency=page_latency, model_latency=model_latency):
+        from app import create_app
+
+        with serve(create_app({"TITLE_INDEX_REFRESH": False})) as base_url:
+            rng = random.Random(3)
+            gzip = {"headers": {"Accept-Encoding": "gzip"}}
+            scenarios = {
+                "data_full": [("GET", f"{base_url}/data", gzip)] * requests_per_endpoint,
+                "data_paged": [("GET", f"{base_url}/data?offset={rng.randrange(16)}&limit=5", gzip)
+                               for _ in range(requests_per_endpoint)],
+                "publications": [("GET", f"{base_url}/publications", gzip)] * requests_per_endpoint,
+            }
+            titles = csv_titles()[:summarize_requests]
+            summarize = [("POST", f"{base_url}/summarize", {"json": {"title": t}}) for t in titles]
+            scenarios["summarize_cold"] = summarize
+            scenarios["summarize_cached"] = summarize
+
+            for name, requests_ in scenarios.items():
+                results[name] = stats = load_test(requests_, concurrency)
+                print(f"[BENCH] endpoints  {name:<16} {stats['requests_per_s']:8,.1f} req/s  "
+                      f"p50 {stats['p50_ms']:7.1f} ms  p99 {stats['p99_ms']:7.1f} ms  errors {stats['errors']}")
+    return results
+
+
+def bench_coalescing(concurrency=32, workers=4, page_latency=0.05, model_latency=1.0):
+    """
+    /summarize under a burst of `concurrency` simultaneous requests: all for
+    one title (they should share one scrape and one Gemini call), then all for
+    different titles (at most `workers` jobs run at once).
+    """
+    from llm_client import get_client
+
+    results = {}
+    with offline_backend(page_latency=page_latency, model_latency=model_latency) as server:
+        from app import create_app
+
+        app = create_app({"TITLE_INDEX_REFRESH": False, "SUMMARY_WORKERS": workers})
+        with serve(app) as base_url:
+            titles = csv_titles()
+            for name, batch in (("same_title", [titles[0]] * concurrency),
+                                ("distinct_titles", titles[1:concurrency + 1])):
+                pages, calls = server.requests, get_client().counts["requests"]
+                requests_ = [("POST", f"{base_url}/summarize", {"json": {"title": t}}) for t in batch]
+                stats = load_test(requests_, concurrency)
+                stats.update(page_fetches=server.requests - pages, llm_calls=get_client().counts["requests"] - calls)
+                results[name] = stats
+                print(f"[BENCH] coalescing  {name:<15} {concurrency} requests: {stats['page_fetches']} page fetches, "
+                      f"{stats['llm_calls']} LLM calls, p50 {stats['p50_ms']:.0f} ms  p99 {stats['p99_ms']:.0f} ms  "
+                      f"errors {stats['errors']}")
+    return results
+
+
+_STARTUP = """
+import json, time
+start = time.perf_counter()
+import wsgi
+imported = time.perf_counter() - start
+client = wsgi.app.test_client()
+first = {}
+for path in ("/", "/publications", "/data"):
+    t = time.perf_counter()
+    client.get(path)
+    first[path] = time.perf_counter() - t
+print(json.dumps({"import_s": imported, "first_request_s": first}))
+"""
+
+
+def bench_startup(runs=5):
+    """
+    Cold start of the unified app in fresh interpreters: importing wsgi
+    (create_app()), then the first request to /, /publications and /data.
+    """
+    env = dict(os.environ)
+    env.pop("GOOGLE_API_KEY", None)  # the app must start without it
+    samples = []
+    for _ in range(runs):
+        run = subprocess.run([sys.executable, "-W", "ignore", "-c", _STARTUP], cwd=BACKEND_DIR, env=env,
+                             capture_output=True, text=True, check=True)
+        samples.append(json.loads(run.stdout.strip().splitlines()[-1]))
+    result = {"runs": runs, "import_s": min(s["import_s"] for s in samples),
+              "first_request_s": {path: min(s["first_request_s"][path] for s in samples)
+                                  for path in samples[0]["first_request_s"]}}
+    first = "  ".join(f"{path} {t * 1000:.0f} ms" for path, t in result["first_request_s"].items())
+    print(f"[BENCH] startup  import wsgi {result['import_s'] * 1000:.0f} ms  first requests: {first}")
+    return result
+
+
+def bench_gunicorn(workers=2, requests_per_endpoint=500, concurrency=16):
+    """
+    Starts `gunicorn -c gunicorn.conf.py wsgi:app`, times how long until it
+    answers, then load-tests /data and /publications across its workers.
+    """
+    import socket
+
+    import requests
+
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        print("[BENCH] gunicorn  unavailable (pip install gunicorn)")
+        return None
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, BIND=f"127.0.0.1:{port}", WEB_CONCURRENCY=str(workers))
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"],
+                               cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            try:
+                requests.get(f"{base_url}/", timeout=1)
+                break
+            except requests.ConnectionError:
+                if process.poll() is not None or time.perf_counter() - start > 30:
+                    raise RuntimeError("gunicorn did not start")
+                time.sleep(0.02)
+        ready = time.perf_counter() - start
+        result = {"workers": workers, "ready_s": ready}
+        print(f"[BENCH] gunicorn  {workers} workers answering after {ready * 1000:.0f} ms")
+        gzip = {"headers": {"Accept-Encoding": "gzip"}}
+        for name, path in (("data_full", "/data"), ("publications", "/publications")):
+            result[name] = stats = load_test([("GET", base_url + path, gzip)] * requests_per_endpoint, concurrency)
+            print(f"[BENCH] gunicorn  {name:<13} {stats['requests_per_s']:8,.1f} req/s  "
+                  f"p50 {stats['p50_ms']:7.1f} ms  p99 {stats['p99_ms']:7.1f} ms  errors {stats['errors']}")
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    return result
+
+
+def _first_byte(url, **kwargs):
+    """POSTs to `url` and returns (seconds to first body byte, seconds to first summary text, total seconds)."""
+    import requests
+
+    start = time.perf_counter()
+    first_byte = first_text = None
+    with requests.post(url, stream=True, timeout=60, **kwargs) as response:
+        for line in response.iter_lines(chunk_size=1):
+            now = time.perf_counter() - start
+            if first_byte is None:
+                first_byte = now
+            if first_text is None and (line.startswith(b"event: chunk") or b'"summary"' in line):
+                first_text = now
+    return first_byte, first_text, time.perf_counter() - start
+
+
+def bench_summarize_ttfb(requests_per_mode=5, latency=0.8, chunk_delay=0.05, summary_chars=1200):
+    """
+    Compares time to first byte / first summary text for the JSON and SSE
+    modes of /summarize, and for a cached summary replayed over SSE, with a
+    fake streaming model that takes `latency` seconds to its first chunk.
+    """
+    answer = ("Spaceflight alters gene expression in mouse tissues. " * 100)[:summary_chars]
+    titles = csv_titles()[:requests_per_mode * 3]
+    modes = {
+        "json": {"headers": {}},
+        "stream": {"headers": {"Accept": "text/event-stream"}},
+        "stream_cached": {"headers": {"Accept": "text/event-stream"}},
+    }
+    results = {}
+    with offline_backend(model_latency=latency, chunk_delay=chunk_delay, respond=lambda prompt: answer):
+        from app import create_app
+
+        with serve(create_app({"TITLE_INDEX_REFRESH": False})) as base_url:
+            for n, (mode, options) in enumerate(modes.items()):
+                # Fresh titles for the uncached modes; the cached mode repeats the streamed ones.
+                batch = titles[n * requests_per_mode:(n + 1) * requests_per_mode]
+                if mode == "stream_cached":
+                    batch = titles[requests_per_mode:2 * requests_per_mode]
+                samples = [_first_byte(f"{base_url}/summarize", json={"title": t}, **options) for t in batch]
+                stats = {
+                    "first_byte_s": sum(s[0] for s in samples) / len(samples),
+                    "first_text_s": sum(s[1] for s in samples) / len(samples),
+                    "total_s": sum(s[2] for s in samples) / len(samples),
+                }
+                results[mode] = stats
+                print(f"[BENCH] summarize  {mode:<13} first byte {stats['first_byte_s'] * 1000:7.1f} ms  "
+                      f"first text {stats['first_text_s'] * 1000:7.1f} ms  total {stats['total_s'] * 1000:7.1f} ms")
+    return results
+
+
+# name -> (function, keyword arguments for --quick)
+BENCHMARKS = {
+    "title_lookup": (bench_title_lookup, {"n": 50}),
+    "extraction": (bench_extraction, {"n": 5}),
+    "search": (bench_search, {"n": 10_000, "queries": 100}),
+    "related": (bench_related, {"n": 10_000, "queries": 100}),
+    "enrich": (bench_enrich, {"sizes": (10_000, 50_000)}),
+    "snapshot": (bench_snapshot, {"scales": (1, 10)}),
+    "suggest": (bench_suggest, {"terms": 100_000, "queries": 500}),
+    "scrape": (bench_scrape, {"n": 50}),
+    "nih_scrape": (bench_nih_scrape, {"n": 30}),
+    "archive": (bench_archive, {"n": 50}),
+    "dedup": (bench_dedup, {"sizes": (10_000,), "bodies": 1_000}),
+    "save_results": (bench_save_results, {"n": 2_000}),
+    "endpoints": (bench_endpoints, {"requests_per_endpoint": 200, "summarize_requests": 30}),
+    "summarize_ttfb": (bench_summarize_ttfb, {"requests_per_mode": 3}),
+    "coalescing": (bench_coalescing, {"concurrency": 16}),
+    "startup": (bench_startup, {"runs": 2}),
+    "gunicorn": (bench_gunicorn, {"requests_per_endpoint": 200}),
+}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _flatten(value, prefix=""):
+    if isinstance(value, dict):
+        flat = {}
+        for key, item in value.items():
+            flat.update(_flatten(item, f"{prefix}.{key}" if prefix else str(key)))
+        return flat
+    if isinstance(value, list):
+        return _flatten({str(i): item for i, item in enumerate(value)}, prefix)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {prefix: value}
+    return {}
+
+
+def compare(old_path, new):
+    """Prints every metric present in both result files with its relative change."""
+    with open(old_path, "r", encoding="utf-8") as f:
+        old = json.load(f)
+    before, after = _flatten(old["results"]), _flatten(new["results"])
+    print(f"[BENCH] {old.get('commit')} -> {new.get('commit')}")
+    for key in sorted(set(before) & set(after)):
+        change = (after[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+        print(f"    {key:<50} {before[key]:>12.4g} {after[key]:>12.4g} {change:+7.1f}%")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline backend benchmarks.")
+    parser.add_argument("--only", default="", help=f"comma separated subset of {', '.join(BENCHMARKS)}")
+    parser.add_argument("--quick", action="store_true", help="smaller inputs, for a quick check")
+    parser.add_argument("--out", default=None, help="results file (default bench-results/<time>-<commit>.json)")
+    parser.add_argument("--compare", default=None, help="earlier results file to compare against")
+    args = parser.parse_args(argv)
+
+    names = [n.strip() for n in args.only.split(",") if n.strip()] or list(BENCHMARKS)
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    os.chdir(BACKEND_DIR)
+    commit = _git_commit()
+    results = {}
+    for name in names:
+        fn, quick = BENCHMARKS[name]
+        results[name] = fn(**(quick if args.quick else {}))
+
+    run = {"commit": commit, "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "quick": args.quick,
+           "python": sys.version.split()[0], "platform": platform.platform(), "cpus": os.cpu_count(),
+           "results": results}
+    out = args.out or os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(run, f, indent=2, default=str)
+    print(f"[INFO] Wrote {out}")
+    if args.compare:
+        compare(args.compare, run)
+    return run
+
+
+if __name__ == "__main__":
+    main()
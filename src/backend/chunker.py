@@ -0,0 +1,151 @@
+# chunker.py
+"""
+Map-reduce prompting for articles too long for one prompt.
+
+chunk_text() splits an article on section, paragraph and sentence
+boundaries into chunks within a token budget. Inside a section, chunks end
+after "anchor" paragraphs picked by a hash of their text, so editing one
+part of an article only changes the chunks around the edit and the rest
+are served from the summary cache.
+
+map_chunks() sends one prompt per chunk concurrently through the shared
+LLMClient, so a long article takes about as long as its slowest chunk.
+"""
+import hashlib
+import re
+
+from llm_client import estimate_tokens, get_client
+from metrics import log
+from summary_cache import cache_key, cached_generate, default_cache
+
+CHUNK_TOKENS = 3000   # ~12k characters per prompt
+MIN_FILL = 0.25       # a new section starts a new chunk once the current one is this full
+ANCHOR_EVERY = 4      # about one paragraph in four may end a chunk once it is half full
+
+_SENTENCE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9(\[])")
+
+
+def split_sentences(text):
+    return [s.strip() for s in _SENTENCE.split(text or "") if s.strip()]
+
+
+def _hard_split(text, max_tokens):
+    """Splits on whitespace into pieces of at most `max_tokens`."""
+    pieces, current, size = [], [], 0
+    for word in text.split():
+        cost = estimate_tokens(word + " ")
+        if current and size + cost > max_tokens:
+            pieces.append(" ".join(current))
+            current, size = [], 0
+        current.append(word)
+        size += cost
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def _units(text, max_tokens):
+    """`text` itself if it fits, else its sentences (each hard split if needed)."""
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+    units = []
+    for sentence in split_sentences(text):
+        if estimate_tokens(sentence) <= max_tokens:
+            units.append(sentence)
+        else:
+            units.extend(_hard_split(sentence, max_tokens))
+    return units
+
+
+def _is_anchor(unit):
+    return int(hashlib.sha1(unit.encode("utf-8")).hexdigest()[:8], 16) % ANCHOR_EVERY == 0
+
+
+def chunk_text(text, sections=None, budget=CHUNK_TOKENS):
+    """
+    Returns the article as a list of chunks of at most ~`budget` tokens.
+    `sections` is the extractor's [{heading, paragraphs}] list; without it the
+    plain text is split on sentences. Text that fits the budget is returned
+    as a single chunk, unchanged.
+    """
+    text = (text or "").strip()
+    if not text:
+        return []
+    if estimate_tokens(text) <= budget:
+        return [text]
+
+    max_unit = max(1, budget // 2)
+    blocks = []  # (heading, unit, starts_section)
+    for section in sections or []:
+        heading = section.get("heading")
+        starts = True
+        for paragraph in section.get("paragraphs") or []:
+            for unit in _units(paragraph, max_unit):
+                blocks.append((heading, unit, starts))
+                starts = False
+    if not blocks:
+        blocks = [(None, unit, False) for unit in _units(text, max_unit)]
+
+    chunks, current, size, previous = [], [], 0, None
+    for heading, unit, starts in blocks:
+        cost = estimate_tokens(unit)
+        if current and (size + cost > budget
+                        or (starts and size >= MIN_FILL * budget)
+                        or (size >= budget / 2 and _is_anchor(previous))):
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+            if heading and not starts:
+                current.append(f"{heading} (continued)")
+                size += estimate_tokens(current[-1])
+        if heading and starts:
+            current.append(heading)
+            size += estimate_tokens(heading)
+        current.append(unit)
+        size += cost
+        previous = unit
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def map_chunks(model_name, template_version, chunks, map_prompt, cache=None):
+    """
+    Runs `map_prompt(chunk)` for every chunk concurrently and returns the
+    outputs in order. Outputs are cached per chunk, so only chunks whose text
+    changed are sent again. Call from your own threads, not from inside the
+    LLMClient pool, since this waits on that pool.
+    """
+    cache = cache or default_cache
+    client = get_client()
+    keys = [cache_key(model_name, f"{template_version}:map", chunk) for chunk in chunks]
+    outputs = [cache.get(key) for key in keys]
+    futures = {i: client.submit(model_name, map_prompt(chunks[i])) for i, out in enumerate(outputs) if out is None}
+    for i, future in futures.items():
+        outputs[i] = future.result().strip()
+        if outputs[i]:
+            cache.set(keys[i], outputs[i])
+    return outputs
+
+
+def map_reduce(model_name, template_version, text, prompt, map_prompt, reduce_prompt,
+               sections=None, budget=CHUNK_TOKENS, cache=None):
+    """
+    Generates one output for an article of any length. Articles that fit the
+    budget get the single `prompt(text)`. Longer ones are chunked, mapped with
+    `map_prompt(chunk)` concurrently, and combined with one
+    `reduce_prompt(outputs)` call. The final output is cached on the full text.
+    """
+    cache = cache or default_cache
+    model = get_client().model(model_name)
+    chunks = chunk_text(text, sections, budget)
+    if len(chunks) <= 1:
+        return cached_generate(model, model_name, template_version, text, prompt(text), cache)
+
+    def generate():
+        outputs = map_chunks(model_name, template_version, chunks, map_prompt, cache)
+        log("INFO", "Reducing %d chunk outputs (%d chars)", len(chunks), len(text))
+        combined = "\n\n".join(outputs)
+        return cached_generate(model, model_name, f"{template_version}:reduce", combined,
+                               reduce_prompt(outputs), cache)
+
+    return cache.get_or_generate(cache_key(model_name, template_version, text), generate)
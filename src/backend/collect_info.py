@@ -1,54 +1,62 @@
 #Knowledge graph
 
-import requests
-import pandas as pd
-from bs4 import BeautifulSoup
-import os
-from storage import save_results
-from scraper import scrape_article, read_urls_from_csv
-import google.generativeai as genai
-from dotenv import load_dotenv
+from extractor import fetch_article
+from summary_cache import cached_generate
+from chunker import chunk_text, map_chunks
+from llm_client import get_client
 
 CSV_URL = "https://raw.githubusercontent.com/jgalazka/SB_publications/main/SB_publication_PMC.csv"
+KEYWORD_MODEL = "gemini-2.5-pro"
+KEYWORD_PROMPT_VERSION = "keywords-v2"
+MAX_KEYWORDS = 50
 
 # from scraper import scrape_all_from_csv
-from geminiSummarizer import summarize_text
 # from storage import save_results
 
-def nih_scrape(url):
-    headers = {'User-Agent': 'Mozilla/5.0'}
-    page = requests.get(url, headers=headers, timeout=10)
-    soup = BeautifulSoup(page.text, 'html.parser')
-    classes = soup.find(class_='cg p')
-    title = soup.find('hgroup').text
-    if (classes):
-        authors = classes.find_all('h3')
-        authors = classes.find_all('h3')
-        author_names = [author.get_text() for author in authors]
-        authorsParsed = ", ".join(author_names)
-    else:
-        authorsParsed = "unknown"
-
-    #Scraping div with text I want
-    temp = soup.find(class_='pmc-layout__citation')
-    #Now scraping the actual date
-    date_text = (temp.find('div')).text
+def keyword_prompt(text):
+    return f"You are a scientific summarization assistant for NASA bioscience research. Read the following article and highlights all relevant keywords. Only put the relevant keywords in the response, separated by commas, and dont include more than {MAX_KEYWORDS} keywords. Article: {text}"
 
-    date = date_text[date_text.index(".")+2 : date_text.index(".")+6]
-
-    text = scrape_article(url)
-    load_dotenv()
-    api_key = os.getenv("GOOGLE_API_KEY")
-    model = genai.GenerativeModel("gemini-2.5-pro")
-    prompt=f"You are a scientific summarization assistant for NASA bioscience research. Read the following article and highlights all relevant keywords. Only put the relevant keywords in the response, separated by commas, and dont include more than 50 keywords. Article: {text[:15000]}"
+def merge_keywords(outputs, limit=MAX_KEYWORDS):
+    """Combines per-chunk keyword lists: most frequent across chunks first, then first seen."""
+    counts = {}
+    for output in outputs:
+        for keyword in (output or "").split(","):
+            keyword = keyword.strip().strip(".")
+            key = keyword.casefold()
+            if not key:
+                continue
+            if key not in counts:
+                counts[key] = [0, len(counts), keyword]
+            counts[key][0] += 1
+    ranked = sorted(counts.values(), key=lambda c: (-c[0], c[1]))
+    return ", ".join(keyword for _, _, keyword in ranked[:limit])
 
+def extract_keywords(text, sections=None):
+    """
+    Asks Gemini for up to 50 comma separated keywords; returns "" on failure.
+    Long articles are split with chunker.chunk_text and the chunks sent
+    concurrently; their keyword lists are merged locally rather than by
+    another model call.
+    """
     try:
-        response = model.generate_content(prompt)
-        raw_output = response.text.strip()
+        chunks = chunk_text(text, sections)
+        if len(chunks) <= 1:
+            model = get_client().model(KEYWORD_MODEL)
+            return cached_generate(model, KEYWORD_MODEL, KEYWORD_PROMPT_VERSION, text, keyword_prompt(text)).strip()
+        return merge_keywords(map_chunks(KEYWORD_MODEL, KEYWORD_PROMPT_VERSION, chunks, keyword_prompt))
 
     except Exception as e:
         print(f"[ERROR] Gemini summarization failed: {e}")
-        raw_output = ""
+        return ""
+
+def nih_scrape(url):
+    # One request and one parse for both the metadata and the body text.
+    article = fetch_article(url)
+    title = article["title"]
+    authorsParsed = ", ".join(article["authors"]) if article["authors"] else "unknown"
+    date = article["year"]
+
+    raw_output = extract_keywords(article["text"], article["sections"])
 
     summary_data = {"url": url, "title": title, "authors": authorsParsed, "date": date, "keywords": raw_output}
     # result.append(summary_data)
@@ -58,11 +66,7 @@ def nih_scrape(url):
 
 # save_results(nih_scrape("https://www.ncbi.nlm.nih.gov/pmc/articles/PMC4136787"))
 
-urls = read_urls_from_csv(CSV_URL)
-urls = urls[:49]
-
-result = []
-for url in urls:
-    result.append(nih_scrape(url))
-    print(f"Finished URL: {url}")
-save_results(result)
\ No newline at end of file
+if __name__ == "__main__":
+    # Metadata + keywords for the first 49 publications, resumable via the pipeline manifest.
+    from pipeline import run_pipeline
+    run_pipeline(stages=("fetched", "parsed", "keywords"), limit=49)
@@ -0,0 +1,118 @@
+# csv_index.py
+import csv
+import os
+import re
+import threading
+import unicodedata
+from email.utils import formatdate
+from io import StringIO
+
+import requests
+
+CSV_URL = "https://raw.githubusercontent.com/jgalazka/SB_publications/main/SB_publication_PMC.csv"
+CSV_PATH = os.path.join(os.path.dirname(__file__), "SB_publication_PMC.csv")
+REFRESH_INTERVAL = 6 * 60 * 60  # seconds between background checks
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def normalize_title(title: str):
+    """Folds case, unicode forms, punctuation and whitespace so titles compare equal."""
+    text = unicodedata.normalize("NFKC", title or "").casefold()
+    return " ".join(_NON_WORD.sub(" ", text).split())
+
+
+def parse_csv(text: str):
+    """Parses the publications CSV into a {normalized title: link} dict."""
+    reader = csv.DictReader(StringIO(text.lstrip("\ufeff")))
+    links = {}
+    for row in reader:
+        title = (row.get("Title") or "").strip()
+        link = (row.get("Link") or "").strip()
+        if title and link:
+            # Keep the first occurrence, like the old `iloc[0]` lookup did.
+            links.setdefault(normalize_title(title), link)
+    return links
+
+
+class TitleIndex:
+    """
+    In-memory title -> link index for SB_publication_PMC.csv.
+    Loaded once from the bundled CSV and optionally kept fresh by a background
+    thread that revalidates the upstream copy with ETag / If-Modified-Since.
+    """
+
+    def __init__(self, path=CSV_PATH, url=CSV_URL):
+        self.path = path
+        self.url = url
+        self.etag = None
+        self.last_modified = None
+        self._links = {}
+        self._thread = None
+        self._stop = threading.Event()
+        self.load_file(path)
+
+    def __len__(self):
+        return len(self._links)
+
+    def load_file(self, path):
+        if not os.path.exists(path):
+            print(f"[WARN] {path} not found, title index starts empty.")
+            return
+        with open(path, "r", encoding="utf-8-sig") as f:
+            self._links = parse_csv(f.read())
+        # Use the bundled file's age for the first conditional request.
+        self.last_modified = formatdate(os.path.getmtime(path), usegmt=True)
+        print(f"[INFO] Loaded {len(self._links)} titles from {path}")
+
+    def lookup(self, title):
+        """Returns the link for a title, or None when it is not in the CSV."""
+        return self._links.get(normalize_title(title))
+
+    def refresh(self, timeout=10):
+        """
+        Revalidates the upstream CSV. Returns True when a new copy was loaded,
+        False when the server answered 304 Not Modified.
+        """
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+
+        response = requests.get(self.url, headers=headers, timeout=timeout)
+        if response.status_code == 304:
+            return False
+        response.raise_for_status()
+
+        links = parse_csv(response.text)
+        if not links:
+            print("[WARN] Upstream CSV had no usable rows, keeping current index.")
+            return False
+        # Swap the whole dict so readers never see a half-built index.
+        self._links = links
+        self.etag = response.headers.get("ETag")
+        self.last_modified = response.headers.get("Last-Modified", self.last_modified)
+        print(f"[INFO] Refreshed title index: {len(links)} titles.")
+        return True
+
+    def start_background_refresh(self, interval=REFRESH_INTERVAL):
+        """Starts a daemon thread that calls refresh() every `interval` seconds."""
+        if self._thread and self._thread.is_alive():
+            return self._thread
+
+        def run():
+            while not self._stop.is_set():
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"[WARN] Title index refresh failed: {e}")
+                self._stop.wait(interval)
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=run, name="title-index-refresh", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
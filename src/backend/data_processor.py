@@ -1,20 +1,51 @@
 # data_processor.py
+import argparse
 import json
 import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import os
+import tempfile
+
+BATCH_SIZE = 1000       # records per task when a process pool is used
+READ_CHUNK = 1 << 16    # characters read at a time from a JSON array file
+BULLETS = "*-•"
+
+
+def _summary_text(summary):
+    """Summaries are saved as a string or, by older runs, as a list of bullet strings."""
+    if isinstance(summary, list):
+        return "\n".join(map(str, summary))
+    return str(summary or "")
 
 
 def extract_sections(summary: str):
-    """Extracts structured sections (Purpose, Methods, Findings, etc.) from the summary text."""
-    sections = {}
-    pattern = r"\*\*\s*(.*?)\s*\*\*[:：]?\s*(.*?)(?=\n\*{2,}|$)"
-    matches = re.findall(pattern, summary, flags=re.DOTALL)
+    """
+    Extracts structured sections (Purpose, Methods, Findings, etc.) from the summary text.
 
-    for title, content in matches:
-        title = title.strip().replace("*", "")
-        content = content.strip().replace("\n", " ")
-        sections[title] = content
+    One pass over the lines: a line whose text (after an optional bullet
+    marker) starts with **Heading** opens a section, and the following lines
+    belong to it until the next heading.
+    """
+    sections = {}
+    title = None
+    content = []
+    for line in summary.splitlines():
+        text = line.strip()
+        if text[:1] in BULLETS and text[1:2] != "*":
+            text = text[1:].lstrip()
+        end = text.find("**", 2) if text.startswith("**") else -1
+        if end > 2:
+            if title:
+                sections[title] = " ".join(content)
+            title = text[2:end].replace("*", "").strip().rstrip(":：").strip()
+            rest = text[end + 2:].lstrip(":： \t")
+            content = [rest] if rest else []
+        elif title and text:
+            content.append(text)
+    if title:
+        sections[title] = " ".join(content)
 
     return sections or None
 
@@ -34,11 +65,144 @@ def extract_author(summary: str):
     return "Unknown"
 
 
-def enrich_data(input_file="data.json", output_file="processed_data.json"):
+def enrich_record(i, record):
+    """Builds the processed_data.json entry for the i-th (0-based) saved summary."""
+    summary = _summary_text(record.get("summary", "") if isinstance(record, dict) else record)
+    url = record.get("url", f"Unknown_{i}") if isinstance(record, dict) else f"Unknown_{i}"
+
+    return {
+        "id": i + 1,
+        "url": url,
+        "author": extract_author(summary),
+        "title": infer_title(summary),
+        "summary": summary,
+        "sections": extract_sections(summary),
+    }
+
+
+def _enrich_batch(batch):
+    start, records = batch
+    return [enrich_record(start + n, record) for n, record in enumerate(records)]
+
+
+# -- streaming I/O ------------------------------------------------------------
+
+def iter_json_array(f, chunk_size=READ_CHUNK):
+    """Yields the elements of a top-level JSON array one at a time, reading `f` in chunks."""
+    decoder = json.JSONDecoder()
+    chunk = f.read(chunk_size)
+    buffer = chunk.lstrip()
+    while chunk and not buffer:
+        chunk = f.read(chunk_size)
+        buffer = chunk.lstrip()
+    if not buffer.startswith("["):
+        raise json.JSONDecodeError("Expected a JSON array", buffer, 0)
+    pos = 1
+    eof = False
+    while True:
+        # Skip whitespace and the comma between elements.
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buffer) or eof:
+                break
+            buffer, pos = f.read(chunk_size), 0
+            eof = not buffer
+        if pos >= len(buffer):
+            raise json.JSONDecodeError("Unterminated JSON array", buffer, pos)
+        if buffer[pos] == "]":
+            return
+        while True:
+            # A number cut by the chunk boundary ("-1." of "-1.5") decodes as a shorter one, so an
+            # element only counts once a separator follows it or the input has ended.
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+                if (end < len(buffer) and buffer[end] in " \t\r\n,]") or eof:
+                    break
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            more = f.read(chunk_size)
+            eof = not more
+            buffer, pos = buffer[pos:] + more, 0
+        yield value
+        pos = end
+        if pos > chunk_size:
+            buffer, pos = buffer[pos:], 0
+
+
+def read_records(path):
+    """Streams records from a .jsonl file (one per line) or a JSON array file."""
+    with open(path, "r", encoding="utf-8") as f:
+        if str(path).endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from iter_json_array(f)
+
+
+def write_records(records, path):
+    """
+    Writes records to `path` as they arrive, as JSONL or as the same indented
+    JSON array json.dump(records, f, indent=2) produces. The file is written
+    to a temp name and renamed, so readers never see a partial file.
+    Returns the number of records written.
+    """
+    path = Path(path)
+    jsonl = path.suffix == ".jsonl"
+    count = 0
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            for record in records:
+                if jsonl:
+                    f.write(json.dumps(record) + "\n")
+                else:
+                    f.write(",\n  " if count else "[\n  ")
+                    f.write(json.dumps(record, indent=2).replace("\n", "\n  "))
+                count += 1
+            if not jsonl:
+                f.write("\n]" if count else "[]")
+    except BaseException:
+        os.remove(tmp)
+        raise
+    os.replace(tmp, path)
+    return count
+
+
+def _batches(records, size):
+    batch, start = [], 0
+    for record in records:
+        batch.append(record)
+        if len(batch) == size:
+            yield start, batch
+            start += size
+            batch = []
+    if batch:
+        yield start, batch
+
+
+def _enrich_parallel(records, workers, batch_size):
+    """Enriches batches in a process pool, in order, with at most 2 batches per worker in flight."""
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for batch in _batches(records, batch_size):
+            pending.append(pool.submit(_enrich_batch, batch))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def enrich_data(input_file="data.json", output_file="processed_data.json", workers=None, batch_size=BATCH_SIZE):
     """Loads saved summaries, extracts title, author, and structured sections.
 
     By default, resolves files relative to this backend module so it reads/writes
-    the same files used by other backend modules.
+    the same files used by other backend modules. Records are streamed from
+    input to output, so memory does not grow with the input; a `.jsonl` path
+    on either side is read or written one record per line. `workers` > 1
+    spreads the work over a process pool, which pays off for large inputs.
     """
     base_dir = Path(os.path.dirname(__file__))
     path = Path(input_file)
@@ -49,40 +213,30 @@ def enrich_data(input_file="data.json", output_file="processed_data.json"):
         print(f"[ERROR] Could not find {path}")
         return
 
-    with open(input_file, "r") as f:
-        try:
-            data = json.load(f)
-        except json.JSONDecodeError:
-            print("[ERROR] data.json is empty or malformed.")
-            return
-
-    enriched = []
-    for i, record in enumerate(data):
-        summary = record.get("summary", "") if isinstance(record, dict) else str(record)
-        url = record.get("url", f"Unknown_{i}") if isinstance(record, dict) else f"Unknown_{i}"
-
-        author = extract_author(summary)
-        title = infer_title(summary)
-        sections = extract_sections(summary)
-
-        enriched.append({
-            "id": i + 1,
-            "url": url,
-            "author": author,
-            "title": title,
-            "summary": summary,
-            "sections": sections
-        })
-
     out_path = Path(output_file)
     if not out_path.is_absolute():
         out_path = base_dir.joinpath(output_file)
 
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(enriched, f, indent=2)
+    records = read_records(path)
+    if workers and workers > 1:
+        enriched = _enrich_parallel(records, workers, batch_size)
+    else:
+        enriched = (enrich_record(i, record) for i, record in enumerate(records))
+
+    try:
+        count = write_records(enriched, out_path)
+    except json.JSONDecodeError:
+        print(f"[ERROR] {path.name} is empty or malformed.")
+        return
 
-    print(f"[INFO] ✅ Enriched {len(enriched)} summaries → {out_path}")
+    print(f"[INFO] ✅ Enriched {count} summaries → {out_path}")
+    return out_path
 
 
 if __name__ == "__main__":
-    enrich_data()
+    parser = argparse.ArgumentParser(description="Extract title, author and sections from saved summaries.")
+    parser.add_argument("input", nargs="?", default="data.json", help="JSON array or .jsonl of summaries")
+    parser.add_argument("output", nargs="?", default="processed_data.json", help="JSON array or .jsonl to write")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size for large inputs")
+    args = parser.parse_args()
+    enrich_data(args.input, args.output, args.workers)
@@ -0,0 +1,302 @@
+# dedup.py
+"""
+Duplicate detection for ingestion.
+
+Exact duplicates are found by canonical PMC id, so the different URL forms
+of one article (www.ncbi.nlm.nih.gov/pmc/articles/PMC123, pmc.ncbi.nlm.nih.gov/
+articles/PMC123/, europepmc.org/article/PMC/PMC123, ...) are fetched once.
+Near duplicates (retitled reprints, the same paper listed twice) are found
+with MinHash signatures over shingles of the title or body text and
+locality-sensitive hashing: signatures are cut into bands, and only records
+sharing a band bucket are compared, so the work grows with the number of
+records rather than the number of pairs.
+
+    python dedup.py                     # report duplicates in SB_publication_PMC.csv
+    python dedup.py nih_data.json       # or in a JSON array of records
+"""
+import argparse
+import json
+import os
+import re
+import threading
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+from csv_index import normalize_title
+
+NUM_PERM = 128
+BANDS = 16              # 16 bands of 8 rows: pairs above ~0.75 Jaccard almost always meet in a bucket
+TITLE_THRESHOLD = 0.8   # estimated Jaccard of title character shingles
+BODY_THRESHOLD = 0.85   # estimated Jaccard of body word shingles
+TITLE_SHINGLE = 4       # characters
+BODY_SHINGLE = 5        # words
+BLOCK = 4096            # shingles hashed against all permutations at a time
+SEED = 20251004
+PMC_ARTICLE_URL = "https://www.ncbi.nlm.nih.gov/pmc/articles/{}/"
+
+_PMC_ID = re.compile(r"PMC\s*(\d+)", re.IGNORECASE)
+_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+_rng = np.random.default_rng(SEED)
+_A = _rng.integers(1, 2 ** 63, NUM_PERM, dtype=np.uint64) * np.uint64(2) + np.uint64(1)  # odd multipliers
+_B = _rng.integers(0, 2 ** 63, NUM_PERM, dtype=np.uint64)
+
+
+def pmc_id(url):
+    """'PMC4136787' for any URL form that names a PMC article, else None."""
+    match = _PMC_ID.search(url or "")
+    return f"PMC{match.group(1)}" if match else None
+
+
+def canonical_url(url):
+    """The www.ncbi.nlm.nih.gov/pmc/articles/PMC.../ form for PMC articles; other URLs trimmed."""
+    pmc = pmc_id(url)
+    if pmc:
+        return PMC_ARTICLE_URL.format(pmc)
+    return (url or "").strip().split("#")[0].rstrip("/") + "/"
+
+
+# -- MinHash --------------------------------------------------------------------
+
+def _crc(strings):
+    return np.fromiter((zlib.crc32(s.encode("utf-8")) for s in strings), dtype=np.uint64, count=len(strings))
+
+
+def title_shingles(title, k=TITLE_SHINGLE):
+    """Hashes of the character k-grams of the normalized title."""
+    text = normalize_title(title)
+    if not text:
+        return np.zeros(0, dtype=np.uint64)
+    return np.unique(_crc([text[i:i + k] for i in range(max(1, len(text) - k + 1))]))
+
+
+def body_shingles(text, k=BODY_SHINGLE):
+    """Hashes of the word k-grams of the normalized text, combined from per-word hashes."""
+    words = normalize_title(text).split()
+    if not words:
+        return np.zeros(0, dtype=np.uint64)
+    k = min(k, len(words))
+    hashes = _crc(words)
+    shingles = np.zeros(len(words) - k + 1, dtype=np.uint64)
+    for j in range(k):
+        shingles = shingles * _MULTIPLIER + hashes[j:len(words) - k + 1 + j]
+    return np.unique(shingles)
+
+
+def minhash(shingles):
+    """NUM_PERM-value MinHash signature (uint32) of a shingle hash array, or None when it is empty."""
+    if len(shingles) == 0:
+        return None
+    signature = np.full(NUM_PERM, np.iinfo(np.uint64).max, dtype=np.uint64)
+    for start in range(0, len(shingles), BLOCK):
+        block = shingles[start:start + BLOCK]
+        # Multiply-shift hashing: the top 32 bits of a*x + b (mod 2^64) for every permutation.
+        hashed = (_A[:, None] * block[None, :] + _B[:, None]) >> np.uint64(32)
+        np.minimum(signature, hashed.min(axis=1), out=signature)
+    return signature.astype(np.uint32)
+
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.mean(a == b))
+
+
+class LSHIndex:
+    """
+    MinHash signatures split into `bands` buckets each. best_match() only
+    compares against records that share at least one bucket.
+    """
+
+    def __init__(self, threshold, bands=BANDS):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = NUM_PERM // bands
+        self.signatures = {}
+        self.comparisons = 0  # signatures compared by best_match / match_or_add, for benchmarks
+        self._buckets = [defaultdict(list) for _ in range(bands)]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def _keys(self, signature):
+        return [signature[b * self.rows:(b + 1) * self.rows].tobytes() for b in range(self.bands)]
+
+    def _add(self, key, signature):
+        self.signatures[key] = signature
+        for bucket, band in zip(self._buckets, self._keys(signature)):
+            bucket[band].append(key)
+
+    def _remove(self, key):
+        signature = self.signatures.pop(key, None)
+        if signature is None:
+            return
+        for bucket, band in zip(self._buckets, self._keys(signature)):
+            bucket[band].remove(key)
+            if not bucket[band]:
+                del bucket[band]
+
+    def _best(self, signature, exclude=None):
+        candidates = set()
+        for bucket, band in zip(self._buckets, self._keys(signature)):
+            candidates.update(bucket.get(band, ()))
+        candidates.discard(exclude)
+        self.comparisons += len(candidates)
+        best, score = None, 0.0
+        for key in candidates:
+            s = similarity(signature, self.signatures[key])
+            if s > score or (s == score and best is not None and key < best):
+                best, score = key, s
+        return (best, score) if score >= self.threshold else (None, score)
+
+    def best_match(self, signature, exclude=None):
+        """(key, estimated similarity) of the closest record at or above the threshold, or (None, best score)."""
+        with self._lock:
+            return self._best(signature, exclude)
+
+    def add(self, key, signature):
+        with self._lock:
+            self._remove(key)
+            self._add(key, signature)
+
+    def remove(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def match_or_add(self, key, signature):
+        """
+        Atomically: returns (match, score) when an indexed record other than
+        `key` is a near duplicate; otherwise indexes `key` and returns (None, score).
+        """
+        with self._lock:
+            self._remove(key)
+            match, score = self._best(signature)
+            if match is None:
+                self._add(key, signature)
+            return match, score
+
+    def save(self, path):
+        with self._lock:
+            keys = list(self.signatures)
+            signatures = np.stack([self.signatures[k] for k in keys]) if keys else np.zeros((0, NUM_PERM), np.uint32)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = f"{path}.tmp.npz"
+        np.savez_compressed(tmp, keys=np.array(keys, dtype=str), signatures=signatures)
+        os.replace(tmp, path)
+
+    def load(self, path):
+        """Adds the signatures saved at `path`, if any. Returns how many were loaded."""
+        try:
+            with np.load(path) as data:
+                keys, signatures = data["keys"], data["signatures"]
+        except (OSError, ValueError, KeyError):
+            return 0
+        if signatures.shape[1:] != (NUM_PERM,):
+            return 0
+        with self._lock:
+            for key, signature in zip(keys.tolist(), signatures):
+                self._add(key, signature.copy())
+        return len(keys)
+
+
+# -- ingestion ------------------------------------------------------------------
+
+def dedup_rows(rows, title_threshold=TITLE_THRESHOLD):
+    """
+    Checks (title, url) rows before anything is fetched. Rows naming an
+    already seen PMC article are merged into it. Rows whose title is a near
+    duplicate of an earlier one are kept but reported, so the body check
+    after parsing can confirm them. Returns (kept rows, merges, similar titles),
+    where each merge is {"url", "into", "reason", "score"}.
+    """
+    kept, merges, similar = [], [], []
+    first = {}
+    titles = LSHIndex(title_threshold)
+    for title, url in rows:
+        key = pmc_id(url) or canonical_url(url)
+        if key in first:
+            if first[key] != url:
+                merges.append({"url": url, "into": first[key], "reason": "pmc_id", "score": 1.0})
+            continue
+        first[key] = url
+        kept.append((title, url))
+        signature = minhash(title_shingles(title))
+        if signature is None:
+            continue
+        match, score = titles.match_or_add(url, signature)
+        if match is not None:
+            similar.append({"url": url, "like": match, "reason": "title", "score": round(score, 3)})
+    return kept, merges, similar
+
+
+class BodyIndex:
+    """Near-duplicate check for parsed article text, persisted between pipeline runs."""
+
+    def __init__(self, path=None, threshold=BODY_THRESHOLD):
+        self.path = path
+        self.lsh = LSHIndex(threshold)
+        if path:
+            self.lsh.load(path)
+
+    def check(self, url, text):
+        """
+        Returns (canonical url, score) when `text` nearly duplicates an
+        indexed article other than `url`; otherwise indexes `url` and returns (None, score).
+        """
+        signature = minhash(body_shingles(text))
+        if signature is None:
+            self.lsh.remove(url)
+            return None, 0.0
+        return self.lsh.match_or_add(url, signature)
+
+    def save(self):
+        if self.path:
+            self.lsh.save(self.path)
+
+
+def find_duplicates(records, title_threshold=TITLE_THRESHOLD, body_threshold=BODY_THRESHOLD):
+    """
+    (merges, similar titles) for a list of records with url, title and
+    optionally text or summary. Records are merged by PMC id or by body text;
+    titles alone only get reported, since different papers often share all but
+    one word of a title ("ARG1 Functions in ..." / "HSFA2 Functions in ...").
+    """
+    rows = [(r.get("title") or r.get("Title") or "", r.get("url") or r.get("Link") or "") for r in records]
+    kept, merges, similar = dedup_rows(rows, title_threshold)
+    by_url = {(r.get("url") or r.get("Link")): r for r in records}
+    bodies = BodyIndex(threshold=body_threshold)
+    for _, url in kept:
+        text = (by_url.get(url) or {}).get("text") or (by_url.get(url) or {}).get("summary")
+        if not text:
+            continue
+        match, score = bodies.check(url, text if isinstance(text, str) else json.dumps(text))
+        if match is not None:
+            merges.append({"url": url, "into": match, "reason": "body", "score": round(score, 3)})
+    return merges, similar
+
+
+def print_merges(merges, similar=()):
+    for m in merges:
+        print(f"    merged {m['url']} -> {m['into']} ({m['reason']}, {m['score']:.2f})")
+    for s in similar:
+        print(f"    similar title {s['url']} ~ {s['like']} ({s['score']:.2f})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report duplicate publications.")
+    parser.add_argument("path", nargs="?", default=os.path.join(os.path.dirname(__file__), "SB_publication_PMC.csv"),
+                        help="publications CSV or JSON array of records")
+    args = parser.parse_args()
+
+    if args.path.endswith(".csv"):
+        import csv
+        with open(args.path, "r", encoding="utf-8-sig", newline="") as f:
+            records = list(csv.DictReader(f))
+    else:
+        with open(args.path, "r", encoding="utf-8") as f:
+            records = json.load(f)
+    merges, similar = find_duplicates(records)
+    print(f"[INFO] {len(records)} records, {len(merges)} duplicates, {len(similar)} similar titles:")
+    print_merges(merges, similar)
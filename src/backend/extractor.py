@@ -0,0 +1,113 @@
+# extractor.py
+import re
+
+from fetcher import get_fetcher
+from metrics import timed
+
+# Pick the fastest parser that is installed. selectolax is an order of
+# magnitude faster than BeautifulSoup; lxml speeds BeautifulSoup up when it
+# is the only option.
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+    BACKEND = "selectolax"
+except ImportError:
+    HTMLParser = None
+    try:
+        import lxml  # noqa: F401
+        BACKEND = "lxml"
+    except ImportError:
+        BACKEND = "html.parser"
+
+STRIP_TAGS = ['script', 'style', 'nav', 'header', 'footer', 'aside']
+_YEAR = re.compile(r"\b(1[89]\d\d|20\d\d)\b")
+
+
+def parse_year(citation: str):
+    """Pulls the publication year out of a PMC citation line like 'Sci Rep. 2014 Aug 18;4:5968.'"""
+    if not citation:
+        return "Unknown"
+    if "." in citation:
+        # Same slice the original scrapers used: the 4 chars after the journal name.
+        candidate = citation[citation.index(".") + 2: citation.index(".") + 6]
+        if candidate.isdigit():
+            return candidate
+    match = _YEAR.search(citation)
+    return match.group(1) if match else "Unknown"
+
+
+def _record(url, title, authors, citation, blocks):
+    """Builds the structured record from (tag, text) blocks in document order."""
+    sections = []
+    current = {"heading": None, "paragraphs": []}
+    paragraphs = []
+    for tag, text in blocks:
+        if tag == "h2":
+            if current["heading"] or current["paragraphs"]:
+                sections.append(current)
+            current = {"heading": text, "paragraphs": []}
+        elif text:
+            current["paragraphs"].append(text)
+            paragraphs.append(text)
+    if current["heading"] or current["paragraphs"]:
+        sections.append(current)
+
+    return {
+        "url": url,
+        "title": title,
+        "authors": authors,
+        "year": parse_year(citation),
+        "sections": sections,
+        "text": ' '.join(paragraphs).strip(),
+    }
+
+
+def _parse_selectolax(html, url):
+    tree = HTMLParser(html)
+
+    hgroup = tree.css_first('hgroup')
+    title = hgroup.text() if hgroup else ""
+    authors = [h.text() for h in tree.css('.cg.p h3')]
+    citation_node = tree.css_first('.pmc-layout__citation div')
+    citation = citation_node.text() if citation_node else ""
+
+    # Metadata above is read before stripping, since the title block can sit inside <header>.
+    tree.strip_tags(STRIP_TAGS)
+    blocks = [(node.tag, node.text(strip=True)) for node in tree.css('h2, p')]
+    return _record(url, title, authors, citation, blocks)
+
+
+def _parse_bs4(html, url, parser):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, parser)
+
+    hgroup = soup.find('hgroup')
+    title = hgroup.text if hgroup else ""
+    classes = soup.find(class_='cg p')
+    authors = [a.get_text() for a in classes.find_all('h3')] if classes else []
+    temp = soup.find(class_='pmc-layout__citation')
+    citation = temp.find('div').text if temp and temp.find('div') else ""
+
+    for tag in soup(STRIP_TAGS):
+        tag.decompose()
+    blocks = [(node.name, node.get_text(strip=True)) for node in soup.find_all(['h2', 'p'])]
+    return _record(url, title, authors, citation, blocks)
+
+
+def parse_article(html, url=None, backend=None):
+    """
+    Parses a PMC article page once and returns a structured record:
+    {url, title, authors (list), year, sections [{heading, paragraphs}], text}.
+    `text` is the same paragraph text scrape_article() has always returned.
+    """
+    backend = backend or BACKEND
+    with timed("html_parse"):
+        if backend == "selectolax":
+            return _parse_selectolax(html, url)
+        return _parse_bs4(html, url, backend)
+
+
+def fetch_article(url, fetcher=None):
+    """Fetches a PMC article with a single request and parses it with a single pass."""
+    res = (fetcher or get_fetcher()).get(url)
+    return parse_article(res.text, url)
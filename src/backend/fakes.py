@@ -0,0 +1,79 @@
+# fakes.py
+"""
+Offline stand-ins for google.generativeai, for benchmarks and local runs
+without an API key or network access.
+
+    from fakes import fake_model_factory
+    from llm_client import LLMClient, set_client
+    set_client(LLMClient(model_factory=fake_model_factory(latency=0.2, rate_limit_every=10)))
+"""
+import random
+import threading
+import time
+
+
+class ResourceExhausted(Exception):
+    """Same class name as google.api_core's 429 error, so llm_client treats it as a rate limit."""
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """
+    Mimics GenerativeModel.generate_content: sleeps `latency` seconds and echoes
+    a deterministic answer. Every `rate_limit_every`-th call raises
+    ResourceExhausted instead. With stream=True the answer is returned as an
+    iterator of `chunk_chars`-sized chunks: the first after `latency`, the rest
+    `chunk_delay` seconds apart; without it the call takes as long as the
+    whole stream would. The first-token latency can grow with the prompt
+    (`seconds_per_1k_chars`) and vary by up to `jitter` seconds.
+    """
+
+    def __init__(self, model_name="fake-model", latency=0.05, rate_limit_every=None, respond=None,
+                 chunk_chars=40, chunk_delay=0.01, seconds_per_1k_chars=0.0, jitter=0.0, seed=None):
+        self.model_name = model_name
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.respond = respond or (lambda prompt: f"[{self.model_name}] summary of {len(prompt)} chars")
+        self.chunk_chars = chunk_chars
+        self.chunk_delay = chunk_delay
+        self.seconds_per_1k_chars = seconds_per_1k_chars
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, stream=False):
+        with self._lock:
+            self.calls += 1
+            calls = self.calls
+        latency = self.latency + self.seconds_per_1k_chars * len(prompt) / 1000
+        if self.jitter:
+            latency += self._random.uniform(0, self.jitter)
+        if self.rate_limit_every and calls % self.rate_limit_every == 0:
+            time.sleep(latency)
+            raise ResourceExhausted("429 Resource has been exhausted (fake). retry_delay { seconds: 0 }")
+        text = self.respond(prompt)
+        if stream:
+            return self._stream(text, latency)
+        # A blocking call returns once the whole answer has been generated.
+        chunks = max(1, -(-len(text) // self.chunk_chars))
+        time.sleep(latency + self.chunk_delay * (chunks - 1))
+        return FakeResponse(text)
+
+    def _stream(self, text, latency):
+        time.sleep(latency)
+        for start in range(0, len(text), self.chunk_chars):
+            if start:
+                time.sleep(self.chunk_delay)
+            yield FakeResponse(text[start:start + self.chunk_chars])
+
+
+def fake_model_factory(**kwargs):
+    """A model_factory for LLMClient that hands out one FakeGenerativeModel per model name."""
+    def factory(model_name):
+        return FakeGenerativeModel(model_name, **kwargs)
+    return factory
@@ -0,0 +1,198 @@
+# fetcher.py
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import cache_result, log, timed
+
+DEFAULT_HEADERS = {'User-Agent': 'Mozilla/5.0'}
+MAX_WORKERS = 8
+RATE_PER_HOST = 3.0  # requests per second, NCBI's limit for clients without an API key
+BURST = 3
+RETRIES = 4
+BACKOFF = 1.0  # base seconds for exponential backoff
+MAX_BACKOFF = 30.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Blocking token bucket: `rate` tokens per second, holding at most `capacity` (initially `tokens`, default full)."""
+
+    def __init__(self, rate, capacity, tokens=None):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity if tokens is None else tokens
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def _retry_after(response):
+    """Seconds from a Retry-After header (delta or HTTP date), or None."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class Fetcher:
+    """
+    Concurrent HTTP fetcher shared by the scraping scripts.
+    One pooled requests.Session, a token bucket per host, bounded worker
+    threads, and retries with jittered exponential backoff on 429/5xx and
+    connection errors.
+
+    With an `archive` (html_archive.HTMLArchive) every page fetched is kept
+    on disk and later fetches of it are conditional requests; `replay=True`
+    serves pages from the archive only and never touches the network.
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS, rate=RATE_PER_HOST, burst=BURST,
+                 retries=RETRIES, backoff=BACKOFF, timeout=10, headers=None, archive=None, replay=False):
+        if replay and archive is None:
+            raise ValueError("replay needs an archive")
+        self.archive = archive
+        self.replay = replay
+        self.max_workers = max_workers
+        self.rate = rate
+        self.burst = burst
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        self.session.headers.update(headers or DEFAULT_HEADERS)
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._buckets = {}
+        self._buckets_lock = threading.Lock()
+
+    def _bucket(self, url):
+        host = urlsplit(url).netloc
+        with self._buckets_lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(self.rate, self.burst)
+            return self._buckets[host]
+
+    def _sleep_before_retry(self, attempt, response=None):
+        delay = _retry_after(response) if response is not None else None
+        if delay is None:
+            # "Full jitter" so many workers hitting the same 429 do not retry in lockstep.
+            delay = random.uniform(0, min(MAX_BACKOFF, self.backoff * 2 ** attempt))
+        time.sleep(delay)
+
+    def get(self, url, **kwargs):
+        """
+        Rate-limited GET with retries. Returns the final requests.Response;
+        raises for non-retryable HTTP errors or once retries run out.
+        Archived pages are revalidated, and a 304 is answered from the archive.
+        """
+        page = self.archive.get(url) if self.archive is not None else None
+        if self.replay:
+            cache_result("html_archive", page is not None)
+            if page is None:
+                from html_archive import ArchiveMiss
+                raise ArchiveMiss(f"{url} is not in the archive")
+            return page.response()
+        if page is not None:
+            kwargs["headers"] = {**page.conditional_headers(), **kwargs.get("headers", {})}
+
+        kwargs.setdefault("timeout", self.timeout)
+        bucket = self._bucket(url)
+        for attempt in range(self.retries + 1):
+            with timed("rate_limit_wait"):
+                bucket.acquire()
+            try:
+                with timed("http_fetch"):
+                    response = self.session.get(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.retries:
+                    raise
+                self._sleep_before_retry(attempt)
+                continue
+
+            if response.status_code in RETRY_STATUSES and attempt < self.retries:
+                log("WARN", "%s from %s, retry %d/%d", response.status_code, url, attempt + 1, self.retries)
+                self._sleep_before_retry(attempt, response)
+                continue
+            if response.status_code == 304 and page is not None:
+                cache_result("html_archive", True)
+                self.archive.touch(page)
+                return page.response()
+            response.raise_for_status()
+            if self.archive is not None:
+                cache_result("html_archive", False)
+                self.archive.put(url, response)
+            return response
+
+    def map(self, fn, items, label="Fetching"):
+        """
+        Runs fn(item) for every item on the worker pool and returns the results
+        in input order. Items whose call raises get None.
+        """
+        items = list(items)
+        results = [None] * len(items)
+        total = len(items)
+        start = time.monotonic()
+        done = 0
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(fn, item): i for i, item in enumerate(items)}
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    results[i] = future.result()
+                except Exception as e:
+                    log("ERROR", "%s %s: %s", label, items[i], e)
+                done += 1
+                log("INFO", "[%d/%d] %s (%.1f/s): %s", done, total, label,
+                    done / max(time.monotonic() - start, 1e-9), items[i])
+
+        return results
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def get_fetcher():
+    """Returns the process-wide Fetcher, creating it on first use."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            from html_archive import REPLAY, default_archive
+            _default = Fetcher(archive=default_archive(), replay=REPLAY)
+        return _default
+
+
+def set_fetcher(fetcher):
+    """Replaces the process-wide Fetcher, e.g. with one from fixture_server.FixtureServer."""
+    global _default
+    with _default_lock:
+        _default = fetcher
@@ -0,0 +1,157 @@
+# fixture_server.py
+"""
+Local stand-in for the sites the backend scrapes, for offline benchmarks.
+
+    from fetcher import set_fetcher
+    with FixtureServer(latency=0.05) as server:
+        set_fetcher(server.fetcher())
+        scrape_article("https://www.ncbi.nlm.nih.gov/pmc/articles/PMC4136787/")
+
+PMC article pages are answered from fixtures/pmc/<PMCID>.html. Ids without
+a recording get the first recorded page with the id added to its first
+article paragraph, so every URL has distinct text. The publications CSV is served
+from the local copy. Pages carry an ETag and Last-Modified and answer a
+matching If-None-Match with 304. The fetcher() it returns rewrites the real hosts to
+this server, so code under test keeps using the real URLs.
+"""
+import glob
+import hashlib
+import os
+import re
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from requests.adapters import HTTPAdapter
+
+from csv_index import CSV_PATH
+from fetcher import Fetcher
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+STAND_IN_HOSTS = ("https://www.ncbi.nlm.nih.gov", "https://pmc.ncbi.nlm.nih.gov", "https://raw.githubusercontent.com")
+_PMC_PATH = re.compile(r"/(PMC\d+)/?$")
+
+
+class _RewriteAdapter(HTTPAdapter):
+    """Sends requests for the real hosts to the stand-in server instead."""
+
+    def __init__(self, base_url, **kwargs):
+        super().__init__(**kwargs)
+        self.base_url = base_url
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        request.url = self.base_url + parts.path + (f"?{parts.query}" if parts.query else "")
+        return super().send(request, **kwargs)
+
+
+class FixtureServer:
+    def __init__(self, fixtures_dir=FIXTURES_DIR, csv_path=CSV_PATH, latency=0.0, host="127.0.0.1", port=0):
+        self.latency = latency
+        self.pages = {}
+        for path in sorted(glob.glob(os.path.join(fixtures_dir, "pmc", "*.html"))):
+            with open(path, "rb") as f:
+                self.pages[os.path.splitext(os.path.basename(path))[0].upper()] = f.read()
+        with open(csv_path, "rb") as f:
+            self.csv = f.read()
+        self.last_modified = formatdate(os.path.getmtime(csv_path), usegmt=True)
+        self.requests = 0
+        self.not_modified = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def local_url(self, url):
+        """`url` with its scheme and host replaced by this server's."""
+        parts = urlsplit(url)
+        return self.base_url + parts.path
+
+    def page(self, pmc_id):
+        pmc_id = pmc_id.upper()
+        if pmc_id in self.pages:
+            return self.pages[pmc_id]
+        if not self.pages:
+            return None
+        # Tag the first paragraph of the article body; banners before it are stripped by the extractor.
+        template = next(iter(self.pages.values()))
+        start = max(template.find(b"<article"), 0)
+        at = template.find(b"<p>", start)
+        if at < 0:
+            return template
+        return template[:at] + f"<p>{pmc_id}: ".encode("ascii") + template[at + 3:]
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, as the real sites allow
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                path = urlsplit(self.path).path
+                match = _PMC_PATH.search(path)
+                if match:
+                    body, ctype = server.page(match.group(1)), "text/html; charset=utf-8"
+                elif path.endswith(".csv"):
+                    body, ctype = server.csv, "text/csv; charset=utf-8"
+                else:
+                    body, ctype = None, None
+                if body is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                etag = '"%s"' % hashlib.sha1(body).hexdigest()[:16]
+                if self.headers.get("If-None-Match") == etag:
+                    with server._lock:
+                        server.not_modified += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", server.last_modified)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def fetcher(self, max_workers=8, rate=1000.0, burst=1000, **kwargs):
+        """A Fetcher whose requests to the real hosts land on this server. Rate limits default to effectively off."""
+        fetcher = Fetcher(max_workers=max_workers, rate=rate, burst=burst, **kwargs)
+        adapter = _RewriteAdapter(self.base_url, pool_connections=max_workers, pool_maxsize=max_workers)
+        for host in STAND_IN_HOSTS:
+            fetcher.session.mount(host, adapter)
+        return fetcher
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fixture-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -1,51 +1,77 @@
 # gemini_summarizer.py
-import os
-import google.generativeai as genai
-from dotenv import load_dotenv
-
-# Load API key securely
-load_dotenv()
-api_key = os.getenv("GOOGLE_API_KEY")
-if not api_key:
-    raise ValueError("[ERROR] Missing GOOGLE_API_KEY in environment or .env file.")
-genai.configure(api_key=api_key)
-
-def summarize_text(text: str):
-    """
-    Uses Gemini to produce a structured summary including title, author, and key sections.
-    Returns a dictionary formatted for your data pipeline.
-    """
-    if not text or len(text.strip()) == 0:
-        return {"error": "Empty input text"}
+from chunker import map_reduce
 
-    # Choose best available model
-    model = genai.GenerativeModel("gemini-2.5-pro")
+# The API key is loaded and checked by llm_client when the first model is built.
 
-    prompt = f"""
-    You are a scientific summarization assistant for NASA bioscience research.
-    Read the following article and output a JSON object with these fields:
+SUMMARY_MODEL = "gemini-2.5-pro"
+# Bump when the prompts below change so cached outputs are not reused.
+SUMMARY_PROMPT_VERSION = "structured-json-v2"
 
-    {{
+SUMMARY_FORMAT = """
+    {
       "title": "Concise, descriptive title",
       "author": "Main author name if identifiable, else Unknown",
       "summary": "Overall summary in 5–7 concise bullet points",
-      "sections": {{
+      "sections": {
         "Research Purpose": "...",
         "Methods Used": "...",
         "Key Findings": "...",
         "Conclusions": "...",
         "Implications & Future Work": "..."
-      }}
-    }}
+      }
+    }
+"""
+
 
+def summary_prompt(text):
+    return f"""
+    You are a scientific summarization assistant for NASA bioscience research.
+    Read the following article and output a JSON object with these fields:
+{SUMMARY_FORMAT}
     Keep the output machine-readable JSON only — no commentary or extra text.
     Article:
-    {text[:15000]}
+    {text}
+    """
+
+
+def chunk_prompt(chunk):
+    return f"""
+    You are a scientific summarization assistant for NASA bioscience research.
+    The following is one part of a longer article. Write concise notes on what
+    this part says about the research purpose, methods, findings, conclusions
+    and future work, skipping anything it does not cover. Keep names, numbers
+    and organisms exactly as written.
+    Part:
+    {chunk}
+    """
+
+
+def reduce_prompt(notes):
+    parts = "\n\n".join(f"Part {i}:\n{note}" for i, note in enumerate(notes, 1))
+    return f"""
+    You are a scientific summarization assistant for NASA bioscience research.
+    Below are notes on consecutive parts of one article. Combine them and output
+    a JSON object with these fields:
+{SUMMARY_FORMAT}
+    Keep the output machine-readable JSON only — no commentary or extra text.
+    Notes:
+    {parts}
+    """
+
+
+def summarize_text(text: str, sections=None):
     """
+    Uses Gemini to produce a structured summary including title, author, and key sections.
+    Long articles are summarized in chunks concurrently and then combined (see chunker.py);
+    pass the extractor's `sections` to split on section boundaries.
+    Returns a dictionary formatted for your data pipeline.
+    """
+    if not text or len(text.strip()) == 0:
+        return {"error": "Empty input text"}
 
     try:
-        response = model.generate_content(prompt)
-        raw_output = response.text.strip()
+        raw_output = map_reduce(SUMMARY_MODEL, SUMMARY_PROMPT_VERSION, text, summary_prompt,
+                                chunk_prompt, reduce_prompt, sections=sections).strip()
 
         # Gemini sometimes outputs fenced JSON ```json ... ```
         import re, json
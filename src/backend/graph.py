@@ -0,0 +1,375 @@
+# graph.py
+"""
+Precomputed knowledge graph for the frontend.
+
+Publications are linked by the Jaccard overlap of their keyword and author
+sets. Overlaps are computed with sparse matrix products in row blocks, and
+only each publication's top-k neighbours are kept, so memory stays linear in
+the number of publications. Neighbour lists are cached on disk and
+recomputed only for publications whose keywords or authors changed: those
+are rescored through an inverted index of features, so an edit costs the
+postings it touches rather than a new matrix.
+"""
+import hashlib
+import heapq
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+
+from search_index import normalize_keyword, parse_year, split_list
+
+GRAPH_CACHE_PATH = os.path.join(os.path.dirname(__file__), ".graph_cache.json")
+TOP_K = 5               # similarity edges drawn per publication
+KEEP = 2 * TOP_K        # neighbours kept per publication so edits can be applied incrementally
+MIN_JACCARD = 0.1
+MAX_DF = 0.5            # features on more than half of the publications link everything; ignore them
+MIN_DOCS_FOR_PRUNING = 50
+REBUILD_RATIO = 0.2     # full rebuild when this share of publications changed
+BLOCK_ROWS = 2048
+TOP_KEYWORDS = 20       # keyword hub nodes, as the client-side graph used to draw
+MAX_KEYWORDS_PER_PUB = 5
+
+
+def publication_features(record):
+    """Keyword and author features for one record, prefixed so they never collide."""
+    features = set()
+    for keyword in split_list(record.get("keywords")):
+        key = normalize_keyword(keyword)
+        if key:
+            features.add(f"kw:{key}")
+    for author in split_list(record.get("authors") or record.get("author")):
+        key = " ".join(author.casefold().split())
+        if key:
+            features.add(f"au:{key}")
+    return features
+
+
+def _feature_hash(features):
+    return hashlib.sha1("\n".join(sorted(features)).encode("utf-8")).hexdigest()
+
+
+def node_id(url):
+    return "pub-" + hashlib.sha1(url.encode("utf-8")).hexdigest()[:12]
+
+
+class GraphIndex:
+    def __init__(self, cache_path=GRAPH_CACHE_PATH, k=TOP_K, min_score=MIN_JACCARD):
+        self.cache_path = cache_path
+        self.k = k
+        self.keep = max(KEEP, k)
+        self.min_score = min_score
+        self.pruned = set()     # features ignored until the next full rebuild
+        self.hashes = {}        # url -> feature hash
+        self.neighbors = {}     # url -> [[url, score], ...] best first
+        self.records = {}       # url -> record
+        self.features = {}      # url -> feature set
+        self._postings = {}     # feature -> urls having it, pruned features left out
+        self._sizes = {}        # url -> number of its features that are not pruned
+        self._listed_by = None  # url -> urls whose neighbour list holds it, built on first use
+        self._load_cache()
+
+    # -- persistence -----------------------------------------------------
+
+    def _load_cache(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                cache = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[WARN] Ignoring unreadable graph cache {self.cache_path}: {e}")
+            return
+        if cache.get("k") != self.k or cache.get("min_score") != self.min_score:
+            return
+        self.pruned = set(cache.get("pruned", []))
+        self.hashes = cache.get("hashes", {})
+        self.neighbors = cache.get("neighbors", {})
+
+    def _save_cache(self):
+        if not self.cache_path:
+            return
+        data = {"k": self.k, "min_score": self.min_score, "pruned": sorted(self.pruned),
+                "hashes": self.hashes, "neighbors": self.neighbors}
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.cache_path)), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.cache_path)
+
+    # -- similarity ------------------------------------------------------
+
+    def _matrix(self, feature_sets):
+        """Binary CSR matrix (publications x features) without the pruned features, plus row sizes."""
+        vocab = {}
+        indptr = [0]
+        indices = []
+        for features in feature_sets:
+            for feature in features:
+                if feature not in self.pruned:
+                    indices.append(vocab.setdefault(feature, len(vocab)))
+            indptr.append(len(indices))
+        data = np.ones(len(indices), dtype=np.float32)
+        X = sparse.csr_matrix((data, indices, indptr), shape=(len(feature_sets), max(len(vocab), 1)))
+        sizes = np.diff(X.indptr).astype(np.float32)
+        return X, sizes
+
+    def _top_neighbors(self, X, XT, sizes, rows, urls):
+        """Top `keep` Jaccard neighbours for each row index in `rows`, one sparse product per block."""
+        result = {}
+        for start in range(0, len(rows), BLOCK_ROWS):
+            block = rows[start:start + BLOCK_ROWS]
+            inter = (X[block] @ XT).tocsr()
+            for n, row in enumerate(block):
+                lo, hi = inter.indptr[n], inter.indptr[n + 1]
+                cols = inter.indices[lo:hi]
+                counts = inter.data[lo:hi]
+                scores = counts / (sizes[row] + sizes[cols] - counts)
+                keep = (cols != row) & (scores >= self.min_score)
+                cols, scores = cols[keep], scores[keep]
+                if len(cols) > self.keep:
+                    top = np.argpartition(-scores, self.keep - 1)[:self.keep]
+                    cols, scores = cols[top], scores[top]
+                order = np.argsort(-scores, kind="stable")
+                result[urls[row]] = [[urls[c], round(float(s), 4)] for c, s in zip(cols[order], scores[order])]
+        return result
+
+    def update(self, records):
+        """
+        Brings the neighbour lists in line with `records`, the full set of
+        publications: those missing from it are dropped. Only publications
+        whose features changed are recomputed, unless enough changed that a
+        full rebuild is cheaper. Returns the number of rows recomputed.
+        """
+        by_url = {r["url"]: r for r in records if isinstance(r, dict) and r.get("url")}
+        removed = (set(self.hashes) | set(self.records)) - set(by_url)
+        return self._apply(by_url, removed)
+
+    def upsert(self, records):
+        """Like update(), but `records` are only the new or changed publications; the others stay."""
+        return self._apply({r["url"]: r for r in records if isinstance(r, dict) and r.get("url")}, ())
+
+    def _apply(self, by_url, removed):
+        dirty = set()
+        for url in removed:
+            self.records.pop(url, None)
+            self.hashes.pop(url, None)
+            self._set_features(url, None)
+            dirty.add(url)
+        for url, record in by_url.items():
+            features = publication_features(record)
+            feature_hash = _feature_hash(features)
+            self.records[url] = record
+            self._set_features(url, features)
+            if self.hashes.get(url) != feature_hash:
+                self.hashes[url] = feature_hash
+                dirty.add(url)
+        if not dirty:
+            return 0
+
+        if not self.neighbors or len(dirty) > REBUILD_RATIO * max(len(self.records), 1):
+            recomputed = self._rebuild()
+        else:
+            recomputed = self._incremental(dirty)
+        self._save_cache()
+        return recomputed
+
+    def _set_features(self, url, features):
+        """Records `url`'s features (None to forget it) in the inverted index used by _incremental."""
+        for feature in self.features.pop(url, ()):
+            posting = self._postings.get(feature)
+            if posting is not None:
+                posting.discard(url)
+        self._sizes.pop(url, None)
+        if features is None:
+            return
+        self.features[url] = features
+        kept = features - self.pruned
+        for feature in kept:
+            self._postings.setdefault(feature, set()).add(url)
+        self._sizes[url] = len(kept)
+
+    def _rebuild(self):
+        urls = list(self.records)
+        feature_sets = [self.features[u] for u in urls]
+        df = Counter(f for features in feature_sets for f in features)
+        if len(urls) >= MIN_DOCS_FOR_PRUNING:
+            self.pruned = {f for f, count in df.items() if count > MAX_DF * len(urls)}
+        else:
+            self.pruned = set()
+        self._postings, self._sizes = {}, {}
+        for url, features in zip(urls, feature_sets):
+            del self.features[url]
+            self._set_features(url, features)
+        X, sizes = self._matrix(feature_sets)
+        self.neighbors = self._top_neighbors(X, X.T.tocsr(), sizes, list(range(len(urls))), urls)
+        self._listed_by = None
+        return len(urls)
+
+    def _scores(self, url):
+        """{other url: Jaccard score} for every publication scoring at least min_score with `url`."""
+        overlap = Counter()
+        for feature in self.features[url] - self.pruned:
+            overlap.update(self._postings[feature])
+        overlap.pop(url, None)
+        size = self._sizes[url]
+        scores = {}
+        for other, count in overlap.items():
+            score = count / (size + self._sizes[other] - count)
+            if score >= self.min_score:
+                scores[other] = round(score, 4)
+        return scores
+
+    def _ranked(self, scores):
+        return [[u, s] for u, s in heapq.nlargest(self.keep, scores.items(), key=lambda p: p[1])]
+
+    def _incremental(self, dirty):
+        """
+        Recomputes the changed publications from the inverted index, then
+        patches every list that held one of them or should now: new scores
+        are merged in, and a full list whose weakest entry got weaker is
+        recomputed, since a publication left off it may now rank.
+        """
+        if self._listed_by is None:
+            self._listed_by = {}
+            for url, pairs in self.neighbors.items():
+                for other, _ in pairs:
+                    self._listed_by.setdefault(other, set()).add(url)
+
+        incoming = {}
+        fresh = {}
+        for url in dirty:
+            if url not in self.records:
+                continue
+            scores = self._scores(url)
+            fresh[url] = self._ranked(scores)
+            for other, score in scores.items():
+                incoming.setdefault(other, {})[url] = score
+
+        affected = set(incoming)
+        for url in dirty:
+            affected |= self._listed_by.get(url, set())
+        affected -= dirty
+        redo = []
+        for url in affected:
+            if url not in self.records:
+                continue
+            old = self.neighbors.get(url, [])
+            merged = {u: s for u, s in old if u not in dirty}
+            merged.update(incoming.get(url, {}))
+            ranked = self._ranked(merged)
+            # Publications left off a full list scored at most its weakest entry.
+            if len(old) >= self.keep and (len(ranked) < self.keep or ranked[-1][1] < old[-1][1]):
+                redo.append(url)
+            else:
+                fresh[url] = ranked
+        for url in redo:
+            fresh[url] = self._ranked(self._scores(url))
+
+        for url in dirty:
+            if url not in self.records:
+                self._set_neighbors(url, None)
+        for url, pairs in fresh.items():
+            self._set_neighbors(url, pairs)
+        return len(dirty & set(self.records)) + len(redo)
+
+    def _set_neighbors(self, url, pairs):
+        for other, _ in self.neighbors.pop(url, ()):
+            self._listed_by.get(other, set()).discard(url)
+        if pairs is None:
+            return
+        self.neighbors[url] = pairs
+        for other, _ in pairs:
+            self._listed_by.setdefault(other, set()).add(url)
+
+    # -- output ----------------------------------------------------------
+
+    def elements(self):
+        """Cytoscape elements: publication, year and top keyword nodes, plus year, keyword and similarity edges."""
+        elements = []
+        years = set()
+        keyword_counts = Counter()
+        pub_keywords = {}
+        for record in self.records.values():
+            year = parse_year(record)
+            if year:
+                years.add(str(year))
+            kws = [k.casefold() for k in split_list(record.get("keywords")) if len(k) > 3]
+            pub_keywords[record["url"]] = kws
+            keyword_counts.update(set(kws))
+        top_keywords = [k for k, _ in keyword_counts.most_common(TOP_KEYWORDS)]
+        top_set = set(top_keywords)
+
+        for year in sorted(years):
+            elements.append({"data": {"id": f"year-{year}", "label": year, "type": "year"}})
+        for keyword in top_keywords:
+            elements.append({"data": {"id": f"keyword-{keyword}", "label": keyword, "type": "keyword"}})
+
+        for record in self.records.values():
+            url = record["url"]
+            pub = node_id(url)
+            title = record.get("title", "")
+            year = parse_year(record)
+            elements.append({"data": {
+                "id": pub,
+                "label": title[:30] + "...",
+                "type": "publication",
+                "publication": {"title": title, "year": str(year) if year else "Unknown",
+                                "authors": record.get("authors", ""), "url": url},
+            }})
+            if year:
+                elements.append({"data": {"id": f"edge-{pub}-year-{year}", "source": pub,
+                                          "target": f"year-{year}", "type": "year"}})
+            for keyword in [k for k in pub_keywords[url] if k in top_set][:MAX_KEYWORDS_PER_PUB]:
+                elements.append({"data": {"id": f"edge-{pub}-keyword-{keyword}", "source": pub,
+                                          "target": f"keyword-{keyword}", "type": "keyword"}})
+
+        seen = set()
+        for url, neighbors in self.neighbors.items():
+            for other, score in neighbors[:self.k]:
+                pair = tuple(sorted((url, other)))
+                if pair in seen:
+                    continue
+                seen.add(pair)
+                a, b = node_id(pair[0]), node_id(pair[1])
+                elements.append({"data": {"id": f"edge-{a}-{b}", "source": a, "target": b,
+                                          "type": "similar", "weight": score}})
+        return elements
+
+
+class StorageGraph:
+    """GraphIndex fed from storage.py, with the Cytoscape JSON kept pre-serialized."""
+
+    SYNC_INTERVAL = 5.0  # seconds between checks for newly saved records
+
+    def __init__(self, cache_path=GRAPH_CACHE_PATH):
+        self.index = GraphIndex(cache_path)
+        self.synced_version = None
+        self._checked = 0.0
+        self._body = None
+        self._lock = threading.Lock()
+
+    def body(self):
+        """Returns a PreparedBody with the current elements, refreshing it when storage changed."""
+        from http_cache import PreparedBody
+        from publication_store import serialize
+        from storage import changes_since
+
+        now = time.monotonic()
+        with self._lock:
+            if self._body is not None and now - self._checked < self.SYNC_INTERVAL:
+                return self._body
+            self._checked = now
+            changes, latest = changes_since(self.synced_version)
+            if self.synced_version is None:
+                self.index.update(changes)
+            elif changes:
+                self.index.upsert(changes)
+            if changes or self._body is None:
+                self.synced_version = latest
+                self._body = PreparedBody(serialize(self.index.elements()))
+            return self._body
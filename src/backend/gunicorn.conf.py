@@ -0,0 +1,19 @@
+# gunicorn.conf.py
+"""
+Production settings for `gunicorn -c gunicorn.conf.py wsgi:app`.
+
+Threaded workers: a /summarize request, streamed or not, holds a thread,
+not a process, while its job runs on the worker's summary pool. Each worker
+builds its own indexes on first use; summaries are shared through the
+on-disk cache, so a job finished in one worker is a cache hit in the others.
+"""
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:5000")
+workers = int(os.getenv("WEB_CONCURRENCY", min(4, multiprocessing.cpu_count() + 1)))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "16"))
+timeout = 120           # a summary is a scrape plus a Gemini round trip
+graceful_timeout = 30
+keepalive = 5
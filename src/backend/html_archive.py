@@ -0,0 +1,245 @@
+# html_archive.py
+"""
+Compressed on-disk archive of fetched pages, keyed by URL.
+
+Fetcher stores every successful GET here together with its ETag and
+Last-Modified, so:
+  * when online, a page already in the archive is revalidated with
+    If-None-Match / If-Modified-Since and a 304 is answered from disk;
+  * in replay mode (FETCH_REPLAY=1, or Fetcher(replay=True)) nothing goes
+    to the network at all, so a change to the extraction code can re-parse
+    the whole corpus locally:
+
+    python pipeline.py --replay --stages fetched,parsed
+    python html_archive.py reparse
+
+Bodies are zstd compressed when the zstandard package is installed and
+gzip compressed otherwise; either kind can be read back.
+"""
+import argparse
+import glob
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from metrics import timed
+
+try:
+    import zstandard
+    CODEC = "zst"
+except ImportError:
+    zstandard = None
+    CODEC = "gz"
+
+ARCHIVE_DIR = os.getenv("HTML_ARCHIVE", os.path.join(os.path.dirname(__file__), ".html_archive"))
+REPLAY = os.getenv("FETCH_REPLAY", "").lower() in ("1", "true", "yes")
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 10
+KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+
+class ArchiveMiss(requests.RequestException):
+    """Raised in replay mode for a URL that was never archived."""
+
+
+def url_hash(url):
+    return hashlib.sha256(url.strip().encode("utf-8")).hexdigest()
+
+
+def _compress(data, codec):
+    if codec == "zst":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return gzip.compress(data, GZIP_LEVEL, mtime=0)
+
+
+def _decompress(data, codec):
+    if codec == "zst":
+        if zstandard is None:
+            raise RuntimeError("archive entry is zstd compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def _atomic_write(path, data):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+    except BaseException:
+        os.remove(tmp)
+        raise
+    os.replace(tmp, path)
+
+
+class ArchivedPage:
+    def __init__(self, meta, body):
+        self.meta = meta
+        self.body = body
+
+    @property
+    def url(self):
+        return self.meta["url"]
+
+    def conditional_headers(self):
+        """If-None-Match / If-Modified-Since for revalidating this page."""
+        headers = {}
+        if self.meta["headers"].get("ETag"):
+            headers["If-None-Match"] = self.meta["headers"]["ETag"]
+        if self.meta["headers"].get("Last-Modified"):
+            headers["If-Modified-Since"] = self.meta["headers"]["Last-Modified"]
+        return headers
+
+    def response(self):
+        """The archived page as a requests.Response, so callers cannot tell it from a fetched one."""
+        response = requests.Response()
+        response._content = self.body
+        response.status_code = self.meta["status"]
+        response.headers = CaseInsensitiveDict(self.meta["headers"])
+        response.encoding = self.meta.get("encoding")
+        response.url = self.url
+        response.reason = "OK"
+        return response
+
+
+class HTMLArchive:
+    """
+    One metadata JSON file and one compressed body per URL under `directory`,
+    sharded by hash prefix. Both are written to temp names and renamed, body
+    first, so a reader never sees metadata pointing at a partial body.
+    """
+
+    def __init__(self, directory=ARCHIVE_DIR, codec=CODEC):
+        self.directory = directory
+        self.codec = codec
+
+    def _meta_path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def __contains__(self, url):
+        return os.path.exists(self._meta_path(url_hash(url)))
+
+    def _load(self, meta_path):
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(os.path.join(os.path.dirname(meta_path), meta["body"]), "rb") as f:
+                body = _decompress(f.read(), meta["codec"])
+        except (OSError, ValueError, KeyError, RuntimeError):
+            return None
+        return ArchivedPage(meta, body)
+
+    def get(self, url):
+        """The archived page for `url`, or None."""
+        with timed("archive_read"):
+            return self._load(self._meta_path(url_hash(url)))
+
+    def put(self, url, response):
+        """Archives a successful response for `url` and returns the ArchivedPage."""
+        key = url_hash(url)
+        shard = os.path.join(self.directory, key[:2])
+        os.makedirs(shard, exist_ok=True)
+        now = time.time()
+        meta = {
+            "url": url,
+            "status": response.status_code,
+            "headers": {h: response.headers[h] for h in KEPT_HEADERS if h in response.headers},
+            "encoding": response.encoding,
+            "codec": self.codec,
+            "body": f"{key}.html.{self.codec}",
+            "sha256": hashlib.sha256(response.content).hexdigest(),
+            "size": len(response.content),
+            "fetched_at": now,
+            "checked_at": now,
+        }
+        with timed("archive_write"):
+            compressed = _compress(response.content, self.codec)
+            meta["stored_size"] = len(compressed)
+            _atomic_write(os.path.join(shard, meta["body"]), compressed)
+            _atomic_write(self._meta_path(key), json.dumps(meta).encode("utf-8"))
+        return ArchivedPage(meta, response.content)
+
+    def touch(self, page):
+        """Records that `page` was revalidated (the server answered 304 Not Modified)."""
+        page.meta["checked_at"] = time.time()
+        _atomic_write(self._meta_path(url_hash(page.url)), json.dumps(page.meta).encode("utf-8"))
+
+    def _meta_paths(self):
+        return sorted(glob.glob(os.path.join(self.directory, "*", "*.json")))
+
+    def urls(self):
+        urls = []
+        for path in self._meta_paths():
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    urls.append(json.load(f)["url"])
+            except (OSError, ValueError, KeyError):
+                continue
+        return urls
+
+    def pages(self):
+        """Yields every readable ArchivedPage."""
+        for path in self._meta_paths():
+            page = self._load(path)
+            if page is not None:
+                yield page
+
+    def stats(self):
+        pages = raw = stored = 0
+        for path in self._meta_paths():
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                continue
+            pages += 1
+            raw += meta.get("size", 0)
+            stored += meta.get("stored_size", 0)
+        return {"pages": pages, "raw_bytes": raw, "stored_bytes": stored,
+                "ratio": raw / stored if stored else 0.0}
+
+
+_default = None
+
+
+def default_archive():
+    """The archive under ARCHIVE_DIR, or None when HTML_ARCHIVE is set to off/0/empty."""
+    global _default
+    if ARCHIVE_DIR.lower() in ("", "0", "off", "false", "no"):
+        return None
+    if _default is None:
+        _default = HTMLArchive()
+    return _default
+
+
+def reparse(archive, backend=None):
+    """Parses every archived page with extractor.parse_article and returns the records."""
+    from extractor import parse_article
+
+    return [parse_article(page.response().text, page.url, backend=backend) for page in archive.pages()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or re-parse the raw HTML archive.")
+    parser.add_argument("command", choices=["stats", "reparse"])
+    parser.add_argument("--dir", default=ARCHIVE_DIR, help="archive directory")
+    parser.add_argument("--backend", default=None, help="extractor backend (selectolax, lxml, html.parser)")
+    args = parser.parse_args()
+
+    archive = HTMLArchive(args.dir)
+    if args.command == "stats":
+        s = archive.stats()
+        print(f"[INFO] {s['pages']} pages, {s['raw_bytes'] / 1e6:.1f} MB raw, "
+              f"{s['stored_bytes'] / 1e6:.1f} MB stored ({s['ratio']:.1f}x)")
+    else:
+        start = time.perf_counter()
+        records = reparse(archive, args.backend)
+        elapsed = time.perf_counter() - start
+        empty = sum(1 for r in records if not r["text"])
+        print(f"[INFO] ✅ Re-parsed {len(records)} archived pages in {elapsed:.2f}s "
+              f"({len(records) / max(elapsed, 1e-9):,.0f} pages/s), {empty} without text.")
@@ -0,0 +1,74 @@
+# http_cache.py
+import gzip
+import hashlib
+
+from flask import Response
+
+from metrics import cache_result, timed
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+MIN_COMPRESS_BYTES = 1024  # smaller bodies are not worth compressing
+
+
+class PreparedBody:
+    """
+    A JSON body serialized once and compressed once, with a strong ETag per
+    encoding, so repeated requests only pick bytes instead of re-encoding.
+    """
+
+    def __init__(self, body: bytes, mimetype="application/json"):
+        self.mimetype = mimetype
+        self.encodings = {"identity": body}
+        if len(body) >= MIN_COMPRESS_BYTES:
+            with timed("compress"):
+                self.encodings["gzip"] = gzip.compress(body, GZIP_LEVEL, mtime=0)
+                if brotli is not None:
+                    self.encodings["br"] = brotli.compress(body, quality=BROTLI_QUALITY)
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        # Strong ETags must differ between byte-different representations.
+        self.etags = {enc: f'"{digest}-{enc}"' if enc != "identity" else f'"{digest}"'
+                      for enc in self.encodings}
+
+    def __len__(self):
+        return len(self.encodings["identity"])
+
+
+def _pick_encoding(accept_encoding, available):
+    accepted = {part.split(";")[0].strip().lower() for part in (accept_encoding or "").split(",")}
+    for enc in ("br", "gzip"):
+        if enc in available and enc in accepted:
+            return enc
+    return "identity"
+
+
+def cached_response(prepared, request, max_age=0, headers=None):
+    """
+    Builds a Flask response for a PreparedBody: picks br/gzip/identity from
+    Accept-Encoding and answers 304 when If-None-Match carries our ETag.
+    """
+    encoding = _pick_encoding(request.headers.get("Accept-Encoding"), prepared.encodings)
+    etag = prepared.etags[encoding]
+
+    response_headers = {
+        "ETag": etag,
+        "Vary": "Accept-Encoding",
+        "Cache-Control": f"public, max-age={max_age}" if max_age else "no-cache",
+    }
+    response_headers.update(headers or {})
+
+    if_none_match = request.headers.get("If-None-Match", "")
+    if if_none_match:
+        not_modified = etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+        cache_result("http_etag", not_modified)
+        if not_modified:
+            return Response(status=304, headers=response_headers)
+
+    if encoding != "identity":
+        response_headers["Content-Encoding"] = encoding
+    return Response(prepared.encodings[encoding], mimetype=prepared.mimetype, headers=response_headers)
@@ -0,0 +1,264 @@
+# llm_client.py
+"""
+Shared Gemini client.
+
+Every backend entry point goes through one LLMClient so that model objects
+are reused, requests run concurrently within a requests-per-minute and
+tokens-per-minute budget, rate-limit and transient errors are retried with
+backoff, and identical prompts already in flight are only sent once.
+"""
+import hashlib
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from fetcher import TokenBucket
+from metrics import STAGE_SECONDS, timed
+
+DEFAULT_RPM = int(os.getenv("GEMINI_RPM", "60"))
+DEFAULT_TPM = int(os.getenv("GEMINI_TPM", "1000000"))
+MAX_WORKERS = int(os.getenv("GEMINI_WORKERS", "8"))
+RETRIES = 5
+BACKOFF = 2.0
+MAX_BACKOFF = 60.0
+LATENCY_WINDOW = 1000  # recent calls kept for latency percentiles
+
+RATE_LIMIT_ERRORS = {"ResourceExhausted", "TooManyRequests"}
+TRANSIENT_ERRORS = {"ServiceUnavailable", "InternalServerError", "DeadlineExceeded", "GatewayTimeout"}
+_RETRY_DELAY = re.compile(r"retry[_ ]delay\D*(\d+(?:\.\d+)?)", re.IGNORECASE)
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token), good enough for budgeting."""
+    return len(text or "") // 4 + 1
+
+
+def _is_rate_limit(error):
+    return type(error).__name__ in RATE_LIMIT_ERRORS or "429" in str(error)
+
+
+def _is_transient(error):
+    return type(error).__name__ in TRANSIENT_ERRORS or isinstance(error, (ConnectionError, TimeoutError))
+
+
+def default_model_factory(model_name):
+    """Builds a real google.generativeai model, configuring the API key on first use."""
+    import google.generativeai as genai
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        raise ValueError("[ERROR] Missing GOOGLE_API_KEY in environment or .env file.")
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(model_name)
+
+
+def per_minute_bucket(limit, burst):
+    """
+    A TokenBucket that lets at most `limit` through in any minute: `burst` is
+    available straight away and the rest of the budget refills over the
+    minute, so burst plus refill never exceeds the quota even from cold.
+    """
+    burst = max(0, min(burst, limit - 1))
+    return TokenBucket((limit - burst) / 60.0, max(1, burst), tokens=burst)
+
+
+class _Text:
+    def __init__(self, text):
+        self.text = text
+
+
+class ModelHandle:
+    """Looks like a GenerativeModel to callers, but routes generate_content through the client."""
+
+    def __init__(self, client, model_name):
+        self.client = client
+        self.model_name = model_name
+
+    def generate_content(self, prompt):
+        return _Text(self.client.generate(self.model_name, prompt))
+
+
+class LLMClient:
+    def __init__(self, model_factory=default_model_factory, rpm=DEFAULT_RPM, tpm=DEFAULT_TPM,
+                 max_workers=MAX_WORKERS, retries=RETRIES, backoff=BACKOFF):
+        self.model_factory = model_factory
+        self.retries = retries
+        self.backoff = backoff
+        self.max_workers = max_workers
+        self._requests = per_minute_bucket(rpm, rpm // 6)
+        self._tokens = per_minute_bucket(tpm, tpm // 2)
+        self._token_capacity = self._tokens.capacity
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm")
+        self._models = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+        self.started = time.monotonic()
+        self.counts = {"requests": 0, "completed": 0, "errors": 0, "retries": 0,
+                       "rate_limited": 0, "deduplicated": 0, "prompt_tokens": 0}
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    # -- models ----------------------------------------------------------
+
+    def _model(self, model_name):
+        with self._lock:
+            if model_name not in self._models:
+                self._models[model_name] = self.model_factory(model_name)
+            return self._models[model_name]
+
+    def model(self, model_name):
+        """Returns a GenerativeModel-like handle for `model_name` that uses this client."""
+        return ModelHandle(self, model_name)
+
+    # -- requests --------------------------------------------------------
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self.counts[key] += n
+
+    def _backoff(self, attempt, error):
+        match = _RETRY_DELAY.search(str(error))
+        delay = float(match.group(1)) if match else random.uniform(0, min(MAX_BACKOFF, self.backoff * 2 ** attempt))
+        time.sleep(delay)
+
+    def _call(self, model_name, prompt):
+        tokens = min(estimate_tokens(prompt), self._token_capacity)
+        for attempt in range(self.retries + 1):
+            self._requests.acquire()
+            self._tokens.acquire(tokens)
+            self._count("requests")
+            self._count("prompt_tokens", tokens)
+            start = time.monotonic()
+            try:
+                with timed("llm_call"):
+                    response = self._model(model_name).generate_content(prompt).text
+            except Exception as e:
+                retryable = _is_rate_limit(e) or _is_transient(e)
+                if _is_rate_limit(e):
+                    self._count("rate_limited")
+                if not retryable or attempt == self.retries:
+                    self._count("errors")
+                    raise
+                self._count("retries")
+                self._backoff(attempt, e)
+                continue
+            with self._lock:
+                self.latencies.append(time.monotonic() - start)
+                self.counts["completed"] += 1
+            return response
+
+    def submit(self, model_name, prompt):
+        """
+        Schedules a request and returns a Future for its text. A prompt that is
+        already in flight for the same model shares the existing Future.
+        """
+        key = hashlib.sha256(f"{model_name}\0{prompt}".encode("utf-8")).hexdigest()
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.counts["deduplicated"] += 1
+                return future
+            future = self._pool.submit(self._call, model_name, prompt)
+            self._inflight[key] = future
+
+        def done(_, key=key):
+            with self._lock:
+                self._inflight.pop(key, None)
+
+        future.add_done_callback(done)
+        return future
+
+    def generate(self, model_name, prompt):
+        """Blocking generate: returns the response text."""
+        return self.submit(model_name, prompt).result()
+
+    def map(self, model_name, prompts):
+        """Runs all prompts concurrently within the budget and returns their texts in order."""
+        futures = [self.submit(model_name, p) for p in prompts]
+        return [f.result() for f in futures]
+
+    def stream(self, model_name, prompt):
+        """
+        Yields the response text in chunks as the model produces them, via
+        generate_content(prompt, stream=True), within the same budget as
+        generate(). Errors are retried only until the first chunk arrives.
+        Runs on the caller's thread, not the pool.
+        """
+        tokens = min(estimate_tokens(prompt), self._token_capacity)
+        for attempt in range(self.retries + 1):
+            self._requests.acquire()
+            self._tokens.acquire(tokens)
+            self._count("requests")
+            self._count("prompt_tokens", tokens)
+            start = time.monotonic()
+            started = False
+            try:
+                for chunk in self._model(model_name).generate_content(prompt, stream=True):
+                    text = chunk.text
+                    if text:
+                        if not started:
+                            STAGE_SECONDS.observe(time.monotonic() - start, stage="llm_first_chunk")
+                        started = True
+                        yield text
+            except Exception as e:
+                retryable = not started and (_is_rate_limit(e) or _is_transient(e))
+                if _is_rate_limit(e):
+                    self._count("rate_limited")
+                if not retryable or attempt == self.retries:
+                    self._count("errors")
+                    raise
+                self._count("retries")
+                self._backoff(attempt, e)
+                continue
+            STAGE_SECONDS.observe(time.monotonic() - start, stage="llm_call")
+            with self._lock:
+                self.latencies.append(time.monotonic() - start)
+                self.counts["completed"] += 1
+            return
+
+    # -- metrics ---------------------------------------------------------
+
+    def metrics(self):
+        with self._lock:
+            counts = dict(self.counts)
+            latencies = sorted(self.latencies)
+            in_flight = len(self._inflight)
+        elapsed = time.monotonic() - self.started
+
+        def pct(p):
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))], 4) if latencies else None
+
+        counts.update({
+            "in_flight": in_flight,
+            "throughput_per_s": round(counts["completed"] / elapsed, 4) if elapsed else 0.0,
+            "latency_p50_s": pct(0.5),
+            "latency_p95_s": pct(0.95),
+            "latency_max_s": round(latencies[-1], 4) if latencies else None,
+        })
+        return counts
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def get_client():
+    """Returns the process-wide LLMClient, creating it on first use."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = LLMClient()
+        return _default
+
+
+def set_client(client):
+    """Replaces the process-wide client, e.g. with one built on fakes.FakeGenerativeModel."""
+    global _default
+    with _default_lock:
+        _default = client
@@ -1,7 +1,10 @@
 # main.py
 from scraper import scrape_all_from_csv
 from geminiSummarizer import summarize_text
-from storage import save_results
+from storage import save_results, export_json
+from llm_client import get_client
+from metrics import report, timed
+from concurrent.futures import ThreadPoolExecutor
 
 CSV_URL = "https://raw.githubusercontent.com/jgalazka/SB_publications/main/SB_publication_PMC.csv"
 
@@ -9,9 +12,16 @@ if __name__ == "__main__":
     data = scrape_all_from_csv(CSV_URL, limit=3)
     results = []
 
-    for url, text in data.items():
+    # Summaries run concurrently; the shared client keeps them within the Gemini quota.
+    def summarize(text):
+        with timed("summarize"):
+            return summarize_text(text)
+
+    with ThreadPoolExecutor(max_workers=get_client().max_workers) as pool:
+        summaries = list(pool.map(summarize, data.values()))
+
+    for url, summary_data in zip(data, summaries):
         print(f"\n---- SUMMARY for {url} ----")
-        summary_data = summarize_text(text)
 
         # Attach URL if not already included
         if isinstance(summary_data, dict):
@@ -27,6 +37,9 @@ if __name__ == "__main__":
 
     if results:
         save_results(results)
-        print(f"\n[INFO] ✅ Saved {len(results)} results to data.json")
+        export_json()
+        print(f"\n[INFO] ✅ Saved {len(results)} results")
     else:
         print("[INFO] No successful summaries generated.")
+    print(f"[INFO] Gemini client: {get_client().metrics()}")
+    report("main.py")
@@ -0,0 +1,207 @@
+# metrics.py
+"""
+In-process metrics for the Flask APIs and the ingestion scripts.
+
+    with timed("html_parse"):
+        ...
+
+records the duration in the backend_stage_seconds histogram. Both Flask
+apps expose everything in the Prometheus text format on /metrics (see
+instrument()), and command line runs print report() when they finish.
+
+Logging on hot paths goes through log(), which is gated by the LOG_LEVEL
+environment variable. Arguments are only %-formatted when the level is
+enabled, so a disabled call costs one comparison.
+"""
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+LOG_LEVELS = {"DEBUG": 10, "INFO": 20, "WARN": 30, "ERROR": 40}
+LOG_LEVEL = LOG_LEVELS.get(os.getenv("LOG_LEVEL", "INFO").upper(), LOG_LEVELS["INFO"])
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def log_enabled(level):
+    return LOG_LEVELS[level] >= LOG_LEVEL
+
+
+def log(level, message, *args):
+    """Prints "[LEVEL] message" when LOG_LEVEL allows it, formatting `message % args` only then."""
+    if LOG_LEVELS[level] >= LOG_LEVEL:
+        print(f"[{level}] " + (message % args if args else message))
+
+
+def _label_key(labelnames, labels):
+    if set(labels) != set(labelnames):
+        raise ValueError(f"expected labels {labelnames}, got {tuple(labels)}")
+    return tuple(str(labels[name]) for name in labelnames)
+
+
+def _format_labels(labelnames, key, extra=""):
+    parts = [f'{name}="{value}"' for name, value in zip(labelnames, key)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=(), registry=None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).append(self)
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_label_key(self.labelnames, labels), 0)
+
+    def samples(self):
+        with self._lock:
+            return dict(self._values)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.samples().items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}   # labels -> [bucket counts..., +Inf count, sum, max]
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).append(self)
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0, 0.0]
+            series[i] += 1
+            series[-2] += value
+            series[-1] = max(series[-1], value)
+
+    def samples(self):
+        """{labels: {"count", "sum", "max", "buckets": [(le, cumulative count)]}}."""
+        with self._lock:
+            raw = {key: list(series) for key, series in self._series.items()}
+        result = {}
+        for key, series in raw.items():
+            cumulative, buckets = 0, []
+            for le, count in zip(self.buckets + (float("inf"),), series[:-2]):
+                cumulative += count
+                buckets.append((le, cumulative))
+            result[key] = {"count": cumulative, "sum": series[-2], "max": series[-1], "buckets": buckets}
+        return result
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, sample in sorted(self.samples().items()):
+            for le, count in sample["buckets"]:
+                bound = "+Inf" if le == float("inf") else repr(float(le))
+                le_label = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le_label)} {count}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {sample['sum']:.6f}")
+            lines.append(f"{self.name}_count{labels} {sample['count']}")
+        return lines
+
+
+REGISTRY = []
+
+STAGE_SECONDS = Histogram("backend_stage_seconds",
+                          "Time spent per stage (csv_lookup, http_fetch, html_parse, llm_call, json_serialize, ...).",
+                          ["stage"])
+STAGE_ERRORS = Counter("backend_stage_errors_total", "Stages that raised.", ["stage"])
+CACHE_REQUESTS = Counter("backend_cache_requests_total", "Cache lookups by cache and result (hit/miss).",
+                         ["cache", "result"])
+HTTP_REQUESTS = Histogram("backend_http_request_seconds", "Flask request latency by endpoint and status.",
+                          ["endpoint", "method", "status"])
+
+
+@contextmanager
+def timed(stage):
+    """Times the block into backend_stage_seconds{stage=...}; exceptions are counted and re-raised."""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+
+
+def cache_result(cache, hit):
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def render():
+    """All registered metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def report(title="Run"):
+    """Prints per-stage timings and cache hit rates for this process and returns them as a dict."""
+    stages = {key[0]: sample for key, sample in STAGE_SECONDS.samples().items()}
+    errors = {key[0]: value for key, value in STAGE_ERRORS.samples().items()}
+    caches = {}
+    for (cache, result), value in CACHE_REQUESTS.samples().items():
+        caches.setdefault(cache, {"hit": 0, "miss": 0})[result] += value
+
+    print(f"[INFO] {title} timing report")
+    print(f"    {'stage':<16} {'count':>7} {'total s':>9} {'mean ms':>9} {'max ms':>9} {'errors':>7}")
+    for stage, s in sorted(stages.items(), key=lambda item: -item[1]["sum"]):
+        mean = s["sum"] / s["count"] * 1000 if s["count"] else 0.0
+        print(f"    {stage:<16} {s['count']:>7} {s['sum']:>9.2f} {mean:>9.1f} {s['max'] * 1000:>9.1f} "
+              f"{errors.get(stage, 0):>7}")
+    for cache, counts in sorted(caches.items()):
+        total = counts["hit"] + counts["miss"]
+        print(f"    cache {cache}: {counts['hit']}/{total} hits ({counts['hit'] / total:.0%})")
+
+    return {
+        "stages": {stage: {"count": s["count"], "total_s": s["sum"], "max_s": s["max"],
+                           "errors": errors.get(stage, 0)} for stage, s in stages.items()},
+        "caches": caches,
+    }
+
+
+def instrument(app):
+    """Adds request latency tracking and a /metrics endpoint to a Flask app."""
+    from flask import Response, g, request
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _record(response):
+        start = g.pop("_metrics_start", None)
+        if start is not None:
+            HTTP_REQUESTS.observe(time.perf_counter() - start, endpoint=request.endpoint or "unknown",
+                                  method=request.method, status=response.status_code)
+        return response
+
+    @app.route("/metrics")
+    def metrics():
+        return Response(render(), mimetype="text/plain; version=0.0.4")
+
+    return app
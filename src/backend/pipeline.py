@@ -0,0 +1,439 @@
+# pipeline.py
+"""
+Incremental, resumable ingestion pipeline for SB_publication_PMC.csv.
+
+Every publication moves through the stages fetched -> parsed -> keywords ->
+summarized. Progress is checkpointed to a manifest every few seconds, so a
+crashed run resumes close to where it stopped and a rerun only touches new
+or changed rows.
+
+Duplicates are merged on the way in (see dedup.py): rows naming a PMC article
+already listed are never fetched, and an article whose parsed text nearly
+duplicates one already ingested is recorded as a duplicate of it instead of
+being summarized again. Each run writes what it merged to .pipeline/merges.json.
+
+Usage:
+    python pipeline.py                          # all stages, every publication
+    python pipeline.py --stages fetched,parsed  # metadata only, no Gemini calls
+    python pipeline.py --limit 50 --revalidate
+    python pipeline.py --replay --stages fetched,parsed   # re-parse from .html_archive/, offline
+    python pipeline.py --no-dedup               # ingest duplicates as separate publications
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from csv_index import CSV_PATH
+from dedup import BodyIndex, dedup_rows, print_merges
+from extractor import parse_article
+from fetcher import Fetcher, get_fetcher
+from metrics import report, timed
+
+STAGES = ("fetched", "parsed", "keywords", "summarized")
+LLM_STAGES = ("keywords", "summarized")
+WORK_DIR = os.path.join(os.path.dirname(__file__), ".pipeline")
+MANIFEST_PATH = os.path.join(WORK_DIR, "manifest.json")
+DEDUP_INDEX_PATH = os.path.join(WORK_DIR, "minhash.npz")
+MERGES_PATH = os.path.join(WORK_DIR, "merges.json")
+SAVE_EVERY = 10  # records buffered before each save_results() call
+CHECKPOINT_INTERVAL = 5.0  # seconds between manifest writes during a run; the end of a run always writes
+
+
+def sha256(text: str):
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def _atomic_write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def read_csv_rows(path=CSV_PATH):
+    """Returns [(title, url)] from the publications CSV, skipping blank rows."""
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        rows = []
+        for row in csv.DictReader(f):
+            title = (row.get("Title") or "").strip()
+            url = (row.get("Link") or "").strip()
+            if url:
+                rows.append((title, url))
+        return rows
+
+
+class Manifest:
+    """
+    Per-URL stage status and content hashes, persisted as JSON.
+
+    entries[url] = {
+        "source_hash":  hash of the CSV row,
+        "html_hash":    hash of the fetched page,
+        "content_hash": hash of the parsed body text,
+        "stages":       {stage: finished_at},
+        "saved":        True once the record reached storage,
+        "error":        last error message, if any,
+        "duplicate_of": url this one was merged into, if it is a duplicate,
+        "duplicates":   urls merged into this one,
+    }
+
+    Entries are only changed through the methods below, under the lock that
+    checkpoint() holds while serializing them.
+    """
+
+    def __init__(self, path=MANIFEST_PATH):
+        self.path = path
+        self.entries = {}
+        self._lock = threading.RLock()
+        self._written = 0.0
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f).get("entries", {})
+            except (OSError, ValueError) as e:
+                print(f"[WARN] Could not read manifest {path}: {e}. Starting fresh.")
+
+    def checkpoint(self, force=False):
+        """Writes the manifest, at most every CHECKPOINT_INTERVAL seconds unless `force`."""
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._written < CHECKPOINT_INTERVAL:
+                return
+            with timed("checkpoint"):
+                _atomic_write_json(self.path, {"updated": time.time(), "entries": self.entries})
+            self._written = now
+
+    def entry(self, url):
+        with self._lock:
+            return self.entries.setdefault(url, {"stages": {}, "saved": False})
+
+    def sync_sources(self, rows):
+        """Registers CSV rows, resetting any URL whose row changed. Returns the number of new/changed rows."""
+        changed = 0
+        with self._lock:
+            for title, url in rows:
+                source_hash = sha256(f"{title}\n{url}")
+                entry = self.entry(url)
+                if entry.get("source_hash") != source_hash:
+                    entry.update({"source_hash": source_hash, "stages": {}, "saved": False})
+                    self.unmerge(url)
+                    changed += 1
+        return changed
+
+    def get(self, url, field, default=None):
+        with self._lock:
+            return self.entry(url).get(field, default)
+
+    def pending(self, url, stages):
+        with self._lock:
+            entry = self.entry(url)
+            return [s for s in stages if s not in entry["stages"]]
+
+    def mark(self, url, stage, **fields):
+        with self._lock:
+            entry = self.entry(url)
+            entry["stages"][stage] = time.time()
+            entry.update(fields)
+
+    def reset(self, url, stages):
+        with self._lock:
+            entry = self.entry(url)
+            for stage in stages:
+                entry["stages"].pop(stage, None)
+            entry["saved"] = False
+
+    def fail(self, url, error):
+        with self._lock:
+            self.entry(url)["error"] = str(error)
+
+    def clear_error(self, url):
+        with self._lock:
+            self.entry(url).pop("error", None)
+
+    def mark_saved(self, urls):
+        with self._lock:
+            for url in urls:
+                self.entry(url)["saved"] = True
+
+    def duplicates(self, url):
+        with self._lock:
+            return list(self.entry(url).get("duplicates", []))
+
+    def merge(self, url, into, **fields):
+        """Records `url` as a duplicate of `into`."""
+        with self._lock:
+            self.unmerge(url)
+            self.entry(url).update({"duplicate_of": into, "merge": fields})
+            duplicates = self.entry(into).setdefault("duplicates", [])
+            if url not in duplicates:
+                duplicates.append(url)
+
+    def unmerge(self, url):
+        with self._lock:
+            entry = self.entry(url)
+            into = entry.pop("duplicate_of", None)
+            entry.pop("merge", None)
+            if into and url in self.entry(into).get("duplicates", []):
+                self.entry(into)["duplicates"].remove(url)
+
+
+def _work_path(url):
+    return os.path.join(WORK_DIR, "records", f"{sha256(url)[:32]}.json")
+
+
+def load_work_record(url):
+    try:
+        with open(_work_path(url), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_work_record(record):
+    _atomic_write_json(_work_path(record["url"]), record)
+
+
+def to_storage_record(record):
+    """Shapes a work record like the entries collect_info.py has always written to nih_data.json."""
+    out = {
+        "url": record["url"],
+        "title": record.get("title", ""),
+        "authors": ", ".join(record.get("authors") or []) or "unknown",
+        "date": record.get("year", "Unknown"),
+    }
+    if "keywords" in record:
+        out["keywords"] = record["keywords"]
+    if "summary" in record:
+        out["summary"] = record["summary"]
+        out["sections"] = record.get("summary_sections")
+    return out
+
+
+class Pipeline:
+    def __init__(self, stages=STAGES, manifest=None, fetcher=None, llm_workers=4, revalidate=False, dedup=True,
+                 dedup_index=DEDUP_INDEX_PATH):
+        self.stages = [s for s in STAGES if s in stages]
+        self.manifest = manifest or Manifest()
+        self.fetcher = fetcher or get_fetcher()
+        self.llm_workers = llm_workers
+        self.revalidate = revalidate
+        self.bodies = BodyIndex(dedup_index) if dedup else None
+        self.merges = []
+        self._buffer = []
+        self._buffer_lock = threading.Lock()
+
+    # -- stages ----------------------------------------------------------
+
+    def _fetch_and_parse(self, url):
+        res = self.fetcher.get(url)
+        html_hash = sha256(res.text)
+        self.manifest.mark(url, "fetched", html_hash=html_hash)
+
+        article = parse_article(res.text, url)
+        content_hash = sha256(article["text"])
+        if self.manifest.get(url, "content_hash") not in (None, content_hash):
+            # The article text changed, so keywords/summary are stale.
+            self.manifest.reset(url, LLM_STAGES)
+            previous = {}
+        else:
+            previous = load_work_record(url) or {}
+        self.manifest.mark(url, "parsed", content_hash=content_hash)
+
+        for key in ("keywords", "summary", "summary_sections"):
+            if key in previous:
+                article[key] = previous[key]
+        save_work_record(article)
+        return article
+
+    def _keywords(self, record):
+        from collect_info import extract_keywords
+        with timed("keywords"):
+            keywords = extract_keywords(record["text"], record.get("sections"))
+        if not keywords:
+            raise RuntimeError("no keywords returned")
+        return {"keywords": keywords}
+
+    def _summarize(self, record):
+        from geminiSummarizer import summarize_text
+        with timed("summarize"):
+            result = summarize_text(record["text"], record.get("sections"))
+        if "error" in result:
+            raise RuntimeError(result["error"])
+        return {"summary": result.get("summary"), "summary_sections": result.get("sections")}
+
+    # -- driver ----------------------------------------------------------
+
+    def process(self, url, llm_pool):
+        self.manifest.clear_error(url)
+        pending = self.manifest.pending(url, self.stages)
+        if self.revalidate or "fetched" in pending or "parsed" in pending:
+            try:
+                record = self._fetch_and_parse(url)
+            except Exception as e:
+                print(f"[ERROR] fetch/parse failed for {url}: {e}")
+                self.manifest.fail(url, f"parsed: {e}")
+                self.manifest.checkpoint()
+                return url
+            if self.bodies is not None:
+                into, score = self.bodies.check(url, record["text"])
+                if into is not None:
+                    # Already ingested under another URL: keep its keywords and summary.
+                    self._merge({"url": url, "into": into, "reason": "body", "score": round(score, 3)})
+                    self.manifest.checkpoint()
+                    return url
+            self.manifest.unmerge(url)
+            pending = self.manifest.pending(url, self.stages)
+        else:
+            record = load_work_record(url)
+            if record is None:
+                # Work file went missing; fetch again rather than fail.
+                self.manifest.reset(url, STAGES)
+                return self.process(url, llm_pool)
+
+        # Keywords and summary do not depend on each other, so run them side by side.
+        jobs = {}
+        if "keywords" in pending:
+            jobs["keywords"] = llm_pool.submit(self._keywords, record)
+        if "summarized" in pending:
+            jobs["summarized"] = llm_pool.submit(self._summarize, record)
+        for stage, future in jobs.items():
+            try:
+                record.update(future.result())
+                self.manifest.mark(url, stage)
+            except Exception as e:
+                print(f"[ERROR] {stage} failed for {url}: {e}")
+                self.manifest.fail(url, f"{stage}: {e}")
+
+        save_work_record(record)
+        if not self.manifest.pending(url, self.stages):
+            stored = to_storage_record(record)
+            duplicates = self.manifest.duplicates(url)
+            if duplicates:
+                stored["duplicates"] = duplicates
+            self._queue_save(url, stored)
+        self.manifest.checkpoint()
+        return url
+
+    def _merge(self, merge):
+        self.manifest.merge(merge["url"], merge["into"], reason=merge["reason"], score=merge["score"])
+        with self._buffer_lock:
+            self.merges.append(merge)
+
+    def _queue_save(self, url, stored):
+        with self._buffer_lock:
+            self._buffer.append((url, stored))
+            if len(self._buffer) < SAVE_EVERY:
+                return
+            batch, self._buffer = self._buffer, []
+        self._flush(batch)
+
+    def _flush(self, batch):
+        from storage import save_results
+        if not batch:
+            return
+        save_results([record for _, record in batch])
+        self.manifest.mark_saved(url for url, _ in batch)
+        self.manifest.checkpoint()
+
+    def _report_merges(self, similar):
+        """Updates the duplicate lists of stored records, saves the body index and writes merges.json."""
+        for into in sorted({m["into"] for m in self.merges}):
+            duplicates = self.manifest.duplicates(into)
+            if self.manifest.get(into, "saved") and duplicates:
+                self._queue_save(into, {"url": into, "duplicates": duplicates})
+        self.bodies.save()
+        _atomic_write_json(MERGES_PATH, {"updated": time.time(), "merges": self.merges, "similar_titles": similar})
+        if self.merges or similar:
+            by_body = sum(1 for m in self.merges if m["reason"] == "body")
+            print(f"[INFO] Merged {len(self.merges)} duplicates ({len(self.merges) - by_body} by PMC id, "
+                  f"{by_body} by text); {len(similar)} similar titles. Details in {MERGES_PATH}")
+            print_merges(self.merges, similar)
+
+    def run(self, rows, limit=None):
+        # The CSV lists a few links more than once; keep the first row for each.
+        seen = set()
+        rows = [(t, u) for t, u in rows if not (u in seen or seen.add(u))]
+        similar = []
+        if self.bodies is not None:
+            rows, merges, similar = dedup_rows(rows)
+            for merge in merges:
+                self._merge(merge)
+        if limit:
+            rows = rows[:limit]
+        changed = self.manifest.sync_sources(rows)
+        todo = [url for _, url in rows
+                if self.revalidate
+                or not self.manifest.get(url, "duplicate_of")
+                and (self.manifest.pending(url, self.stages) or not self.manifest.get(url, "saved"))]
+        print(f"[INFO] {len(rows)} publications, {changed} new or changed, {len(todo)} to process.")
+        self.manifest.checkpoint(force=True)
+
+        with ThreadPoolExecutor(max_workers=self.llm_workers) as llm_pool:
+            self.fetcher.map(lambda url: self.process(url, llm_pool), todo, label="Processed")
+
+        if self.bodies is not None:
+            self._report_merges(similar)
+        with self._buffer_lock:
+            batch, self._buffer = self._buffer, []
+        self._flush(batch)
+        self.manifest.checkpoint(force=True)
+        if any(self.manifest.get(url, "saved") for _, url in rows):
+            from snapshot import export_snapshot
+            from storage import export_json
+            export_json()
+            export_snapshot()
+
+        failed = sum(1 for _, url in rows if self.manifest.get(url, "error"))
+        print(f"[INFO] ✅ Pipeline finished: {len(todo) - failed} processed, {failed} with errors.")
+        if any(stage in LLM_STAGES for stage in self.stages):
+            from llm_client import get_client
+            print(f"[INFO] Gemini client: {get_client().metrics()}")
+        report("Pipeline")
+        return self.manifest
+
+
+def run_pipeline(stages=STAGES, csv_path=CSV_PATH, limit=None, llm_workers=4, revalidate=False, replay=False,
+                 dedup=True):
+    """`replay` re-parses every page from the HTML archive without going to the network."""
+    fetcher = None
+    if replay:
+        from html_archive import HTMLArchive
+        fetcher = Fetcher(archive=HTMLArchive(), replay=True)
+    pipeline = Pipeline(stages=stages, fetcher=fetcher, llm_workers=llm_workers, revalidate=revalidate or replay,
+                        dedup=dedup)
+    return pipeline.run(read_csv_rows(csv_path), limit=limit)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Incremental ingestion pipeline for the publications CSV.")
+    parser.add_argument("--stages", default=",".join(STAGES),
+                        help=f"comma separated subset of {', '.join(STAGES)}")
+    parser.add_argument("--csv", default=CSV_PATH, help="path to SB_publication_PMC.csv")
+    parser.add_argument("--limit", type=int, default=None, help="only process the first N rows")
+    parser.add_argument("--llm-workers", type=int, default=4, help="concurrent Gemini stage workers")
+    parser.add_argument("--revalidate", action="store_true",
+                        help="re-fetch finished pages and redo LLM stages whose text changed")
+    parser.add_argument("--replay", action="store_true",
+                        help="re-parse every page from the HTML archive, without network requests")
+    parser.add_argument("--no-dedup", dest="dedup", action="store_false",
+                        help="ingest duplicate articles as separate publications")
+    args = parser.parse_args(argv)
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+    # Later stages need the parsed text, so always include fetch and parse.
+    stages = sorted(set(stages) | {"fetched", "parsed"}, key=STAGES.index)
+    run_pipeline(stages, args.csv, args.limit, args.llm_workers, args.revalidate, args.replay, args.dedup)
+
+
+if __name__ == "__main__":
+    main()
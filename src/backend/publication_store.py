@@ -0,0 +1,99 @@
+# publication_store.py
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from http_cache import PreparedBody
+from metrics import cache_result, timed
+
+PAGE_CACHE_SIZE = 128
+
+
+class StoreError(Exception):
+    """Raised when the backing JSON file is missing or malformed."""
+
+    def __init__(self, message, status=500):
+        super().__init__(message)
+        self.status = status
+
+
+def serialize(data):
+    with timed("json_serialize"):
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class PublicationStore:
+    """
+    Keeps a JSON list of publications in memory and reloads it only when the
+    file's mtime or size changes. The full list and recently requested pages
+    are kept pre-serialized and pre-compressed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # (version, records, full body) swapped as one tuple so readers see a consistent snapshot.
+        self._state = (None, [], None)
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def records(self):
+        return self._check()[1]
+
+    def _check(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            raise StoreError(f"{self.path} not found", status=404)
+        version = (st.st_mtime_ns, st.st_size)
+        state = self._state
+        if version == state[0]:
+            return state
+
+        with self._lock:
+            if version == self._state[0]:
+                return self._state
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    records = json.load(f)
+            except json.JSONDecodeError:
+                raise StoreError(f"{os.path.basename(self.path)} is malformed")
+            self._pages = OrderedDict()
+            self._state = (version, records, PreparedBody(serialize(records)))
+            return self._state
+
+    def all(self):
+        """Returns the PreparedBody for the whole list."""
+        return self._check()[2]
+
+    def page(self, offset=0, limit=None, fields=None):
+        """Returns a PreparedBody for records[offset:offset+limit], keeping only `fields` when given."""
+        version, records, full = self._check()
+        if not offset and limit is None and not fields:
+            return full
+
+        key = (version, offset, limit, tuple(fields) if fields else None)
+        with self._lock:
+            hit = key in self._pages
+            if hit:
+                self._pages.move_to_end(key)
+                prepared = self._pages[key]
+        cache_result("data_page", hit)
+        if hit:
+            return prepared
+
+        end = None if limit is None else offset + limit
+        rows = records[offset:end]
+        if fields:
+            rows = [{k: row[k] for k in fields if k in row} if isinstance(row, dict) else row for row in rows]
+        prepared = PreparedBody(serialize(rows))
+
+        with self._lock:
+            self._pages[key] = prepared
+            while len(self._pages) > PAGE_CACHE_SIZE:
+                self._pages.popitem(last=False)
+        return prepared
+
+    def __len__(self):
+        return len(self._check()[1])
@@ -1,7 +1,7 @@
-import requests
 import pandas as pd
-from bs4 import BeautifulSoup
-import time
+from extractor import fetch_article
+from fetcher import get_fetcher
+from metrics import log, report, timed
 
 
 def read_urls_from_csv(csv_url):
@@ -28,35 +28,25 @@ def read_urls_from_csv(csv_url):
     return urls
 
 
-def scrape_article(url):
+def scrape_article(url, fetcher=None):
     """
-    Fetches and cleans all readable text from a single webpage using BeautifulSoup.
+    Fetches and cleans all readable text from a single webpage.
     Removes scripts, styles, navbars, etc.
-    Returns plain text.
+    Returns plain text. Use extractor.fetch_article() when you also need
+    the title, authors or sections so the page is only fetched once.
     """
     try:
-        headers = {'User-Agent': 'Mozilla/5.0'}
-        res = requests.get(url, headers=headers, timeout=10)
-        res.raise_for_status()
-        soup = BeautifulSoup(res.text, 'html.parser')
-
-        # Remove unnecessary elements
-        for tag in soup(['script', 'style', 'nav', 'header', 'footer', 'aside']):
-            tag.decompose()
-
-        # Extract all visible paragraph text
-        paragraphs = [p.get_text(strip=True) for p in soup.find_all('p')]
-        content = ' '.join(paragraphs)
-        return content.strip()
+        with timed("scrape_article"):
+            return fetch_article(url, fetcher)["text"]
 
     except Exception as e:
-        print(f"[ERROR] While scraping {url}: {e}")
+        log("ERROR", "While scraping %s: %s", url, e)
         return None
 
 
-def scrape_all_from_csv(csv_url, limit=None):
+def scrape_all_from_csv(csv_url, limit=None, fetcher=None):
     """
-    Loops through all URLs in the CSV and scrapes each.
+    Scrapes every URL in the CSV concurrently through the shared rate-limited Fetcher.
     You can set a limit to test only a few.
     Returns a dictionary {url: text}.
     """
@@ -64,18 +54,23 @@ def scrape_all_from_csv(csv_url, limit=None):
     if limit:
         urls = urls[:limit]
 
-    results = {}
+    fetcher = fetcher or get_fetcher()
     print(f"[INFO] Starting scrape for {len(urls)} URLs...")
+    texts = fetcher.map(lambda url: scrape_article(url, fetcher), urls, label="Scraped")
 
-    for i, url in enumerate(urls, 1):
-        print(f"\n[{i}/{len(urls)}] Scraping: {url}")
-        text = scrape_article(url)
+    results = {}
+    for url, text in zip(urls, texts):
         if text:
             results[url] = text
-            print(f"[SUCCESS] Collected {len(text)} characters.")
         else:
-            print("[WARN] No text extracted.")
-        time.sleep(2)  # delay to avoid rate limiting
+            log("WARN", "No text extracted from %s.", url)
 
     print(f"\n[INFO] Finished scraping {len(results)} successful URLs.")
-    return results
\ No newline at end of file
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+    CSV_URL = "https://raw.githubusercontent.com/jgalazka/SB_publications/main/SB_publication_PMC.csv"
+    scrape_all_from_csv(CSV_URL, limit=int(sys.argv[1]) if len(sys.argv) > 1 else None)
+    report("scraper.py")
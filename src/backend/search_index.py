@@ -0,0 +1,286 @@
+# search_index.py
+import math
+import re
+import threading
+import time
+from array import array
+from collections import Counter
+
+import numpy as np
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has in is it its of on or that the to was were with".split()
+)
+K1 = 1.2
+B = 0.75
+COMPACT_RATIO = 0.25  # rebuild once this share of doc ids are superseded
+
+
+def tokenize(text):
+    return [t for t in _TOKEN.findall((text or "").casefold()) if t not in STOPWORDS]
+
+
+def normalize_keyword(keyword):
+    return " ".join(tokenize(keyword))
+
+
+def split_list(value):
+    """
+    Splits the comma separated `authors` / `keywords` strings stored by the
+    scrapers, dropping the "unknown" placeholder written when there are none.
+    """
+    items = value if isinstance(value, list) else (value or "").split(",")
+    return [str(item).strip() for item in items if str(item).strip() and str(item).strip() != "unknown"]
+
+
+def parse_year(record):
+    match = re.search(r"\d{4}", str(record.get("date") or record.get("year") or ""))
+    return int(match.group(0)) if match else None
+
+
+def _document_text(record):
+    summary = record.get("summary")
+    if isinstance(summary, list):
+        summary = " ".join(map(str, summary))
+    return " ".join(str(part) for part in (record.get("title"), summary, record.get("keywords")) if part)
+
+
+class SearchIndex:
+    """
+    Inverted index over the publication records.
+
+    - BM25 over title + summary + keywords. Postings are append-only uint32
+      arrays; scoring copies them to NumPy once per term and sums BM25
+      contributions with bincount, so a query costs O(postings of its terms).
+    - Author token index and exact keyword index (sets of doc ids).
+    - Sorted (year, doc id) list for year-range queries via binary search.
+
+    Records are keyed by URL. Upserting a URL retires its old doc id and adds a
+    new one, and the index compacts itself once enough ids are retired.
+    """
+
+    def __init__(self, records=()):
+        self._lock = threading.RLock()
+        self._reset()
+        self.add_many(records)
+
+    def _reset(self):
+        self.docs = []            # doc id -> record (None once superseded)
+        self.url_to_id = {}
+        self.doc_len = array("I")
+        self.doc_year = array("H")   # 0 when unknown
+        self.retired = array("I")    # superseded doc ids, masked out of results
+        self.total_len = 0
+        self.live = 0
+        self.postings = {}        # term -> (array doc ids, array term freqs)
+        self._np_postings = {}    # term -> (length, np doc ids, np tfs)
+        self.authors = {}         # author token -> set(doc ids)
+        self.keywords = {}        # normalized keyword -> set(doc ids)
+        self.years = []           # sorted [(year, doc id)]
+        self._np_years = None
+
+    def __len__(self):
+        return self.live
+
+    # -- updates ---------------------------------------------------------
+
+    def add(self, record):
+        self.add_many([record])
+
+    def add_many(self, records):
+        with self._lock:
+            for record in records:
+                self._add(record)
+            # Appending then sorting once beats insort for bulk loads, and
+            # timsort is linear on the mostly sorted list of an incremental add.
+            self.years.sort()
+            self._np_years = None
+            if self.docs and (len(self.docs) - self.live) / len(self.docs) > COMPACT_RATIO:
+                self._compact()
+
+    def _add(self, record):
+        if not isinstance(record, dict):
+            return
+        url = record.get("url")
+        if url in self.url_to_id:
+            self._retire(self.url_to_id[url])
+
+        doc_id = len(self.docs)
+        self.docs.append(record)
+        if url:
+            self.url_to_id[url] = doc_id
+        self.live += 1
+
+        terms = Counter(tokenize(_document_text(record)))
+        length = sum(terms.values())
+        self.doc_len.append(length)
+        self.total_len += length
+        for term, tf in terms.items():
+            ids, tfs = self.postings.setdefault(term, (array("I"), array("I")))
+            ids.append(doc_id)
+            tfs.append(tf)
+
+        for name in split_list(record.get("authors") or record.get("author")):
+            for token in tokenize(name):
+                self.authors.setdefault(token, set()).add(doc_id)
+        for keyword in split_list(record.get("keywords")):
+            key = normalize_keyword(keyword)
+            if key:
+                self.keywords.setdefault(key, set()).add(doc_id)
+
+        year = parse_year(record)
+        self.doc_year.append(year or 0)
+        if year is not None:
+            self.years.append((year, doc_id))
+
+    def _retire(self, doc_id):
+        # Postings keep the id; it is masked out at query time until compaction.
+        self.docs[doc_id] = None
+        self.retired.append(doc_id)
+        self.total_len -= self.doc_len[doc_id]
+        self.live -= 1
+
+    def _compact(self):
+        records = [r for r in self.docs if r is not None]
+        self._reset()
+        for record in records:
+            self._add(record)
+        self.years.sort()
+
+    # -- queries ---------------------------------------------------------
+
+    def _term_arrays(self, term):
+        ids, tfs = self.postings[term]
+        cached = self._np_postings.get(term)
+        if cached is None or cached[0] != len(ids):
+            cached = (len(ids), np.array(ids, dtype=np.int64), np.array(tfs, dtype=np.float32))
+            self._np_postings[term] = cached
+        return cached[1], cached[2]
+
+    def _bm25(self, terms):
+        n_docs = len(self.docs)
+        scores = np.zeros(n_docs, dtype=np.float32)
+        avgdl = (self.total_len / self.live) if self.live else 1.0
+        doc_len = np.frombuffer(self.doc_len, dtype=np.uint32).astype(np.float32) if n_docs else None
+        retired = None
+        if self.retired:
+            retired = np.zeros(n_docs, dtype=bool)
+            retired[np.frombuffer(self.retired, dtype=np.uint32)] = True
+        for term in set(terms):
+            if term not in self.postings:
+                continue
+            ids, tfs = self._term_arrays(term)
+            # Superseded versions still sit in the postings until compaction; only live documents count.
+            df = len(ids) - (int(np.count_nonzero(retired[ids])) if retired is not None else 0)
+            if df <= 0:
+                continue
+            idf = math.log(1 + (self.live - df + 0.5) / (df + 0.5))
+            norm = K1 * (1 - B + B * doc_len[ids] / avgdl)
+            scores += np.bincount(ids, weights=idf * tfs * (K1 + 1) / (tfs + norm), minlength=n_docs).astype(np.float32)
+        return scores
+
+    def _year_arrays(self):
+        if self._np_years is None:
+            self._np_years = (np.array([y for y, _ in self.years], dtype=np.int32),
+                              np.array([i for _, i in self.years], dtype=np.int64))
+        return self._np_years
+
+    def _filter_mask(self, author=None, keyword=None, year_from=None, year_to=None):
+        """Returns a boolean mask of doc ids matching every given filter, or None when there are no filters."""
+        n_docs = len(self.docs)
+        masks = []
+
+        def ids_mask(ids):
+            mask = np.zeros(n_docs, dtype=bool)
+            if ids:
+                mask[np.fromiter(ids, dtype=np.int64, count=len(ids))] = True
+            return mask
+
+        for token in tokenize(author):
+            masks.append(ids_mask(self.authors.get(token, ())))
+        if keyword:
+            masks.append(ids_mask(self.keywords.get(normalize_keyword(keyword), ())))
+        if year_from is not None or year_to is not None:
+            years, ids = self._year_arrays()
+            lo = np.searchsorted(years, year_from if year_from is not None else -1, side="left")
+            hi = np.searchsorted(years, year_to if year_to is not None else 2 ** 31 - 1, side="right")
+            mask = np.zeros(n_docs, dtype=bool)
+            mask[ids[lo:hi]] = True
+            masks.append(mask)
+        if not masks:
+            return None
+        return np.logical_and.reduce(masks)
+
+    def search(self, q=None, author=None, keyword=None, year_from=None, year_to=None,
+               limit=20, offset=0):
+        """
+        Returns {"total": n, "results": [{"score": s, **record}]}.
+        Results are ranked by BM25 when `q` is given, otherwise newest first.
+        """
+        with self._lock:
+            n_docs = len(self.docs)
+            mask = self._filter_mask(author, keyword, year_from, year_to)
+            if mask is None:
+                mask = np.ones(n_docs, dtype=bool)
+            if self.retired:
+                mask[np.frombuffer(self.retired, dtype=np.uint32)] = False
+
+            terms = tokenize(q)
+            if terms:
+                scores = self._bm25(terms)
+                scores[~mask] = 0
+                candidates = np.flatnonzero(scores > 0)
+                keys = scores[candidates]
+            else:
+                scores = None
+                candidates = np.flatnonzero(mask)
+                # Newest first; the small id term keeps CSV order within a year.
+                keys = np.frombuffer(self.doc_year, dtype=np.uint16)[candidates] - candidates / (n_docs + 1)
+
+            total = len(candidates)
+            want = min(offset + limit, total)
+            if want <= 0:
+                return {"total": total, "results": []}
+            if want < total:
+                top = np.argpartition(-keys, want - 1)[:want]
+            else:
+                top = np.arange(total)
+            top = top[np.argsort(-keys[top], kind="stable")]
+
+            results = []
+            for doc_id in candidates[top[offset:want]]:
+                result = dict(self.docs[doc_id])
+                if scores is not None:
+                    result["score"] = round(float(scores[doc_id]), 4)
+                results.append(result)
+            return {"total": total, "results": results}
+
+
+class StorageSearchIndex(SearchIndex):
+    """SearchIndex fed from storage.py, picking up newly saved records incrementally."""
+
+    SYNC_INTERVAL = 2.0  # seconds between checks for new rows
+
+    def __init__(self):
+        super().__init__()
+        self.synced_version = None
+        self._checked = 0.0
+        self.sync(force=True)
+
+    def sync(self, force=False):
+        from storage import changes_since
+
+        now = time.monotonic()
+        if not force and now - self._checked < self.SYNC_INTERVAL:
+            return 0
+        self._checked = now
+        records, latest = changes_since(self.synced_version)
+        if records:
+            self.add_many(records)
+            self.synced_version = latest
+        return len(records)
+
+    def search(self, *args, **kwargs):
+        self.sync()
+        return super().search(*args, **kwargs)
@@ -1,37 +1,220 @@
-from flask import Flask, jsonify
-import json
+from flask import Blueprint, jsonify, request
 from pathlib import Path
+import json
 import os
 
-app = Flask(__name__)
+from http_cache import PreparedBody, cached_response
+from publication_store import PublicationStore, StoreError
+from workers import once
+
+# Served by app.create_app() together with the routes in article_summary.py.
+bp = Blueprint("data", __name__)
+
+# Resolve processed_data.json relative to this backend module so the
+# server works regardless of current working directory.
+base_dir = Path(os.path.dirname(__file__))
+store = PublicationStore(base_dir.joinpath("processed_data.json"))
+MAX_SEARCH_LIMIT = 100
+SUGGEST_MAX_AGE = 300  # seconds browsers and proxies may reuse a /suggest answer
+
+
+@once
+def search_index():
+    """Built from the publications database on first use; later saves are picked up incrementally."""
+    from search_index import StorageSearchIndex
+    return StorageSearchIndex()
+
+
+@once
+def knowledge_graph():
+    from graph import StorageGraph
+    return StorageGraph()
+
+
+@once
+def catalog():
+    """Memory-mapped publications.snapshot, shared by every worker through the page cache."""
+    from snapshot import SnapshotReader
+    return SnapshotReader()
+
+
+@once
+def suggestions():
+    """Author and keyword completions, mapped from the file written with each snapshot."""
+    from suggest import Suggester
+    return Suggester(catalog())
+
 
+@once
+def related_index():
+    """Loaded from .similarity_index/ when present; only new or changed publications are vectorized."""
+    from similarity import StorageSimilarity
+    return StorageSimilarity(base_dir.joinpath("processed_data.json"))
 
-@app.route("/data")
+
+def _int_arg(name, default=None):
+    value = request.args.get(name)
+    if value is None or value == "":
+        return default
+    number = int(value)  # ValueError is turned into a 400 by the caller
+    if number < 0:
+        raise ValueError(f"{name} must be >= 0")
+    return number
+
+
+@bp.route("/data")
 def get_data():
-    # Resolve processed_data.json relative to this backend module so the
-    # server works regardless of current working directory.
-    base_dir = Path(os.path.dirname(__file__))
-    file_path = base_dir.joinpath("processed_data.json")
+    """
+    Serves processed_data.json from memory. Supports ?offset=&limit= paging and
+    ?fields=title,url projection; responses carry a strong ETag and are served
+    gzip/brotli compressed when the client accepts it.
+    """
+    try:
+        offset = _int_arg("offset", 0)
+        limit = _int_arg("limit")
+    except ValueError as e:
+        return jsonify({"error": f"Invalid paging parameter: {e}"}), 400
+    fields = [f.strip() for f in request.args.get("fields", "").split(",") if f.strip()]
 
-    if not file_path.exists():
-        return jsonify({"error": f"{file_path} not found"}), 404
+    try:
+        prepared = store.page(offset, limit, fields)
+        total = len(store)
+    except StoreError as e:
+        return jsonify({"error": str(e)}), e.status
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    return cached_response(prepared, request, headers={"X-Total-Count": str(total)})
+
+
+@bp.route("/search")
+def search():
+    """
+    Searches the collected publications.
+    ?q=       BM25 full-text query over titles, summaries and keywords
+    ?author=  author name (every token must match)
+    ?keyword= exact keyword from the Gemini keyword list
+    ?year_from=&year_to=  inclusive year range
+    ?offset=&limit=       paging (limit defaults to 20, max 100)
+    """
+    try:
+        offset = _int_arg("offset", 0)
+        limit = min(_int_arg("limit", 20), MAX_SEARCH_LIMIT)
+        year_from = _int_arg("year_from")
+        year_to = _int_arg("year_to")
+    except ValueError as e:
+        return jsonify({"error": f"Invalid parameter: {e}"}), 400
 
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except json.JSONDecodeError:
-        return jsonify({"error": "processed_data.json is malformed"}), 500
+        result = search_index().search(
+            q=request.args.get("q"),
+            author=request.args.get("author"),
+            keyword=request.args.get("keyword"),
+            year_from=year_from,
+            year_to=year_to,
+            limit=limit,
+            offset=offset,
+        )
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+    return jsonify(result)
+
 
-    return jsonify(data)
+@bp.route("/catalog")
+def get_catalog():
+    """
+    Publications (url, title, authors, date, keywords) filtered from the
+    columnar snapshot, with the same filters as the frontend list:
+    ?title= and ?author= substrings, ?keyword= exact keyword,
+    ?year_from=&year_to= inclusive, ?offset=&limit= paging (default 20, max 100).
+    """
+    try:
+        offset = _int_arg("offset", 0)
+        limit = min(_int_arg("limit", 20), MAX_SEARCH_LIMIT)
+        year_from = _int_arg("year_from")
+        year_to = _int_arg("year_to")
+    except ValueError as e:
+        return jsonify({"error": f"Invalid parameter: {e}"}), 400
+
+    try:
+        snapshot = catalog().get()
+        rows = snapshot.filter(title=request.args.get("title"), author=request.args.get("author"),
+                               keyword=request.args.get("keyword"), year_from=year_from, year_to=year_to)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    return jsonify({"total": int(len(rows)), "results": snapshot.records(rows[offset:offset + limit])})
+
+
+@bp.route("/suggest")
+def suggest():
+    """
+    Typeahead for the filter panel: the most frequent authors and keywords
+    with a word starting with ?q=. ?field=author or keyword restricts the
+    kind, ?limit= sets the count (default 10, max 20). Answers are small and
+    cacheable for SUGGEST_MAX_AGE seconds, with an ETag for revalidation;
+    503 with Retry-After while the index for a fresh snapshot is being built.
+    """
+    from suggest import FIELDS, MAX_LIMIT
+
+    q = request.args.get("q", "")
+    field = request.args.get("field")
+    if field and field not in FIELDS:
+        return jsonify({"error": f"Unknown field '{field}', expected one of {', '.join(FIELDS)}"}), 400
+    try:
+        limit = max(1, min(_int_arg("limit", 10), MAX_LIMIT))
+    except ValueError as e:
+        return jsonify({"error": f"Invalid parameter: {e}"}), 400
+
+    try:
+        results = suggestions().suggest(q, [field] if field else FIELDS, limit)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    if results is None:
+        # The snapshot predates its suggestions file, which is being built in the background.
+        return jsonify({"error": "Suggestions are being built, retry shortly"}), 503, {"Retry-After": "5"}
+    body = json.dumps({"q": q, "suggestions": results}, separators=(",", ":")).encode("utf-8")
+    return cached_response(PreparedBody(body), request, max_age=SUGGEST_MAX_AGE)
+
+
+@bp.route("/graph")
+def get_graph():
+    """Ready-to-render Cytoscape elements with precomputed publication similarity edges."""
+    try:
+        prepared = knowledge_graph().body()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    return cached_response(prepared, request)
+
+
+@bp.route("/related/<pub_id>")
+def related(pub_id):
+    """
+    Publications most similar to one publication, by TF-IDF cosine over
+    titles, keywords and summaries. <pub_id> is a knowledge graph node id
+    (pub-...) or a PMC id (PMC4136787); ?k= sets the count (default 10, max 50).
+    """
+    from similarity import MAX_K, TOP_K
+
+    try:
+        k = max(1, min(_int_arg("k", TOP_K), MAX_K))
+    except ValueError as e:
+        return jsonify({"error": f"Invalid parameter: {e}"}), 400
+
+    try:
+        result = related_index().related(pub_id, k)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    if result is None:
+        return jsonify({"error": f"Unknown publication '{pub_id}'"}), 404
+    return jsonify(result)
 
 
-@app.route("/")
+@bp.route("/")
 def home():
     return {"message": "Backend API is running 🚀"}
 
 
 if __name__ == "__main__":
+    from app import create_app
     # Use 0.0.0.0 when you want to access from other machines, keep 127.0.0.1 for local dev
-    app.run(debug=True, port=5000)
+    create_app().run(debug=True, port=5000)
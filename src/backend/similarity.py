@@ -0,0 +1,364 @@
+# similarity.py
+"""
+"Related publications" index.
+
+Each publication's title, keywords and summary are hashed into a fixed
+2^18-column TF-IDF space, so there is no vocabulary to grow or persist. Rows
+are L2-normalized in a SciPy CSR matrix, and a transposed copy makes a top-k
+cosine query cost only the postings of the query's own features.
+
+New or changed publications are vectorized on their own and appended. IDF
+weights are recomputed from the stored counts only once the corpus size has
+drifted by REWEIGHT_RATIO. Counts, document frequencies and row metadata are
+saved with save_npz / np.savez, so a restart loads the matrix instead of
+re-tokenizing the corpus.
+"""
+import hashlib
+import json
+import math
+import os
+import re
+import tempfile
+import threading
+import time
+import zlib
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+
+from search_index import split_list, tokenize
+
+N_FEATURES = 2 ** 18
+INDEX_DIR = os.path.join(os.path.dirname(__file__), ".similarity_index")
+TOP_K = 10
+MAX_K = 50
+TITLE_WEIGHT = 2        # title terms count this many times
+REWEIGHT_RATIO = 0.1    # recompute IDF once the live document count drifts this much
+COMPACT_RATIO = 0.25    # drop superseded rows once they are this share of the matrix
+META_FIELDS = ("url", "title", "authors", "date")
+_PMC_ID = re.compile(r"PMC\d+", re.IGNORECASE)
+
+
+def _summary_text(summary):
+    if isinstance(summary, dict):
+        return " ".join(str(v) for v in summary.values())
+    if isinstance(summary, list):
+        return " ".join(map(str, summary))
+    return str(summary or "")
+
+
+def record_terms(record):
+    """Title unigrams and bigrams (weighted), keyword and summary unigrams."""
+    title = tokenize(record.get("title"))
+    terms = (title + [f"{a} {b}" for a, b in zip(title, title[1:])]) * TITLE_WEIGHT
+    for keyword in split_list(record.get("keywords")):
+        terms.extend(tokenize(keyword))
+    terms.extend(tokenize(_summary_text(record.get("summary"))))
+    return terms
+
+
+def content_hash(record):
+    fields = [record.get("title"), record.get("keywords"), record.get("summary")]
+    return hashlib.sha1(json.dumps(fields, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _feature(term):
+    # crc32 rather than hash(), which is salted per process and would break the saved index.
+    return zlib.crc32(term.encode("utf-8")) % N_FEATURES
+
+
+def vectorize(records):
+    """CSR matrix of sublinear term frequencies (1 + log tf), one row per record."""
+    indptr = [0]
+    indices = []
+    data = []
+    for record in records:
+        counts = Counter(_feature(t) for t in record_terms(record))
+        indices.extend(counts)
+        data.extend(1 + math.log(c) for c in counts.values())
+        indptr.append(len(indices))
+    return sparse.csr_matrix((np.array(data, dtype=np.float32), np.array(indices, dtype=np.int32), indptr),
+                             shape=(len(records), N_FEATURES))
+
+
+def _normalize_rows(X):
+    norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags(1 / norms).dot(X).tocsr()
+
+
+def pub_ids(url):
+    """The ids a publication can be looked up by: its graph node id and its PMC id."""
+    from graph import node_id
+    ids = [node_id(url)]
+    match = _PMC_ID.search(url)
+    if match:
+        ids.append(match.group(0).upper())
+    return ids
+
+
+class SimilarityIndex:
+    def __init__(self, directory=INDEX_DIR):
+        self.directory = directory
+        self._lock = threading.RLock()
+        self._reset()
+        self._load()
+
+    def _reset(self):
+        self.tf = sparse.csr_matrix((0, N_FEATURES), dtype=np.float32)
+        self.df = np.zeros(N_FEATURES, dtype=np.int32)
+        self.idf = None
+        self.weighted_at = 0      # live document count the IDF was computed for
+        self.W = None             # L2-normalized TF-IDF rows
+        self._WT = None           # W transposed (features x rows), rebuilt lazily
+        self.meta = []            # row -> {url, title, authors, date}
+        self.hashes = []          # row -> content hash
+        self.alive = np.zeros(0, dtype=bool)
+        self.row_of = {}          # url -> live row
+        self.ids = {}             # node id / PMC id -> url
+        self.state = {}           # sync bookkeeping persisted with the index
+
+    def __len__(self):
+        return len(self.row_of)
+
+    # -- persistence -----------------------------------------------------
+
+    def _paths(self):
+        return (os.path.join(self.directory, "tf.npz"), os.path.join(self.directory, "stats.npz"),
+                os.path.join(self.directory, "meta.json"))
+
+    def _load(self):
+        tf_path, stats_path, meta_path = self._paths() if self.directory else (None, None, None)
+        if not tf_path or not all(os.path.exists(p) for p in (tf_path, stats_path, meta_path)):
+            return
+        try:
+            tf = sparse.load_npz(tf_path).tocsr()
+            with np.load(stats_path) as stats:
+                df, idf = stats["df"], stats["idf"]
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[WARN] Ignoring unreadable similarity index in {self.directory}: {e}")
+            return
+        if meta.get("n_features") != N_FEATURES or tf.shape != (len(meta["rows"]), N_FEATURES):
+            # Settings changed, or a save was interrupted between files: start over.
+            return
+        self.tf = tf
+        self.df = df
+        self.idf = idf if idf.size else None
+        self.weighted_at = meta["weighted_at"]
+        self.meta = meta["rows"]
+        self.hashes = meta["hashes"]
+        self.alive = np.array(meta["alive"], dtype=bool)
+        self.state = meta.get("state", {})
+        for row in np.flatnonzero(self.alive):
+            self._register(int(row))
+        if self.idf is not None:
+            self.W = _normalize_rows(self.tf.multiply(self.idf).tocsr())
+
+    def save(self):
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        tf_path, stats_path, meta_path = self._paths()
+        with self._lock:
+            meta = {"n_features": N_FEATURES, "weighted_at": self.weighted_at, "rows": self.meta,
+                    "hashes": self.hashes, "alive": self.alive.astype(int).tolist(), "state": self.state}
+            # Write each file to a temp name and rename so a crash never leaves a half-written index.
+            for path, write in (
+                (tf_path, lambda f: sparse.save_npz(f, self.tf)),
+                (stats_path, lambda f: np.savez_compressed(f, df=self.df, idf=self.idf if self.idf is not None else np.zeros(0))),
+                (meta_path, lambda f: f.write(json.dumps(meta).encode("utf-8"))),
+            ):
+                fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+                with os.fdopen(fd, "wb") as f:
+                    write(f)
+                os.replace(tmp, path)
+
+    # -- updates ---------------------------------------------------------
+
+    def _register(self, row):
+        url = self.meta[row]["url"]
+        self.row_of[url] = row
+        for pub_id in pub_ids(url):
+            self.ids[pub_id] = url
+
+    def _retire(self, row):
+        # The row stays in the matrix, masked out of results, until compaction.
+        self.alive[row] = False
+        self.df[self.tf.indices[self.tf.indptr[row]:self.tf.indptr[row + 1]]] -= 1
+
+    def add_many(self, records):
+        """Adds new records and re-vectorizes changed ones (by URL). Returns the number of rows written."""
+        with self._lock:
+            new = {}
+            for record in records:
+                if not isinstance(record, dict) or not record.get("url"):
+                    continue
+                url = record["url"]
+                digest = content_hash(record)
+                row = self.row_of.get(url)
+                if row is not None and self.hashes[row] == digest:
+                    continue
+                new[url] = (record, digest)
+            if not new:
+                return 0
+
+            for url in new:
+                if url in self.row_of:
+                    self._retire(self.row_of.pop(url))
+            rows = vectorize([record for record, _ in new.values()])
+            first = self.tf.shape[0]
+            self.tf = sparse.vstack([self.tf, rows], format="csr")
+            np.add.at(self.df, rows.indices, 1)
+            self.alive = np.concatenate([self.alive, np.ones(len(new), dtype=bool)])
+            for n, (record, digest) in enumerate(new.values()):
+                self.meta.append({field: record.get(field, "") for field in META_FIELDS})
+                self.hashes.append(digest)
+                self._register(first + n)
+
+            live = len(self.row_of)
+            if (self.tf.shape[0] - live) > COMPACT_RATIO * self.tf.shape[0]:
+                self._compact()
+            elif self.idf is None or abs(live - self.weighted_at) > REWEIGHT_RATIO * self.weighted_at:
+                self._reweight()
+            else:
+                self.W = sparse.vstack([self.W, _normalize_rows(rows.multiply(self.idf).tocsr())], format="csr")
+            self._WT = None
+            return len(new)
+
+    def _reweight(self):
+        live = len(self.row_of)
+        self.idf = (np.log((1 + live) / (1 + self.df)) + 1).astype(np.float32)
+        self.weighted_at = live
+        self.W = _normalize_rows(self.tf.multiply(self.idf).tocsr())
+
+    def _compact(self):
+        keep = np.flatnonzero(self.alive)
+        self.tf = self.tf[keep]
+        self.meta = [self.meta[i] for i in keep]
+        self.hashes = [self.hashes[i] for i in keep]
+        self.alive = np.ones(len(keep), dtype=bool)
+        self.row_of = {}
+        self.ids = {}
+        for row in range(len(keep)):
+            self._register(row)
+        self._reweight()
+
+    # -- queries ---------------------------------------------------------
+
+    def resolve(self, pub_id):
+        """Maps a graph node id, PMC id or URL to a URL in the index, or None."""
+        if pub_id in self.row_of:
+            return pub_id
+        return self.ids.get(pub_id) or self.ids.get(pub_id.upper())
+
+    def related(self, pub_id, k=TOP_K):
+        """
+        Returns {"id", "publication", "results": [{score, url, title, ...}]}
+        with the k most similar publications, or None when `pub_id` is unknown.
+        """
+        with self._lock:
+            url = self.resolve(pub_id)
+            if url is None or self.W is None:
+                return None
+            row = self.row_of[url]
+            if self._WT is None:
+                self._WT = self.W.T.tocsr()
+            lo, hi = self.W.indptr[row], self.W.indptr[row + 1]
+            features, weights = self.W.indices[lo:hi], self.W.data[lo:hi]
+            # Only the postings of this row's features are touched.
+            scores = self._WT[features].T.dot(weights)
+            scores[~self.alive] = 0
+            scores[row] = 0
+            candidates = np.flatnonzero(scores > 0)
+            if len(candidates) > k:
+                candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+            candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+            results = [dict(self.meta[i], id=pub_ids(self.meta[i]["url"])[0], score=round(float(scores[i]), 4))
+                       for i in candidates]
+            return {"id": pub_ids(url)[0], "publication": self.meta[row], "results": results}
+
+
+class StorageSimilarity:
+    """
+    SimilarityIndex over the publications database, with summaries from
+    processed_data.json joined in by URL. Only rows whose text changed are
+    re-vectorized, and the index is saved whenever rows were written.
+    """
+
+    SYNC_INTERVAL = 5.0  # seconds between checks for newly saved records
+
+    def __init__(self, processed_path, directory=INDEX_DIR):
+        self.processed_path = str(processed_path)
+        self.index = SimilarityIndex(directory)
+        self._processed = None    # url -> processed_data.json record
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def _processed_version(self):
+        try:
+            st = os.stat(self.processed_path)
+        except OSError:
+            return None
+        return [st.st_mtime, st.st_size]
+
+    def _load_processed(self):
+        try:
+            with open(self.processed_path, "r", encoding="utf-8") as f:
+                processed = json.load(f)
+        except (OSError, ValueError):
+            processed = []
+        self._processed = {r["url"]: r for r in processed if isinstance(r, dict) and r.get("url")}
+
+    def _merge(self, records):
+        """Fills fields missing from the storage records (mostly summaries) from processed_data.json."""
+        merged = []
+        for record in records:
+            extra = self._processed.get(record.get("url"))
+            if extra:
+                record = dict(record)
+                for field, value in extra.items():
+                    if value and not record.get(field):
+                        record[field] = value
+            merged.append(record)
+        return merged
+
+    def sync(self, force=False):
+        from storage import changes_since
+
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._checked < self.SYNC_INTERVAL:
+                return 0
+            self._checked = now
+            state = self.index.state
+            version = self._processed_version()
+            if self._processed is None or version != state.get("processed_version"):
+                self._load_processed()
+            if version != state.get("processed_version") or not state.get("scanned"):
+                # Summaries changed, or the database was never scanned: compare every record
+                # (unchanged ones are skipped by hash). An empty index that was scanned stays incremental.
+                records, latest = changes_since(None)
+                known = {r.get("url") for r in records}
+                # Entries without a real URL (processed_data.json uses "Unknown_<n>") are not linkable publications.
+                records += [dict(r, authors=r.get("authors") or r.get("author", ""))
+                            for url, r in self._processed.items() if url not in known and url.startswith("http")]
+            else:
+                records, latest = changes_since(state.get("synced_version"))
+                if not records:
+                    return 0
+            added = self.index.add_many(self._merge(records))
+            # Versions start at 1, so 0 is a cursor for "everything" once an empty database was scanned.
+            self.index.state = {"scanned": True, "synced_version": latest or 0, "processed_version": version}
+            if added:
+                # Rows are only appended, retired, compacted or reweighted by add_many, so
+                # an unchanged index is not rewritten; a restart re-checks those records by hash.
+                self.index.save()
+                print(f"[INFO] Similarity index: vectorized {added} publications ({len(self.index)} total)")
+            return added
+
+    def related(self, pub_id, k=TOP_K):
+        self.sync()
+        return self.index.related(pub_id, k)
@@ -0,0 +1,317 @@
+# snapshot.py
+"""
+Compact columnar snapshot of the publications (url, title, authors, date,
+keywords), for serving and filtering without parsing JSON.
+
+The snapshot is one file: a small JSON header followed by numpy arrays.
+Strings are stored as a UTF-8 heap plus an offsets array; authors, keywords
+and dates are interned into tables and each publication refers to them by
+integer ids. Snapshot() maps the file read-only and every column is a
+zero-copy view into the mapping, so opening it costs a few milliseconds at
+any size and gunicorn workers share its pages through the OS page cache
+instead of each holding a parsed copy.
+
+    python snapshot.py                      # export from the publications database
+    python snapshot.py --from nih_data.json # or from a JSON array
+"""
+import argparse
+import json
+import mmap
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from search_index import parse_year, split_list
+
+SNAPSHOT_PATH = os.path.join(os.path.dirname(__file__), "publications.snapshot")
+MAGIC = b"PUBSNAP1"
+ALIGN = 64
+CHECK_INTERVAL = 2.0  # seconds between checks for a newer snapshot file
+# -- writing ------------------------------------------------------------------
+
+def _index_dtype(size):
+    return np.int32 if size < 2 ** 31 else np.int64
+
+
+def _string_columns(columns, name, values):
+    encoded = [v.encode("utf-8") for v in values]
+    heap = b"".join(encoded)
+    offsets = np.zeros(len(encoded) + 1, dtype=_index_dtype(len(heap)))
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    columns[f"{name}.heap"] = np.frombuffer(heap, dtype=np.uint8)
+    columns[f"{name}.offsets"] = offsets
+
+
+def _category_columns(columns, name, values):
+    """One value per publication from a small table: `name`.ids[i] indexes the `name` strings."""
+    table = {}
+    ids = [table.setdefault(value, len(table)) for value in values]
+    _string_columns(columns, name, list(table))
+    columns[f"{name}.ids"] = np.asarray(ids, dtype=np.int16 if len(table) < 2 ** 15 else np.int32)
+
+
+def _interned_columns(columns, name, lists):
+    """
+    A table of distinct values (`name`, plus `name`.lower for matching) and,
+    per publication, a run of ids into it: `name`.index[i]:`name`.index[i+1]
+    slices `name`.ids.
+    """
+    table = {}
+    ids, index = [], [0]
+    for values in lists:
+        for value in values:
+            ids.append(table.setdefault(value, len(table)))
+        index.append(len(ids))
+    _string_columns(columns, name, list(table))
+    _string_columns(columns, f"{name}.lower", [v.lower() for v in table])
+    columns[f"{name}.ids"] = np.asarray(ids, dtype=np.int32)
+    columns[f"{name}.index"] = np.asarray(index, dtype=_index_dtype(len(ids)))
+
+
+def build_columns(records):
+    records = [r for r in records if isinstance(r, dict) and r.get("url")]
+    columns = {}
+    # URLs share a handful of prefixes (https://www.ncbi.nlm.nih.gov/pmc/articles/); keep each once.
+    urls = [str(r["url"]) for r in records]
+    cuts = [url.rstrip("/").rfind("/") + 1 for url in urls]
+    _category_columns(columns, "url.prefix", [url[:cut] for url, cut in zip(urls, cuts)])
+    _string_columns(columns, "url", [url[cut:] for url, cut in zip(urls, cuts)])
+    _string_columns(columns, "title", [str(r.get("title") or "") for r in records])
+    _string_columns(columns, "title.lower", [str(r.get("title") or "").lower() for r in records])
+    # split_list drops the "unknown" placeholder the scrapers write when a page names no authors.
+    _interned_columns(columns, "author", [split_list(r.get("authors")) for r in records])
+    _interned_columns(columns, "keyword", [split_list(r.get("keywords")) for r in records])
+    _category_columns(columns, "date", [str(r.get("date") or "") for r in records])
+    # 0 marks an unknown year.
+    columns["year"] = np.asarray([parse_year(r) or 0 for r in records], dtype=np.int16)
+    return len(records), columns
+
+
+def write_columns(path, columns, **header):
+    """
+    Writes named numpy arrays to `path` atomically: MAGIC, the header length,
+    a JSON header (`header` plus the column layout), then each array at a
+    64-byte aligned offset.
+    """
+    layout, offset = {}, 0
+    for name, array in columns.items():
+        offset = -(-offset // ALIGN) * ALIGN
+        layout[name] = {"dtype": array.dtype.str, "count": int(array.size), "offset": offset}
+        offset += array.nbytes
+    header = json.dumps({"format": 1, "created_at": time.time(), **header, "columns": layout}).encode("utf-8")
+    data_start = -(-(len(MAGIC) + 8 + len(header)) // ALIGN) * ALIGN
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC + len(header).to_bytes(8, "little") + header)
+            for name, array in columns.items():
+                f.seek(data_start + layout[name]["offset"])
+                f.write(array.tobytes())
+            f.truncate(data_start + offset)  # empty trailing columns still fall inside the file
+    except BaseException:
+        os.remove(tmp)
+        raise
+    os.replace(tmp, path)
+
+
+def write_snapshot(records, path=SNAPSHOT_PATH):
+    """Writes `records` (nih_data.json-shaped dicts) to `path` atomically. Returns the row count."""
+    rows, columns = build_columns(records)
+    write_columns(path, columns, rows=rows)
+    return rows
+
+
+def export_snapshot(path=SNAPSHOT_PATH, conn=None):
+    """
+    Writes every record in the publications database to the snapshot file,
+    with the /suggest index for it written first (see suggest.py), so a
+    reader that maps the new snapshot always finds its suggestions ready.
+    """
+    from storage import load_records
+    from suggest import write_suggestions
+
+    rows, columns = build_columns(load_records(conn=conn))
+    created_at = time.time()
+    write_suggestions(columns, path, created_at)
+    write_columns(path, columns, rows=rows, created_at=created_at)
+    print(f"[INFO] Exported {rows} entries to {path}")
+    return path
+
+
+# -- reading ------------------------------------------------------------------
+
+class ColumnFile:
+    """A file written by write_columns, mapped read-only: every column is a zero-copy view into the mapping."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a publications snapshot")
+        size = int.from_bytes(self._mm[len(MAGIC):len(MAGIC) + 8], "little")
+        self.header = json.loads(self._mm[len(MAGIC) + 8:len(MAGIC) + 8 + size])
+        data_start = -(-(len(MAGIC) + 8 + size) // ALIGN) * ALIGN
+        self.created_at = self.header["created_at"]
+        self.columns = {}
+        for name, col in self.header["columns"].items():
+            self.columns[name] = np.frombuffer(self._mm, dtype=np.dtype(col["dtype"]), count=col["count"],
+                                               offset=data_start + col["offset"])
+        self._heap_start = {name[:-len(".heap")]: data_start + col["offset"]
+                            for name, col in self.header["columns"].items() if name.endswith(".heap")}
+
+    def heap(self, name):
+        """(buffer, start) for slicing column `name`'s UTF-8 heap without copying it."""
+        return self._mm, self._heap_start[name]
+
+    def string(self, name, i):
+        offsets = self.columns[f"{name}.offsets"]
+        start = self._heap_start[name]
+        return self._mm[start + int(offsets[i]):start + int(offsets[i + 1])].decode("utf-8")
+
+    def close(self):
+        self.columns = {}
+        self._mm.close()
+
+
+class Snapshot(ColumnFile):
+    def __init__(self, path=SNAPSHOT_PATH):
+        super().__init__(path)
+        self.rows = self.header["rows"]
+        self._lookup = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.rows
+
+    def _values(self, name, i):
+        index, ids = self.columns[f"{name}.index"], self.columns[f"{name}.ids"]
+        return [self.string(name, int(v)) for v in ids[index[i]:index[i + 1]]]
+
+    def record(self, i):
+        """Publication `i` in the nih_data.json shape."""
+        record = {
+            "url": self.string("url.prefix", int(self.columns["url.prefix.ids"][i])) + self.string("url", i),
+            "title": self.string("title", i),
+            "authors": ", ".join(self._values("author", i)),
+            "date": self.string("date", int(self.columns["date.ids"][i])),
+        }
+        keywords = self._values("keyword", i)
+        if keywords:
+            record["keywords"] = ", ".join(keywords)
+        return record
+
+    def records(self, rows=None):
+        return [self.record(int(i)) for i in (range(self.rows) if rows is None else rows)]
+
+    def _find(self, name, needle):
+        """Indexes of the strings in column `name` containing `needle`, by scanning its heap."""
+        needle = needle.encode("utf-8")
+        offsets = self.columns[f"{name}.offsets"]
+        start, end = self._heap_start[name], self._heap_start[name] + int(offsets[-1])
+        found = []
+        at = self._mm.find(needle, start, end)
+        while at != -1:
+            i = int(np.searchsorted(offsets, at - start, side="right")) - 1
+            string_end = start + int(offsets[i + 1])
+            if at + len(needle) <= string_end:
+                found.append(i)
+                # Skip the rest of this string: one hit per row is enough.
+                at = self._mm.find(needle, string_end, end)
+            else:
+                # The match runs into the next string.
+                at = self._mm.find(needle, at + 1, end)
+        return np.asarray(found, dtype=np.int64)
+
+    def _rows_with(self, name, table_ids):
+        """Mask of the publications referring to any of `table_ids` in the `name` table."""
+        hits = np.isin(self.columns[f"{name}.ids"], table_ids)
+        # Count hits per publication run: index[i]:index[i+1] are publication i's ids.
+        counts = np.concatenate(([0], np.cumsum(hits)))
+        index = self.columns[f"{name}.index"]
+        return counts[index[1:]] > counts[index[:-1]]
+
+    def _table_id(self, name, value):
+        with self._lock:
+            if name not in self._lookup:
+                self._lookup[name] = {self.string(f"{name}.lower", i): i
+                                      for i in range(len(self.columns[f"{name}.offsets"]) - 1)}
+        return self._lookup[name].get(value.lower())
+
+    def filter(self, title=None, author=None, keyword=None, year_from=None, year_to=None):
+        """
+        Row numbers of the publications matching every given filter: title and
+        author are case-insensitive substrings (author against each name),
+        keyword an exact case-insensitive keyword, years an inclusive range.
+        """
+        mask = np.ones(self.rows, dtype=bool)
+        if title:
+            hits = np.zeros(self.rows, dtype=bool)
+            hits[self._find("title.lower", title.lower())] = True
+            mask &= hits
+        if author:
+            mask &= self._rows_with("author", self._find("author.lower", author.lower()))
+        if keyword:
+            table_id = self._table_id("keyword", keyword)
+            mask &= self._rows_with("keyword", [] if table_id is None else [table_id])
+        year = self.columns["year"]
+        if year_from is not None:
+            mask &= year >= year_from
+        if year_to is not None:
+            mask &= (year <= year_to) & (year > 0)
+        return np.flatnonzero(mask)
+
+
+class SnapshotReader:
+    """
+    Hands out the current Snapshot of `path`, mapping a new one when the file
+    is replaced (checked at most every CHECK_INTERVAL seconds) and exporting
+    one from the database when none exists yet.
+    """
+
+    def __init__(self, path=SNAPSHOT_PATH):
+        self.path = path
+        self._snapshot = None
+        self._version = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        now = time.monotonic()
+        if self._snapshot is not None and now - self._checked < CHECK_INTERVAL:
+            return self._snapshot
+        with self._lock:
+            self._checked = now
+            if not os.path.exists(self.path):
+                export_snapshot(self.path)
+            st = os.stat(self.path)
+            version = (st.st_mtime_ns, st.st_size, st.st_ino)
+            if version != self._version:
+                # The old mapping stays valid for requests still using it.
+                self._snapshot, self._version = Snapshot(self.path), version
+            return self._snapshot
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the publications to a columnar snapshot.")
+    parser.add_argument("--from", dest="source", default=None, help="JSON array to read instead of the database")
+    parser.add_argument("--out", default=SNAPSHOT_PATH, help="snapshot file to write")
+    args = parser.parse_args()
+
+    if args.source:
+        from suggest import write_suggestions
+
+        with open(args.source, "r", encoding="utf-8") as f:
+            count, columns = build_columns(json.load(f))
+        created_at = time.time()
+        write_suggestions(columns, args.out, created_at)
+        write_columns(args.out, columns, rows=count, created_at=created_at)
+        print(f"[INFO] ✅ Wrote {count} entries from {args.source} to {args.out} "
+              f"({os.path.getsize(args.out) / 1e6:.2f} MB, {os.path.getsize(args.source) / 1e6:.2f} MB as JSON)")
+    else:
+        export_snapshot(args.out)
@@ -1,27 +1,172 @@
 import json
 import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from metrics import timed
 
 DATA_PATH = os.path.join(os.path.dirname(__file__), "nih_data.json")
+DB_PATH = os.path.join(os.path.dirname(__file__), "publications.db")
 
-def save_results(results):
-    """Save list of results (dicts) to JSON file."""
-    existing = []
-    if os.path.exists(DATA_PATH):
+_local = threading.local()
+
+# `version` orders writes: every upsert takes the next number while it holds
+# the write lock, so versions grow in commit order. Readers poll with
+# changes_since(version); wall-clock updated_at is informational only, since
+# two writers can commit in the opposite order to their timestamps.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS publications (
+    url        TEXT PRIMARY KEY,
+    data       TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    version    INTEGER NOT NULL DEFAULT 0
+);
+"""
+INDEXES = """
+CREATE INDEX IF NOT EXISTS publications_updated_at ON publications (updated_at);
+CREATE INDEX IF NOT EXISTS publications_version ON publications (version);
+"""
+
+
+def connect(db_path=DB_PATH):
+    """
+    Returns this thread's connection to the publications database.
+    WAL mode lets the API read while a pipeline run is writing, and the busy
+    timeout makes concurrent writers wait for each other instead of failing.
+    """
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(db_path)
+    if conn is None:
+        conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        _migrate(conn)
+        conn.executescript(INDEXES)
+        conns[db_path] = conn
+        if db_path == DB_PATH:
+            _import_legacy_json(conn, DATA_PATH)
+    return conn
+
+
+def _migrate(conn):
+    """Adds the version column to databases created before it existed, numbering old rows by rowid."""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(publications)")}
+    if "version" not in columns:
+        conn.execute("BEGIN IMMEDIATE")
         try:
-            with open(DATA_PATH, "r", encoding="utf-8") as f:
-                existing = json.load(f) or []
-        except (json.JSONDecodeError, ValueError):
-            # If the file is empty or malformed, warn and start fresh
-            print(f"[WARN] {DATA_PATH} is empty or malformed. Overwriting with new data.")
-            existing = []
-        except Exception as e:
-            print(f"[WARN] Could not read existing data at {DATA_PATH}: {e}")
-            existing = []
-
-    existing.extend(results)
-
-    with open(DATA_PATH, "w") as f:
-        json.dump(existing, f, indent=2)
-
-    print(f"[INFO] Saved {len(results)} new entries to {DATA_PATH}")
-    return DATA_PATH
\ No newline at end of file
+            conn.execute("ALTER TABLE publications ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+            conn.execute("UPDATE publications SET version = rowid")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+def _import_legacy_json(conn, json_path):
+    """Seeds an empty database from the existing nih_data.json the first time it is opened."""
+    if conn.execute("SELECT 1 FROM publications LIMIT 1").fetchone() or not os.path.exists(json_path):
+        return
+    try:
+        with open(json_path, "r", encoding="utf-8") as f:
+            existing = json.load(f) or []
+    except (json.JSONDecodeError, ValueError):
+        print(f"[WARN] {json_path} is empty or malformed. Starting with an empty database.")
+        return
+    count = upsert(existing, conn=conn)
+    print(f"[INFO] Imported {count} entries from {json_path}")
+
+
+def upsert(results, conn=None):
+    """
+    Inserts or updates records by URL in a single transaction. Fields of an
+    existing record are merged (json_patch), so a metadata-only run does not
+    wipe keywords or summaries saved earlier. Fields set to None are left out:
+    json_patch would delete the stored key rather than store null. Returns the
+    number of records written.
+    """
+    conn = conn or connect()
+    now = time.time()
+    rows = []
+    for record in results:
+        if not isinstance(record, dict) or not record.get("url"):
+            print(f"[WARN] Skipping record without a url: {str(record)[:80]}")
+            continue
+        record = {key: value for key, value in record.items() if value is not None}
+        rows.append((record["url"], json.dumps(record), now))
+
+    with timed("db_write"):
+        _write(conn, rows)
+    return len(rows)
+
+
+def _write(conn, rows):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Taken under the write lock, so no transaction committing later can use a smaller version.
+        (version,) = conn.execute("SELECT COALESCE(MAX(version), 0) + 1 FROM publications").fetchone()
+        conn.executemany(
+            """
+            INSERT INTO publications (url, data, updated_at, version) VALUES (?, ?, ?, ?)
+            ON CONFLICT(url) DO UPDATE SET
+                data = json_patch(publications.data, excluded.data),
+                updated_at = excluded.updated_at,
+                version = excluded.version
+            """,
+            [row + (version,) for row in rows],
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def load_records(since=None, conn=None):
+    """Returns all records in insertion order, or only those written after version `since`."""
+    conn = conn or connect()
+    if since is None:
+        cur = conn.execute("SELECT data FROM publications ORDER BY rowid")
+    else:
+        cur = conn.execute("SELECT data FROM publications WHERE version > ? ORDER BY rowid", (since,))
+    return [json.loads(data) for (data,) in cur]
+
+
+def changes_since(since=None, conn=None):
+    """
+    Returns (records, latest) for records written after version `since`, where
+    `latest` is the newest version seen. Pass `latest` back in to poll for new saves.
+    """
+    conn = conn or connect()
+    cur = conn.execute(
+        "SELECT data, version FROM publications WHERE version > ? ORDER BY rowid",
+        (since if since is not None else -1,),
+    )
+    records = []
+    latest = since
+    for data, version in cur:
+        records.append(json.loads(data))
+        latest = version if latest is None else max(latest, version)
+    return records, latest
+
+
+def export_json(path=DATA_PATH, conn=None):
+    """Writes every record to `path` (nih_data.json by default) atomically, for the JSON consumers."""
+    records = load_records(conn=conn)
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(records, f, indent=2)
+    os.replace(tmp, path)
+    print(f"[INFO] Exported {len(records)} entries to {path}")
+    return path
+
+
+def save_results(results):
+    """Upsert list of results (dicts) by URL into the publications database."""
+    count = upsert(results)
+    print(f"[INFO] Saved {count} entries to {DB_PATH}")
+    return DB_PATH
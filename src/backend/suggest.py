@@ -0,0 +1,350 @@
+# suggest.py
+"""
+Typeahead completions for the author and keyword filters.
+
+Terms are normalized (case, unicode forms, punctuation) and indexed under
+each of their word starts, so "smi" completes "John Smith" and "micro"
+completes "Simulated Microgravity". The keys are offsets into one UTF-8
+buffer of all normalized terms, sorted by the bytes they point at: a prefix
+is the range two binary searches find, and its completions are the most
+frequent terms in that range. Prefixes whose range holds more than
+SCAN_LIMIT keys (short ones, mostly) have their completions computed when
+the index is built, so no query looks at more than SCAN_LIMIT keys.
+
+The index is built once per snapshot, by export_snapshot(), and written
+beside it in the same column format (publications.snapshot.suggest), so
+each server process maps it in milliseconds instead of building it.
+
+    python suggest.py micro          # completions from publications.snapshot
+"""
+import argparse
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+from csv_index import normalize_title
+from metrics import log, timed
+
+FIELDS = ("author", "keyword")
+MAX_LIMIT = 20       # completions kept per precomputed prefix, and the most a request gets
+SCAN_LIMIT = 2048    # prefix ranges larger than this are precomputed
+IGNORED = frozenset({"", "unknown"})
+
+
+def suggestions_path(snapshot_path):
+    return f"{snapshot_path}.suggest"
+
+
+# -- building -------------------------------------------------------------------
+
+def _memory_heap(columns):
+    """A ColumnFile.heap stand-in for columns that were never written."""
+    heaps = {}
+
+    def heap(name):
+        if name not in heaps:
+            heaps[name] = (columns[f"{name}.heap"].tobytes(), 0)
+        return heaps[name]
+    return heap
+
+
+def index_columns(counts, field, columns=None):
+    """
+    Adds the columns of a PrefixIndex named `field` to `columns` and returns
+    them. `counts` maps each term as written to the number of publications using it.
+    """
+    from snapshot import _string_columns
+
+    columns = {} if columns is None else columns
+    totals, shown = {}, {}
+    for term, count in counts.items():
+        normalized = normalize_title(term)
+        if normalized in IGNORED or count <= 0:
+            continue
+        totals[normalized] = totals.get(normalized, 0) + count
+        # Each normalized term is shown as its most common spelling.
+        if count > shown.get(normalized, ("", 0))[1]:
+            shown[normalized] = (term, count)
+    # Code point order of the strings is also the byte order of their UTF-8 encodings.
+    normalized = sorted(totals)
+    size = len(normalized)
+    _string_columns(columns, f"{field}.terms", [shown[n][0] for n in normalized])
+    counts = columns[f"{field}.counts"] = np.fromiter((totals[n] for n in normalized), dtype=np.int64, count=size)
+
+    encoded = [n.encode("utf-8") for n in normalized]
+    keys, starts, ends, key_terms, at = [], [], [], [], 0
+    for term_id, term in enumerate(encoded):
+        offset = 0
+        for word in term.split(b" "):
+            keys.append(term[offset:])
+            starts.append(at + offset)
+            ends.append(at + len(term))
+            key_terms.append(term_id)
+            offset += len(word) + 1
+        at += len(term) + 1
+    order = np.asarray(sorted(range(len(keys)), key=keys.__getitem__), dtype=np.int64)
+    del keys
+    key_terms = np.asarray(key_terms, dtype=np.int32)[order]
+    columns[f"{field}.text.heap"] = np.frombuffer(b"\n".join(encoded), dtype=np.uint8)
+    columns[f"{field}.key.starts"] = np.asarray(starts, dtype=np.int64)[order]
+    columns[f"{field}.key.ends"] = np.asarray(ends, dtype=np.int64)[order]
+    columns[f"{field}.key.terms"] = key_terms
+    # One sortable rank per key: higher count first, then alphabetical (lower term id).
+    columns[f"{field}.key.rank"] = counts[key_terms] * size + (size - key_terms)
+
+    top = {}
+    PrefixIndex(columns, field, _memory_heap(columns))._precompute(b"", 0, len(order), top)
+    prefixes = list(top)
+    offsets = np.zeros(len(prefixes) + 1, dtype=np.int64)
+    np.cumsum([len(p) for p in prefixes], out=offsets[1:])
+    columns[f"{field}.top.heap"] = np.frombuffer(b"".join(prefixes), dtype=np.uint8)
+    columns[f"{field}.top.offsets"] = offsets
+    index = np.zeros(len(prefixes) + 1, dtype=np.int64)
+    np.cumsum([len(top[p]) for p in prefixes], out=index[1:])
+    columns[f"{field}.top.index"] = index
+    columns[f"{field}.top.ids"] = np.concatenate([top[p] for p in prefixes] or [[]]).astype(np.int32)
+    return columns
+
+
+def _table_counts(columns, field):
+    """{term: publications using it} for the interned `field` table of snapshot columns."""
+    offsets = columns[f"{field}.offsets"]
+    heap = columns[f"{field}.heap"].tobytes()
+    ids, index = columns[f"{field}.ids"].astype(np.int64), columns[f"{field}.index"]
+    # A record listing a term twice still counts as one publication.
+    rows = np.repeat(np.arange(len(index) - 1, dtype=np.int64), np.diff(index))
+    pairs = np.unique(rows * (len(offsets) - 1) + ids)
+    counts = np.bincount(pairs % (len(offsets) - 1), minlength=len(offsets) - 1)
+    return {heap[offsets[i]:offsets[i + 1]].decode("utf-8"): int(counts[i]) for i in range(len(offsets) - 1)}
+
+
+def write_suggestions(snapshot_columns, snapshot_path, created_at):
+    """Builds the indexes from the columns of a snapshot and writes them beside it, tagged with its `created_at`."""
+    from snapshot import write_columns
+
+    columns = {}
+    with timed("suggest_build"):
+        for field in FIELDS:
+            index_columns(_table_counts(snapshot_columns, field), field, columns)
+    write_columns(suggestions_path(snapshot_path), columns, snapshot_created_at=created_at)
+
+
+def load_suggestions(snapshot):
+    """{field: PrefixIndex} mapped from the file written for `snapshot`, or None when it is missing or stale."""
+    from snapshot import ColumnFile
+
+    try:
+        mapped = ColumnFile(suggestions_path(snapshot.path))
+    except (OSError, ValueError):
+        return None
+    if mapped.header.get("snapshot_created_at") != snapshot.created_at:
+        mapped.close()
+        return None
+    return {field: PrefixIndex(mapped.columns, field, mapped.heap) for field in FIELDS}
+
+
+def build(records):
+    """{field: PrefixIndex} in memory from nih_data.json-shaped records (comma separated authors and keywords)."""
+    from search_index import split_list
+
+    counts = {field: Counter() for field in FIELDS}
+    for record in records:
+        for field, key in (("author", "authors"), ("keyword", "keywords")):
+            counts[field].update(set(split_list(record.get(key))))
+    return {field: PrefixIndex.from_counts(counts[field]) for field in FIELDS}
+
+
+# -- querying -------------------------------------------------------------------
+
+class PrefixIndex:
+    """Frequency-ranked prefix completions over the columns index_columns() wrote for one field."""
+
+    def __init__(self, columns, field, heap):
+        """`heap(name)` returns (buffer, start) for a heap column, as ColumnFile.heap does."""
+        self.counts = columns[f"{field}.counts"]
+        self._term_offsets = columns[f"{field}.terms.offsets"]
+        self._terms, self._terms_start = heap(f"{field}.terms")
+        self._text, self._text_start = heap(f"{field}.text")
+        self._starts = columns[f"{field}.key.starts"]
+        self._ends = columns[f"{field}.key.ends"]
+        self._key_terms = columns[f"{field}.key.terms"]
+        self._key_rank = columns[f"{field}.key.rank"]
+        self._top = {}
+        if f"{field}.top.ids" in columns:
+            prefixes, start = heap(f"{field}.top")
+            offsets, index = columns[f"{field}.top.offsets"].tolist(), columns[f"{field}.top.index"].tolist()
+            ids = columns[f"{field}.top.ids"]
+            for i in range(len(offsets) - 1):
+                self._top[bytes(prefixes[start + offsets[i]:start + offsets[i + 1]])] = ids[index[i]:index[i + 1]]
+
+    @classmethod
+    def from_counts(cls, counts, field="terms"):
+        """An in-memory index over `counts` ({term as written: publications using it})."""
+        columns = index_columns(counts, field)
+        return cls(columns, field, _memory_heap(columns))
+
+    def __len__(self):
+        return len(self.counts)
+
+    def term(self, i):
+        start = self._terms_start
+        return self._terms[start + int(self._term_offsets[i]):start + int(self._term_offsets[i + 1])].decode("utf-8")
+
+    def _key(self, i, n):
+        start = self._text_start + int(self._starts[i])
+        return self._text[start:min(self._text_start + int(self._ends[i]), start + n)]
+
+    def _range(self, prefix, lo=0, hi=None):
+        """[lo, hi) of the keys starting with the bytes `prefix`."""
+        hi = len(self._starts) if hi is None else hi
+        n = len(prefix)
+        first, last = lo, hi
+        while first < last:
+            mid = (first + last) // 2
+            if self._key(mid, n) < prefix:
+                first = mid + 1
+            else:
+                last = mid
+        last = hi
+        lo = first
+        while first < last:
+            mid = (first + last) // 2
+            if self._key(mid, n) <= prefix:
+                first = mid + 1
+            else:
+                last = mid
+        return lo, first
+
+    def _rank(self, lo, hi, limit):
+        """Term ids in keys lo:hi, most frequent first, ties alphabetical."""
+        ranks = self._key_rank[lo:hi]
+        # A term is in the range once per word matching the prefix, so keep spare candidates.
+        spare = 4 * limit
+        if len(ranks) > spare:
+            picked = np.argpartition(-ranks, spare)[:spare]
+            picked = picked[np.argsort(-ranks[picked])]
+        else:
+            picked = np.argsort(-ranks)
+        ids = list(dict.fromkeys(self._key_terms[lo + picked].tolist()))
+        if len(ids) < limit and len(ranks) > spare:
+            ids = np.unique(self._key_terms[lo:hi])
+            ids = ids[np.argsort(-self.counts[ids] * len(self) + ids)].tolist()
+        return np.asarray(ids[:limit], dtype=np.int64)
+
+    def _precompute(self, prefix, lo, hi, top):
+        """Stores in `top` the completions for `prefix` and every longer prefix whose range exceeds SCAN_LIMIT."""
+        if prefix:
+            top[prefix] = self._rank(lo, hi, MAX_LIMIT)
+        n = len(prefix) + 1
+        i = lo
+        while i < hi:
+            key = self._key(i, n)
+            if len(key) < n:
+                i += 1  # the term equal to `prefix` itself has no longer prefix
+                continue
+            _, end = self._range(key, i, hi)
+            if end - i > SCAN_LIMIT:
+                self._precompute(key, i, end, top)
+            i = end
+
+    def suggest(self, prefix, limit=10):
+        """[(term, count)] for the most frequent terms with a word starting with `prefix`."""
+        prefix = normalize_title(prefix).encode("utf-8")
+        if not prefix:
+            return []
+        limit = max(1, min(limit, MAX_LIMIT))
+        ids = self._top.get(prefix)
+        if ids is None:
+            lo, hi = self._range(prefix)
+            ids = self._rank(lo, hi, limit)
+        return [(self.term(i), int(self.counts[i])) for i in ids[:limit]]
+
+
+def merge(results, limit):
+    """Merges per-field [(term, count)] lists into one list of suggestions, most frequent first."""
+    merged = [{"text": term, "field": field, "count": count}
+              for field, items in results.items() for term, count in items]
+    merged.sort(key=lambda s: (-s["count"], s["text"].casefold()))
+    return merged[:limit]
+
+
+class Suggester:
+    """
+    Completions from the current publications snapshot. Requests never build
+    an index: the one written with the snapshot is mapped when SnapshotReader
+    maps a newer snapshot. A snapshot without one (written before this
+    module existed) gets it built on a background thread, and until that is
+    done the previous snapshot's index keeps answering.
+    """
+
+    def __init__(self, reader):
+        self.reader = reader
+        self._current = None    # (snapshot, {field: PrefixIndex})
+        self._building = None   # snapshot whose index a background thread is building
+        self._lock = threading.Lock()
+
+    def indexes(self):
+        """{field: PrefixIndex} for the newest snapshot that has one, or None until the first is ready."""
+        snapshot = self.reader.get()
+        current = self._current
+        if current is not None and current[0] is snapshot:
+            return current[1]
+        with self._lock:
+            current = self._current
+            if current is not None and current[0] is snapshot:
+                return current[1]
+            if self._building is not snapshot:
+                indexes = load_suggestions(snapshot)
+                if indexes is not None:
+                    self._current = (snapshot, indexes)
+                    return indexes
+                self._building = snapshot
+                threading.Thread(target=self._build, args=(snapshot,), daemon=True).start()
+        return current[1] if current is not None else None
+
+    def _build(self, snapshot):
+        try:
+            write_suggestions(snapshot.columns, snapshot.path, snapshot.created_at)
+            indexes = load_suggestions(snapshot)
+            if indexes is None:
+                raise ValueError("the written file does not match the snapshot")
+            with self._lock:
+                self._current = (snapshot, indexes)
+        except Exception as e:
+            log("ERROR", "Building suggestions for %s failed, retrying on the next request: %s", snapshot.path, e)
+        finally:
+            with self._lock:
+                self._building = None
+
+    def suggest(self, prefix, fields=FIELDS, limit=10):
+        """Merged suggestions, or None while no index is ready."""
+        indexes = self.indexes()
+        if indexes is None:
+            return None
+        with timed("suggest"):
+            return merge({field: indexes[field].suggest(prefix, limit) for field in fields}, limit)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Author and keyword completions for a prefix.")
+    parser.add_argument("prefix")
+    parser.add_argument("--field", choices=FIELDS, default=None)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    from snapshot import SnapshotReader
+
+    snapshot = SnapshotReader().get()
+    start = time.perf_counter()
+    indexes = load_suggestions(snapshot)
+    if indexes is None:
+        print("[INFO] No suggestions file for this snapshot yet, building it")
+        write_suggestions(snapshot.columns, snapshot.path, snapshot.created_at)
+        indexes = load_suggestions(snapshot)
+    print(f"[INFO] Ready in {(time.perf_counter() - start) * 1e3:.1f} ms: "
+          + ", ".join(f"{len(index)} {field}s" for field, index in indexes.items()))
+    fields = [args.field] if args.field else FIELDS
+    for s in merge({field: indexes[field].suggest(args.prefix, args.limit) for field in fields}, args.limit):
+        print(f"    {s['count']:>5}  {s['field']:<8} {s['text']}")
@@ -0,0 +1,195 @@
+# summary_cache.py
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import cache_result
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), ".llm_cache")
+MAX_MEMORY_ENTRIES = 512
+MAX_DISK_BYTES = 256 * 1024 * 1024
+MAX_AGE = 30 * 24 * 60 * 60  # seconds
+EVICT_EVERY = 100  # writes between disk eviction passes
+
+
+def text_hash(text: str):
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def cache_key(model_name: str, template_version: str, text: str):
+    """Content address for one LLM output: (model, prompt template version, hash of input text)."""
+    raw = f"{model_name}\0{template_version}\0{text_hash(text)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def url_key(model_name: str, template_version: str, url: str):
+    """
+    Address for the latest output generated from the page at `url`, so a
+    repeat request can be answered before the page is fetched again.
+    """
+    return cache_key(model_name, f"{template_version}\0url", url)
+
+
+class SummaryCache:
+    """
+    Disk-backed cache for Gemini outputs with an in-memory LRU in front.
+    Each entry is a small JSON file under `directory`, sharded by key prefix.
+    Entries older than `max_age` are dropped, and the least recently used
+    files are removed once the directory grows past `max_bytes`.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_memory_entries=MAX_MEMORY_ENTRIES,
+                 max_bytes=MAX_DISK_BYTES, max_age=MAX_AGE):
+        self.directory = directory
+        self.max_memory_entries = max_memory_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _remember(self, key, value, created):
+        with self._lock:
+            self._memory[key] = (created, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key):
+        """Returns the cached value for `key`, or None on a miss."""
+        path = self._path(key)
+        with self._lock:
+            if key in self._memory:
+                created, value = self._memory[key]
+                if time.time() - created <= self.max_age:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    cache_result("llm_output", True)
+                    return value
+                # Expired: the file holds the same entry, so drop both.
+                del self._memory[key]
+                self._remove(path)
+                self.misses += 1
+                cache_result("llm_output", False)
+                return None
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            cache_result("llm_output", False)
+            return None
+
+        if time.time() - entry.get("created", 0) > self.max_age:
+            self._remove(path)
+            self.misses += 1
+            cache_result("llm_output", False)
+            return None
+
+        # Bump mtime so size-based eviction removes the least recently used files first.
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self._remember(key, entry["value"], entry.get("created", 0))
+        self.hits += 1
+        cache_result("llm_output", True)
+        return entry["value"]
+
+    def set(self, key, value):
+        created = time.time()
+        self._remember(key, value, created)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file and rename so readers never see a partial entry.
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"created": created, "value": value}, f)
+        os.replace(tmp, path)
+
+        with self._lock:
+            self._writes += 1
+            evict = self._writes % EVICT_EVERY == 0
+        if evict:
+            self.evict()
+
+    def get_or_generate(self, key, generate):
+        """Returns the cached value for `key`, calling `generate()` and storing its result on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = generate()
+            if value:
+                self.set(key, value)
+        return value
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def evict(self):
+        """Drops expired entries, then the least recently used ones until under max_bytes."""
+        if not os.path.isdir(self.directory):
+            return 0
+        now = time.time()
+        files = []
+        removed = 0
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if now - st.st_mtime > self.max_age:
+                    self._remove(path)
+                    removed += 1
+                else:
+                    files.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+            removed += 1
+
+        if removed:
+            with self._lock:
+                self._memory.clear()
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if os.path.isdir(self.directory):
+            for root, _, names in os.walk(self.directory):
+                for name in names:
+                    self._remove(os.path.join(root, name))
+
+
+default_cache = SummaryCache()
+
+
+def cached_generate(model, model_name, template_version, text, prompt, cache=None):
+    """
+    Runs `model.generate_content(prompt)` unless an output for the same model,
+    prompt template version and input text is already cached. `model` only needs
+    a `generate_content(prompt)` method returning an object with `.text`, so a
+    stub client works for offline use.
+    """
+    cache = cache or default_cache
+    key = cache_key(model_name, template_version, text)
+    return cache.get_or_generate(key, lambda: model.generate_content(prompt).text)
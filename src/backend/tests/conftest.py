@@ -0,0 +1,6 @@
+# conftest.py
+"""The backend modules import each other by name, as when run from src/backend."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
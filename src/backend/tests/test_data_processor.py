@@ -0,0 +1,59 @@
+import io
+import json
+
+import pytest
+
+from data_processor import extract_sections, iter_json_array
+
+RECORDS = [
+    {"url": "https://example.org/1", "summary": "**Purpose:** text, with [brackets] and \"quotes\""},
+    12345678901234567890,
+    -1.5e-3,
+    "ünïcødé ✓",
+    [],
+    {},
+    None,
+    True,
+    [1, [2, [3]], {"a": {"b": "]"}}],
+]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 1 << 16])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_iter_json_array_matches_json_load(chunk_size, indent):
+    text = json.dumps(RECORDS, indent=indent, ensure_ascii=False)
+    assert list(iter_json_array(io.StringIO(text), chunk_size)) == RECORDS
+
+
+@pytest.mark.parametrize("text", ["[]", "  [ ]  ", "\n[\n]\n"])
+def test_iter_json_array_empty(text):
+    assert list(iter_json_array(io.StringIO(text), 2)) == []
+
+
+@pytest.mark.parametrize("text", ['{"a": 1}', "[1, 2", '[{"a": 1}', "[1, }"])
+def test_iter_json_array_rejects_malformed_input(text):
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_array(io.StringIO(text), 3))
+
+
+def test_extract_sections_headings_and_bullets():
+    summary = "\n".join([
+        "Intro line that is not a section.",
+        "**Purpose:** Study bone loss",
+        "in mice.",
+        "* **Methods**: Spaceflight for 30 days.",
+        "- **Key Findings：**",
+        "  Loss was reduced.",
+        "• **Conclusion** Countermeasures work.",
+    ])
+    assert extract_sections(summary) == {
+        "Purpose": "Study bone loss in mice.",
+        "Methods": "Spaceflight for 30 days.",
+        "Key Findings": "Loss was reduced.",
+        "Conclusion": "Countermeasures work.",
+    }
+
+
+def test_extract_sections_without_headings():
+    assert extract_sections("Just a paragraph.\n* a bullet\n**") is None
+    assert extract_sections("") is None
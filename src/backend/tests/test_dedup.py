@@ -0,0 +1,77 @@
+import numpy as np
+
+from dedup import (BodyIndex, LSHIndex, TITLE_THRESHOLD, body_shingles, canonical_url, dedup_rows,
+                   find_duplicates, minhash, pmc_id, similarity, title_shingles)
+
+ABSTRACT = ("Spaceflight induces bone loss in mice through increased osteoclast activity. We flew female "
+            "mice on the International Space Station for thirty days and measured trabecular bone volume, "
+            "serum markers and gene expression in the femur, comparing them with ground controls housed "
+            "in identical habitats. Bone volume fell by a third and osteoclast genes were upregulated.")
+
+
+def test_pmc_id_and_canonical_url_forms():
+    forms = ["https://www.ncbi.nlm.nih.gov/pmc/articles/PMC4136787/",
+             "https://pmc.ncbi.nlm.nih.gov/articles/PMC4136787",
+             "https://europepmc.org/article/PMC/pmc4136787#abstract"]
+    assert {pmc_id(url) for url in forms} == {"PMC4136787"}
+    assert {canonical_url(url) for url in forms} == {"https://www.ncbi.nlm.nih.gov/pmc/articles/PMC4136787/"}
+    assert pmc_id("https://example.org/paper") is None
+    assert canonical_url(" https://example.org/paper#top ") == "https://example.org/paper/"
+
+
+def test_minhash_estimates_jaccard():
+    a = body_shingles(ABSTRACT)
+    b = body_shingles(ABSTRACT.replace("thirty", "forty"))
+    exact = len(np.intersect1d(a, b)) / len(np.union1d(a, b))
+    assert similarity(minhash(a), minhash(a)) == 1.0
+    assert abs(similarity(minhash(a), minhash(b)) - exact) < 0.15
+    assert similarity(minhash(a), minhash(title_shingles("Plant root growth in microgravity"))) < 0.2
+    assert minhash(title_shingles("")) is None
+
+
+def test_lsh_index_match_add_remove(tmp_path):
+    index = LSHIndex(TITLE_THRESHOLD)
+    signature = minhash(title_shingles("Spaceflight induces bone loss in mice"))
+    assert index.match_or_add("a", signature) == (None, 0.0)
+    match, score = index.match_or_add("b", minhash(title_shingles("Spaceflight induces bone loss in mice.")))
+    assert (match, score) == ("a", 1.0)
+    assert index.best_match(signature, exclude="a")[0] is None
+
+    path = str(tmp_path / "titles.npz")
+    index.save(path)
+    loaded = LSHIndex(TITLE_THRESHOLD)
+    assert loaded.load(path) == 1
+    assert loaded.best_match(signature)[0] == "a"
+    loaded.remove("a")
+    assert len(loaded) == 0 and loaded.best_match(signature)[0] is None
+    assert LSHIndex(TITLE_THRESHOLD).load(str(tmp_path / "missing.npz")) == 0
+
+
+def test_dedup_rows_merges_pmc_ids_and_only_reports_similar_titles():
+    rows = [("Spaceflight induces bone loss in mice", "https://www.ncbi.nlm.nih.gov/pmc/articles/PMC1/"),
+            ("Spaceflight induces bone loss in mice", "https://pmc.ncbi.nlm.nih.gov/articles/PMC1"),
+            ("ARG1 Functions in the Physiological Adaptation of Undifferentiated Plant Cells to Spaceflight",
+             "https://www.ncbi.nlm.nih.gov/pmc/articles/PMC2/"),
+            ("HSFA2 Functions in the Physiological Adaptation of Undifferentiated Plant Cells to Spaceflight",
+             "https://www.ncbi.nlm.nih.gov/pmc/articles/PMC3/")]
+    kept, merges, similar = dedup_rows(rows)
+    assert [url for _, url in kept] == [rows[0][1], rows[2][1], rows[3][1]]
+    assert merges == [{"url": rows[1][1], "into": rows[0][1], "reason": "pmc_id", "score": 1.0}]
+    assert [(s["url"], s["like"]) for s in similar] == [(rows[3][1], rows[2][1])]
+
+
+def test_body_index_and_find_duplicates():
+    bodies = BodyIndex()
+    assert bodies.check("a", ABSTRACT)[0] is None
+    assert bodies.check("b", ABSTRACT + " Reprinted with permission.")[0] == "a"
+    assert bodies.check("a", ABSTRACT)[0] is None  # re-checking a URL does not match itself
+    assert bodies.check("c", "")[0] is None
+
+    records = [{"url": "https://example.org/a", "title": "Bone loss in spaceflight", "text": ABSTRACT},
+               {"url": "https://example.org/b", "title": "Reprint: mice lose bone in orbit", "text": ABSTRACT},
+               {"url": "https://example.org/c", "title": "Arabidopsis roots in microgravity",
+                "text": "Roots grew in random directions aboard the station."}]
+    merges, similar = find_duplicates(records)
+    assert [(m["url"], m["into"], m["reason"]) for m in merges] == \
+        [("https://example.org/b", "https://example.org/a", "body")]
+    assert similar == []
@@ -0,0 +1,75 @@
+import random
+
+import pytest
+
+from graph import GraphIndex, node_id
+
+KEYWORDS = [f"keyword {i}" for i in range(60)]
+AUTHORS = [f"Author {i}" for i in range(80)]
+
+
+def record(rng, i):
+    return {"url": f"https://example.org/{i}", "title": f"Paper {i}", "date": str(2000 + i % 20),
+            "keywords": ", ".join(rng.sample(KEYWORDS, rng.randint(1, 5))),
+            "authors": ", ".join(rng.sample(AUTHORS, rng.randint(1, 3)))}
+
+
+def rebuilt(records):
+    index = GraphIndex(cache_path=None)
+    index.update(records)
+    return index
+
+
+def scores(index):
+    # Equal scores may be listed in either order, so compare the score lists.
+    return {url: [score for _, score in pairs] for url, pairs in index.neighbors.items()}
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_incremental_lists_equal_a_full_rebuild(seed):
+    rng = random.Random(seed)
+    records = {r["url"]: r for r in (record(rng, i) for i in range(400))}
+    index = GraphIndex(cache_path=None)
+    assert index.update(list(records.values())) == 400
+    incremental = 0
+    for step in range(40):
+        changed = [record(rng, i) for i in rng.sample(range(450), rng.randint(1, 6))]
+        records.update((r["url"], r) for r in changed)
+        if step % 3 == 0:
+            recomputed = index.upsert(changed)
+        else:
+            for url in rng.sample(sorted(records), rng.randint(0, 2)):
+                del records[url]
+            recomputed = index.update(list(records.values()))
+        incremental += recomputed < len(records)
+        assert set(index.neighbors) == set(records)
+        assert scores(index) == scores(rebuilt(list(records.values())))
+    assert incremental > 30  # the incremental path, not a rebuild, was checked
+
+
+def test_unchanged_records_recompute_nothing_and_cache_round_trips(tmp_path):
+    rng = random.Random(3)
+    records = [record(rng, i) for i in range(100)]
+    path = str(tmp_path / "graph.json")
+    index = GraphIndex(cache_path=path)
+    index.update(records)
+    assert index.update(records) == 0
+
+    cached = GraphIndex(cache_path=path)
+    assert cached.update(records) == 0
+    assert cached.neighbors == index.neighbors
+
+    records[0] = dict(records[0], keywords="keyword 1, keyword 2")
+    assert 1 <= cached.update(records) < len(records)
+    assert scores(cached) == scores(rebuilt(records))
+
+
+def test_elements_link_similar_publications():
+    records = [{"url": f"u{i}", "title": f"Paper {i}", "keywords": "bone, mice, spaceflight", "authors": "Ana Smith",
+                "date": "2020"} for i in range(3)]
+    index = rebuilt(records)
+    elements = index.elements()
+    types = [e["data"]["type"] for e in elements]
+    assert types.count("publication") == 3 and types.count("year") == 4  # one year node, three year edges
+    similar = {(e["data"]["source"], e["data"]["target"]) for e in elements if e["data"]["type"] == "similar"}
+    assert len(similar) == 3 and all(node_id(f"u{i}") in {a for pair in similar for a in pair} for i in range(3))
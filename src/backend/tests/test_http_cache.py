@@ -0,0 +1,64 @@
+import gzip
+import json
+
+import pytest
+from flask import Flask, request
+
+import http_cache
+from http_cache import PreparedBody, cached_response
+
+app = Flask(__name__)
+BODY = json.dumps([{"title": f"Publication {i}"} for i in range(100)]).encode("utf-8")
+
+
+def respond(prepared, **headers):
+    with app.test_request_context(headers=headers):
+        return cached_response(prepared, request, max_age=60)
+
+
+def test_picks_the_encoding_and_its_etag():
+    prepared = PreparedBody(BODY)
+    identity = respond(prepared)
+    assert identity.get_data() == BODY and "Content-Encoding" not in identity.headers
+    assert identity.headers["ETag"] == prepared.etags["identity"]
+    assert identity.headers["Vary"] == "Accept-Encoding"
+    assert identity.headers["Cache-Control"] == "public, max-age=60"
+
+    gzipped = respond(prepared, **{"Accept-Encoding": "gzip, deflate"})
+    assert gzipped.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(gzipped.get_data()) == BODY
+    assert gzipped.headers["ETag"] == prepared.etags["gzip"]
+
+    etags = {identity.headers["ETag"], gzipped.headers["ETag"]}
+    if http_cache.brotli is not None:
+        brotlied = respond(prepared, **{"Accept-Encoding": "gzip, br"})
+        assert brotlied.headers["Content-Encoding"] == "br"
+        assert http_cache.brotli.decompress(brotlied.get_data()) == BODY
+        etags.add(brotlied.headers["ETag"])
+    assert len(etags) == len(prepared.encodings)
+
+
+def test_small_bodies_are_not_compressed():
+    prepared = PreparedBody(b"[]")
+    assert list(prepared.encodings) == ["identity"]
+    response = respond(prepared, **{"Accept-Encoding": "gzip, br"})
+    assert response.get_data() == b"[]" and "Content-Encoding" not in response.headers
+
+
+@pytest.mark.parametrize("accept", ["", "gzip"])
+def test_matching_etag_answers_304(accept):
+    prepared = PreparedBody(BODY)
+    etag = respond(prepared, **{"Accept-Encoding": accept}).headers["ETag"]
+    for if_none_match in (etag, f'"other", {etag}', "*"):
+        response = respond(prepared, **{"Accept-Encoding": accept, "If-None-Match": if_none_match})
+        assert response.status_code == 304 and response.get_data() == b""
+        assert response.headers["ETag"] == etag
+
+
+def test_etag_of_another_encoding_does_not_match():
+    prepared = PreparedBody(BODY)
+    gzip_etag = prepared.etags["gzip"]
+    response = respond(prepared, **{"If-None-Match": gzip_etag})
+    assert response.status_code == 200 and response.get_data() == BODY
+    response = respond(PreparedBody(BODY + b" "), **{"Accept-Encoding": "gzip", "If-None-Match": gzip_etag})
+    assert response.status_code == 200
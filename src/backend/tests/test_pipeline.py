@@ -0,0 +1,157 @@
+import json
+
+import pytest
+
+import pipeline
+import snapshot
+import storage
+from benchmark import offline_backend
+from pipeline import Manifest, Pipeline
+
+URLS = [f"https://www.ncbi.nlm.nih.gov/pmc/articles/PMC{9000001 + i}/" for i in range(6)]
+ROWS = [(f"Publication {i}", url) for i, url in enumerate(URLS)]
+
+
+class Crash(BaseException):
+    """Stands in for the process being killed: not caught by the pipeline's error handling."""
+
+
+@pytest.fixture
+def backend(tmp_path, monkeypatch):
+    connect = storage.connect
+    db = str(tmp_path / "publications.db")
+    monkeypatch.setattr(storage, "connect", lambda db_path=db: connect(db_path))
+    export_json = storage.export_json
+    export_snapshot = snapshot.export_snapshot
+    monkeypatch.setattr(storage, "export_json", lambda: export_json(str(tmp_path / "nih_data.json")))
+    monkeypatch.setattr(snapshot, "export_snapshot", lambda: export_snapshot(str(tmp_path / "publications.snapshot")))
+    monkeypatch.setattr(pipeline, "WORK_DIR", str(tmp_path / ".pipeline"))
+    with offline_backend(page_latency=0, model_latency=0) as server:
+        yield server
+
+
+def manifest_path(tmp_path):
+    return str(tmp_path / ".pipeline" / "manifest.json")
+
+
+def count_calls(monkeypatch, name, fail_at=None):
+    """
+    Counts Pipeline.<name> calls. The `fail_at`-th call raises Crash, and so
+    does every Pipeline.process call after it, as if the process had died.
+    """
+    original = getattr(Pipeline, name)
+    process = Pipeline.process
+    calls = []
+
+    def wrapper(self, record):
+        calls.append(record["url"])
+        if len(calls) == fail_at:
+            raise Crash()
+        return original(self, record)
+
+    def guarded_process(self, url, llm_pool):
+        if fail_at and len(calls) >= fail_at:
+            raise Crash()
+        return process(self, url, llm_pool)
+
+    monkeypatch.setattr(Pipeline, "process", guarded_process)
+    monkeypatch.setattr(Pipeline, name, wrapper)
+    return calls
+
+
+def run(server, tmp_path, **kwargs):
+    manifest = Manifest(manifest_path(tmp_path))
+    kwargs.setdefault("dedup", False)
+    return Pipeline(manifest=manifest, fetcher=server.fetcher(max_workers=1), llm_workers=1, **kwargs).run(ROWS)
+
+
+def test_resumes_from_manifest_after_a_crash(backend, tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, "CHECKPOINT_INTERVAL", 0.0)
+    with monkeypatch.context() as crashing:
+        count_calls(crashing, "_summarize", fail_at=3)
+        with pytest.raises(Crash):
+            run(backend, tmp_path)
+    with open(manifest_path(tmp_path), encoding="utf-8") as f:
+        entries = json.load(f)["entries"]
+    # Two publications finished before the crash, but their records were still buffered.
+    finished = [url for url in URLS if "summarized" in entries[url]["stages"]]
+    assert finished == URLS[:2]
+    assert not any(entry["saved"] for entry in entries.values())
+    assert storage.load_records() == []
+
+    requests = backend.requests
+    summaries = count_calls(monkeypatch, "_summarize")
+    manifest = run(backend, tmp_path)
+    # The third publication crashed before its stages were checkpointed, so it starts over with the
+    # untouched ones; the first two are neither fetched nor summarized again, only saved.
+    assert backend.requests - requests == len(URLS) - 2
+    assert summaries == URLS[2:]
+    assert all(not manifest.pending(url, pipeline.STAGES) and manifest.get(url, "saved") for url in URLS)
+    records = {record["url"]: record for record in storage.load_records()}
+    assert sorted(records) == sorted(URLS)
+    assert all(record.get("summary") and record.get("keywords") for record in records.values())
+
+
+def test_rerun_skips_finished_publications(backend, tmp_path, monkeypatch):
+    run(backend, tmp_path)
+    requests = backend.requests
+    keywords = count_calls(monkeypatch, "_keywords")
+    summaries = count_calls(monkeypatch, "_summarize")
+    run(backend, tmp_path)
+    assert backend.requests == requests
+    assert keywords == [] and summaries == []
+
+
+def test_changed_content_resets_llm_stages(backend, tmp_path, monkeypatch):
+    run(backend, tmp_path)
+    changed = URLS[1]
+    pmc_id = changed.rstrip("/").rsplit("/", 1)[1]
+    backend.pages[pmc_id] = backend.page(pmc_id).replace(b"<p>", b"<p>Revised after review. ", 2)
+    keywords = count_calls(monkeypatch, "_keywords")
+    summaries = count_calls(monkeypatch, "_summarize")
+
+    manifest = run(backend, tmp_path, revalidate=True)
+    assert keywords == [changed] and summaries == [changed]
+    assert all(not manifest.pending(url, pipeline.STAGES) and manifest.get(url, "saved") for url in URLS)
+
+
+def test_checkpoints_are_throttled(backend, tmp_path, monkeypatch):
+    writes = []
+    write = pipeline._atomic_write_json
+
+    def counting_write(path, data):
+        if path == manifest_path(tmp_path):
+            writes.append(path)
+        write(path, data)
+
+    monkeypatch.setattr(pipeline, "_atomic_write_json", counting_write)
+    monkeypatch.setattr(pipeline, "CHECKPOINT_INTERVAL", 3600.0)
+    run(backend, tmp_path)
+    # Only the forced writes at the start and the end of the run.
+    assert len(writes) == 2
+
+    writes.clear()
+    monkeypatch.setattr(pipeline, "CHECKPOINT_INTERVAL", 0.0)
+    run(backend, tmp_path, revalidate=True)
+    assert len(writes) >= len(URLS) + 2
+
+
+def test_manifest_checkpoint_waits_for_the_interval(tmp_path, monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(pipeline.time, "monotonic", lambda: now[0])
+    manifest = Manifest(str(tmp_path / "manifest.json"))
+    manifest.mark("u1", "fetched")
+    manifest.checkpoint()
+    assert Manifest(manifest.path).pending("u1", ["fetched"]) == []
+
+    manifest.mark("u1", "parsed")
+    now[0] += pipeline.CHECKPOINT_INTERVAL / 2
+    manifest.checkpoint()
+    assert Manifest(manifest.path).pending("u1", ["parsed"]) == ["parsed"]
+    manifest.checkpoint(force=True)
+    assert Manifest(manifest.path).pending("u1", ["parsed"]) == []
+
+    manifest.mark("u1", "keywords")
+    now[0] += pipeline.CHECKPOINT_INTERVAL
+    manifest.checkpoint()
+    assert Manifest(manifest.path).pending("u1", ["keywords"]) == []
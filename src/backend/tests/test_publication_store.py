@@ -0,0 +1,79 @@
+import json
+import os
+
+import pytest
+
+import publication_store
+from publication_store import PublicationStore, StoreError
+
+RECORDS = [{"id": i, "title": f"Publication {i}", "url": f"u{i}"} for i in range(20)]
+
+
+def write(path, records, mtime_ns=None):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(records, f)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / "processed_data.json"
+    write(path, RECORDS, mtime_ns=1_000_000_000_000_000_000)
+    return path
+
+
+def test_reloads_when_mtime_or_size_changes(path):
+    store = PublicationStore(str(path))
+    full = store.all()
+    assert store.records == RECORDS and store.all() is full
+
+    # Same size, newer mtime.
+    changed = [dict(r, title=r["title"].upper()) for r in RECORDS]
+    write(path, changed, mtime_ns=2_000_000_000_000_000_000)
+    assert store.records == changed and store.all() is not full
+
+    # Different size, same mtime.
+    write(path, RECORDS[:5], mtime_ns=2_000_000_000_000_000_000)
+    assert store.records == RECORDS[:5] and len(store) == 5
+
+
+def test_unchanged_file_is_not_read_again(path, monkeypatch):
+    store = PublicationStore(str(path))
+    store.all()
+    monkeypatch.setattr(publication_store.json, "load", lambda f: pytest.fail("file read again"))
+    assert len(store) == len(RECORDS)
+
+
+def test_pages_are_sliced_and_cached(path):
+    store = PublicationStore(str(path))
+    page = store.page(offset=5, limit=3, fields=["title"])
+    assert json.loads(page.encodings["identity"]) == [{"title": f"Publication {i}"} for i in (5, 6, 7)]
+    assert store.page(offset=5, limit=3, fields=["title"]) is page
+    assert store.page() is store.all()
+
+    write(path, RECORDS[::-1], mtime_ns=2_000_000_000_000_000_000)
+    reloaded = store.page(offset=5, limit=3, fields=["title"])
+    assert reloaded is not page
+    assert json.loads(reloaded.encodings["identity"]) == [{"title": f"Publication {i}"} for i in (14, 13, 12)]
+
+
+def test_page_cache_drops_the_least_recently_used(path, monkeypatch):
+    monkeypatch.setattr(publication_store, "PAGE_CACHE_SIZE", 2)
+    store = PublicationStore(str(path))
+    first, second = store.page(0, 5), store.page(5, 5)
+    assert store.page(0, 5) is first  # now the most recently used
+    store.page(10, 5)
+    assert store.page(0, 5) is first
+    assert store.page(5, 5) is not second
+
+
+def test_missing_or_malformed_file(tmp_path):
+    with pytest.raises(StoreError) as missing:
+        PublicationStore(str(tmp_path / "missing.json")).all()
+    assert missing.value.status == 404
+    broken = tmp_path / "broken.json"
+    broken.write_text("[{", encoding="utf-8")
+    with pytest.raises(StoreError) as malformed:
+        PublicationStore(str(broken)).all()
+    assert malformed.value.status == 500
@@ -0,0 +1,54 @@
+import pytest
+
+import search_index
+import storage
+from search_index import SearchIndex, StorageSearchIndex
+
+
+def records(n):
+    return [{"url": f"https://example.org/{i}",
+             "title": "bone loss in mice" if i < 3 else "plant roots in microgravity",
+             "authors": "Ana Smith, Bo Ito" if i % 2 else "Chen Li",
+             "keywords": "bone, mice" if i < 3 else "roots",
+             "date": str(2010 + i % 10)} for i in range(n)]
+
+
+def scores(result):
+    return sorted((r["url"], r["score"]) for r in result["results"])
+
+
+@pytest.mark.parametrize("compact_ratio", [0.99, search_index.COMPACT_RATIO])
+def test_bm25_counts_only_live_documents(monkeypatch, compact_ratio):
+    monkeypatch.setattr(search_index, "COMPACT_RATIO", compact_ratio)
+    index = SearchIndex(records(40))
+    for _ in range(20):
+        index.add({"url": "https://example.org/0", "title": "bone loss in mice", "keywords": "bone, mice",
+                   "date": "2010"})
+    fresh = SearchIndex([r for r in index.docs if r is not None])
+    assert len(index) == len(fresh) == 40
+    assert scores(index.search(q="bone mice")) == scores(fresh.search(q="bone mice"))
+    assert index.search(q="bone")["total"] == 3
+
+
+def test_filters_and_paging():
+    index = SearchIndex(records(40))
+    assert index.search(author="smith")["total"] == 20
+    assert index.search(keyword="Roots", year_from=2015, year_to=2016)["total"] == 8
+    page = index.search(limit=5, offset=5)
+    assert page["total"] == 40 and len(page["results"]) == 5
+    years = [int(r["date"]) for r in index.search(limit=40)["results"]]
+    assert years == sorted(years, reverse=True)
+
+
+def test_storage_index_picks_up_new_rows(tmp_path, monkeypatch):
+    connect = storage.connect
+    db = str(tmp_path / "publications.db")
+    monkeypatch.setattr(storage, "connect", lambda db_path=db: connect(db_path))
+    storage.upsert(records(10))
+    index = StorageSearchIndex()
+    assert index.search(q="plant")["total"] == 7
+
+    storage.upsert([{"url": "https://example.org/3", "title": "bone loss in rats"}])
+    assert index.sync(force=True) == 1
+    assert index.search(q="plant")["total"] == 6
+    assert index.search(q="rats")["results"][0]["keywords"] == "roots"  # merged with the stored fields
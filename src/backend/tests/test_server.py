@@ -0,0 +1,45 @@
+import pytest
+
+import server
+from app import create_app
+
+
+@pytest.fixture
+def client():
+    return create_app({"TITLE_INDEX_REFRESH": False}).test_client()
+
+
+class FakeSearchIndex:
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = []
+
+    def search(self, **kwargs):
+        if self.error:
+            raise self.error
+        self.calls.append(kwargs)
+        return {"total": 0, "results": []}
+
+
+@pytest.mark.parametrize("query", ["limit=abc", "offset=-1", "year_from=20x5"])
+def test_search_rejects_bad_parameters_with_json_400(client, monkeypatch, query):
+    monkeypatch.setattr(server, "search_index", lambda: FakeSearchIndex())
+    response = client.get(f"/search?{query}")
+    assert response.status_code == 400
+    assert response.get_json()["error"].startswith("Invalid parameter")
+
+
+def test_search_errors_are_json_500(client, monkeypatch):
+    monkeypatch.setattr(server, "search_index", lambda: FakeSearchIndex(RuntimeError("index unavailable")))
+    response = client.get("/search?q=bone")
+    assert response.status_code == 500
+    assert response.get_json() == {"error": "index unavailable"}
+
+
+def test_search_passes_parameters_and_caps_limit(client, monkeypatch):
+    index = FakeSearchIndex()
+    monkeypatch.setattr(server, "search_index", lambda: index)
+    response = client.get("/search?q=bone&author=smith&keyword=mice&year_from=2010&year_to=2020&limit=1000&offset=5")
+    assert response.status_code == 200 and response.get_json() == {"total": 0, "results": []}
+    assert index.calls == [{"q": "bone", "author": "smith", "keyword": "mice", "year_from": 2010, "year_to": 2020,
+                            "limit": server.MAX_SEARCH_LIMIT, "offset": 5}]
@@ -0,0 +1,165 @@
+import json
+import random
+
+import numpy as np
+import pytest
+
+import similarity
+import storage
+from similarity import SimilarityIndex, StorageSimilarity, pub_ids
+
+TOPICS = ["bone loss osteoclast mice", "plant root gravitropism arabidopsis", "muscle atrophy rodent spaceflight",
+          "radiation dna damage cells", "microbial biofilm station surfaces"]
+
+
+def records(n, seed=0):
+    rng = random.Random(seed)
+    return [{"url": f"https://www.ncbi.nlm.nih.gov/pmc/articles/PMC{1000 + i}/",
+             "title": f"{TOPICS[i % len(TOPICS)]} study {i}",
+             "keywords": ", ".join(rng.sample(TOPICS[i % len(TOPICS)].split(), 2)),
+             "authors": "Ana Smith", "date": "2020"} for i in range(n)]
+
+
+def related_urls(index, url, k=5):
+    return [(r["url"], r["score"]) for r in index.related(url, k)["results"]]
+
+
+def test_related_finds_the_same_topic_and_resolves_ids():
+    index = SimilarityIndex(directory=None)
+    assert index.add_many(records(50)) == 50
+    url = records(1)[0]["url"]
+    result = index.related(url, 5)
+    assert result["id"] == pub_ids(url)[0]
+    assert len(result["results"]) == 5
+    assert all(r["title"].startswith(TOPICS[0]) for r in result["results"])
+    assert index.related("PMC1000", 5) == index.related(pub_ids(url)[0], 5) == result
+    assert index.related("PMC9999") is None
+    assert index.add_many(records(50)) == 0  # unchanged records are skipped by hash
+
+
+def test_changed_records_retire_their_old_row(monkeypatch):
+    monkeypatch.setattr(similarity, "COMPACT_RATIO", 0.99)
+    index = SimilarityIndex(directory=None)
+    index.add_many(records(50))
+    moved = dict(records(1)[0], title="radiation dna damage cells revisited", keywords="radiation, dna")
+    assert index.add_many([moved]) == 1
+    assert len(index) == 50 and index.tf.shape[0] == 51 and not index.alive[0]
+    # The retired row is neither a result nor counted in document frequencies.
+    assert all(r["url"] != moved["url"] or r["title"] == moved["title"]
+               for r in index.related(records(5)[3]["url"], 10)["results"])
+    fresh = SimilarityIndex(directory=None)
+    fresh.add_many([r for r in records(50) if r["url"] != moved["url"]] + [moved])
+    assert np.array_equal(index.df, fresh.df)
+
+
+def test_compaction_drops_retired_rows_and_keeps_results(monkeypatch):
+    monkeypatch.setattr(similarity, "COMPACT_RATIO", 0.25)
+    index = SimilarityIndex(directory=None)
+    index.add_many(records(40))
+    changed = [dict(r, title=r["title"] + " revisited") for r in records(40)[:15]]
+    index.add_many(changed)
+    assert index.tf.shape[0] == 40 and index.alive.all()
+    fresh = SimilarityIndex(directory=None)
+    fresh.add_many(changed + records(40)[15:])
+    url = records(1)[0]["url"]
+    assert sorted(related_urls(index, url, 50)) == sorted(related_urls(fresh, url, 50))
+
+
+def test_idf_is_reweighted_only_after_the_corpus_drifts():
+    index = SimilarityIndex(directory=None)
+    index.add_many(records(100))
+    assert index.weighted_at == 100
+    idf = index.idf.copy()
+    index.add_many(records(105)[100:])
+    assert index.weighted_at == 100 and np.array_equal(index.idf, idf)
+    assert index.W.shape[0] == 105
+    index.add_many(records(120)[105:])
+    assert index.weighted_at == 120 and not np.array_equal(index.idf, idf)
+
+
+def test_saved_index_round_trips(tmp_path, monkeypatch):
+    monkeypatch.setattr(similarity, "COMPACT_RATIO", 0.99)
+    directory = str(tmp_path / "index")
+    index = SimilarityIndex(directory)
+    index.add_many(records(60))
+    index.add_many([dict(records(1)[0], title="changed title")])
+    index.state = {"scanned": True, "synced_version": 7}
+    index.save()
+
+    loaded = SimilarityIndex(directory)
+    assert loaded.state == index.state
+    assert np.array_equal(loaded.alive, index.alive) and loaded.hashes == index.hashes
+    assert np.array_equal(loaded.df, index.df) and loaded.weighted_at == index.weighted_at
+    for url in (r["url"] for r in records(5)):
+        assert related_urls(loaded, url) == related_urls(index, url)
+
+
+def test_mismatched_or_unreadable_files_start_over(tmp_path):
+    directory = str(tmp_path / "index")
+    index = SimilarityIndex(directory)
+    index.add_many(records(10))
+    index.save()
+    meta_path = index._paths()[2]
+    with open(meta_path, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    meta["rows"] = meta["rows"][:5]  # as if a save was interrupted between files
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    assert len(SimilarityIndex(directory)) == 0
+    with open(index._paths()[0], "wb") as f:
+        f.write(b"not an npz")
+    assert len(SimilarityIndex(directory)) == 0
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    connect = storage.connect
+    db = str(tmp_path / "publications.db")
+    monkeypatch.setattr(storage, "connect", lambda db_path=db: connect(db_path))
+    full_scans = []
+    changes_since = storage.changes_since
+
+    def counting(since=None, conn=None):
+        if since is None:
+            full_scans.append(1)
+        return changes_since(since, conn)
+
+    monkeypatch.setattr(storage, "changes_since", counting)
+    return full_scans
+
+
+def test_storage_similarity_saves_only_when_rows_change(tmp_path, database, monkeypatch):
+    saves = []
+    save = SimilarityIndex.save
+    monkeypatch.setattr(SimilarityIndex, "save", lambda self: saves.append(1) or save(self))
+    related = StorageSimilarity(tmp_path / "processed_data.json", directory=str(tmp_path / "index"))
+    storage.upsert(records(20))
+    assert related.sync(force=True) == 20 and len(saves) == 1
+
+    storage.upsert([{"url": records(1)[0]["url"], "date": "2021"}])  # not part of the vectorized text
+    assert related.sync(force=True) == 0 and len(saves) == 1
+    assert related.sync(force=True) == 0 and len(saves) == 1
+
+    storage.upsert([dict(records(1)[0], title="changed title")])
+    assert related.sync(force=True) == 1 and len(saves) == 2
+    assert len(database) == 1  # only the first sync compared every record
+
+
+def test_storage_similarity_does_not_rescan_an_empty_database(tmp_path, database):
+    related = StorageSimilarity(tmp_path / "processed_data.json", directory=str(tmp_path / "index"))
+    for _ in range(3):
+        assert related.sync(force=True) == 0
+    assert len(database) == 1
+    storage.upsert(records(3))
+    assert related.sync(force=True) == 3 and len(database) == 1
+
+
+def test_storage_similarity_joins_summaries_from_processed_data(tmp_path, database):
+    processed = tmp_path / "processed_data.json"
+    url = records(1)[0]["url"]
+    processed.write_text(json.dumps([{"url": url, "summary": "osteoclast bone resorption in microgravity"},
+                                     {"url": "Unknown_2", "summary": "not a publication"}]))
+    related = StorageSimilarity(processed, directory=str(tmp_path / "index"))
+    storage.upsert(records(10))
+    assert related.sync(force=True) == 10
+    assert len(related.index) == 10
@@ -0,0 +1,108 @@
+import os
+
+import numpy as np
+import pytest
+
+import snapshot
+from snapshot import ColumnFile, Snapshot, SnapshotReader, write_columns, write_snapshot
+
+PMC = "https://www.ncbi.nlm.nih.gov/pmc/articles/"
+RECORDS = [
+    {"url": PMC + "PMC1/", "title": "Bone loss in mice during spaceflight", "authors": "Smith J, Doe A",
+     "date": "2014 Aug 18", "keywords": "Microgravity, bone loss, mice"},
+    {"url": PMC + "PMC2/", "title": "Plant roots in microgravity", "authors": "Doe A", "date": "2019",
+     "keywords": "roots, Microgravity"},
+    {"url": "https://example.org/papers/3", "title": "Radiation and the café crew", "authors": "unknown",
+     "date": "Unknown"},
+    {"url": PMC + "PMC4/", "title": "", "authors": ["Müller K", "Smithson B"], "date": "2021 Jan",
+     "keywords": ["radiation"]},
+]
+
+
+@pytest.fixture
+def snap(tmp_path):
+    path = str(tmp_path / "publications.snapshot")
+    assert write_snapshot(RECORDS + [{"title": "no url"}, "not a record"], path) == len(RECORDS)
+    snap = Snapshot(path)
+    yield snap
+    snap.close()
+
+
+def test_write_columns_round_trip(tmp_path):
+    path = str(tmp_path / "columns")
+    columns = {
+        "a": np.arange(10, dtype=np.int16),
+        "b": np.array([1.5, -2.25], dtype=np.float64),
+        "empty": np.zeros(0, dtype=np.int32),
+        "bytes": np.frombuffer("héllo".encode("utf-8"), dtype=np.uint8),
+    }
+    write_columns(path, columns, rows=10, created_at=123.0)
+    mapped = ColumnFile(path)
+    assert mapped.header["rows"] == 10 and mapped.created_at == 123.0
+    for name, array in columns.items():
+        assert mapped.columns[name].dtype == array.dtype
+        assert np.array_equal(mapped.columns[name], array)
+        assert mapped.header["columns"][name]["offset"] % snapshot.ALIGN == 0
+    assert not mapped.columns["a"].flags.writeable
+    mapped.close()
+    assert os.listdir(tmp_path) == ["columns"]  # no temp file left behind
+
+
+def test_not_a_snapshot(tmp_path):
+    path = tmp_path / "other"
+    path.write_bytes(b"NOTSNAP!" + bytes(64))
+    with pytest.raises(ValueError):
+        ColumnFile(str(path))
+
+
+def test_records_round_trip(snap):
+    assert len(snap) == len(RECORDS)
+    assert snap.records() == [
+        RECORDS[0],
+        RECORDS[1],
+        {"url": "https://example.org/papers/3", "title": "Radiation and the café crew", "authors": "",
+         "date": "Unknown"},
+        {"url": PMC + "PMC4/", "title": "", "authors": "Müller K, Smithson B", "date": "2021 Jan",
+         "keywords": "radiation"},
+    ]
+    assert snap.records([3, 0]) == [snap.record(3), snap.record(0)]
+    assert list(snap.columns["year"]) == [2014, 2019, 0, 2021]
+
+
+def test_filter(snap):
+    def rows(**kwargs):
+        return list(snap.filter(**kwargs))
+
+    assert rows() == [0, 1, 2, 3]
+    assert rows(title="MICROGRAVITY") == [1]
+    assert rows(title="café") == [2]
+    # A match has to fall inside one title, not run into the next.
+    assert rows(title="spaceflightplant") == []
+    assert rows(author="doe") == [0, 1]
+    assert rows(author="smith") == [0, 3]
+    assert rows(author="unknown") == []
+    assert rows(keyword="microgravity") == [0, 1]
+    assert rows(keyword="micro") == []
+    assert rows(year_from=2015) == [1, 3]
+    assert rows(year_to=2019) == [0, 1]
+    assert rows(keyword="Microgravity", author="smith", year_from=2010, year_to=2015) == [0]
+
+
+def test_reader_maps_a_replaced_file(tmp_path, monkeypatch):
+    path = str(tmp_path / "publications.snapshot")
+    write_snapshot(RECORDS, path)
+    now = [100.0]
+    monkeypatch.setattr(snapshot.time, "monotonic", lambda: now[0])
+    reader = SnapshotReader(path)
+    first = reader.get()
+    assert len(first) == len(RECORDS)
+
+    write_snapshot(RECORDS[:2], path)
+    assert reader.get() is first  # not checked again within CHECK_INTERVAL
+    now[0] += snapshot.CHECK_INTERVAL
+    second = reader.get()
+    assert second is not first and len(second) == 2
+    # The old mapping stays readable for requests still holding it.
+    assert first.record(3)["authors"] == "Müller K, Smithson B"
+    now[0] += snapshot.CHECK_INTERVAL
+    assert reader.get() is second
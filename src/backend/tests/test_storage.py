@@ -0,0 +1,81 @@
+import threading
+
+import pytest
+
+import storage
+
+
+@pytest.fixture
+def conn(tmp_path):
+    return storage.connect(str(tmp_path / "publications.db"))
+
+
+def test_upsert_merges_fields_and_ignores_none(conn):
+    storage.upsert([{"url": "u1", "title": "T", "keywords": "bone", "summary": "S"}], conn=conn)
+    storage.upsert([{"url": "u1", "title": "T2", "keywords": None, "summary": None, "date": "2020"}], conn=conn)
+    assert storage.load_records(conn=conn) == [{"url": "u1", "title": "T2", "keywords": "bone", "summary": "S",
+                                               "date": "2020"}]
+    assert storage.upsert([{"title": "no url"}, "not a record"], conn=conn) == 0
+
+
+def test_changes_since_follows_write_order(conn):
+    records, first = storage.changes_since(None, conn=conn)
+    assert records == [] and first is None
+    storage.upsert([{"url": "u1"}, {"url": "u2"}], conn=conn)
+    records, v1 = storage.changes_since(first, conn=conn)
+    assert [r["url"] for r in records] == ["u1", "u2"]
+    storage.upsert([{"url": "u1", "title": "again"}], conn=conn)
+    records, v2 = storage.changes_since(v1, conn=conn)
+    assert v2 > v1 and records == [{"url": "u1", "title": "again"}]
+    assert storage.changes_since(v2, conn=conn) == ([], v2)
+
+
+def test_changes_since_sees_every_write_from_two_connections(tmp_path):
+    path = str(tmp_path / "publications.db")
+    storage.connect(path)
+    writes = 100
+    start = threading.Barrier(3)
+
+    def writer(name):
+        conn = storage.connect(path)  # connections are per thread
+        start.wait()
+        for i in range(writes):
+            storage.upsert([{"url": f"{name}-{i}"}], conn=conn)
+
+    threads = [threading.Thread(target=writer, args=(name,)) for name in ("a", "b")]
+    for thread in threads:
+        thread.start()
+    reader = storage.connect(path)
+    start.wait()
+    seen, versions, cursor = [], [], None
+    while any(thread.is_alive() for thread in threads) or len(seen) < 2 * writes:
+        records, latest = storage.changes_since(cursor, conn=reader)
+        if records:
+            versions.append(latest)
+            seen.extend(r["url"] for r in records)
+        cursor = latest
+    for thread in threads:
+        thread.join()
+
+    assert versions == sorted(set(versions))  # strictly increasing
+    assert sorted(seen) == sorted(f"{name}-{i}" for name in ("a", "b") for i in range(writes))
+    # One version per transaction, whichever connection wrote it.
+    (distinct,) = reader.execute("SELECT COUNT(DISTINCT version) FROM publications").fetchone()
+    assert distinct == 2 * writes
+
+
+def test_version_column_is_added_to_old_databases(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / "old.db")
+    old = sqlite3.connect(path)
+    old.execute("CREATE TABLE publications (url TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)")
+    old.executemany("INSERT INTO publications VALUES (?, ?, ?)", [("u1", '{"url": "u1"}', 2.0),
+                                                                    ("u2", '{"url": "u2"}', 1.0)])
+    old.commit()
+    old.close()
+    conn = storage.connect(path)
+    records, latest = storage.changes_since(None, conn=conn)
+    assert [r["url"] for r in records] == ["u1", "u2"] and latest == 2
+    storage.upsert([{"url": "u3"}], conn=conn)
+    assert storage.changes_since(latest, conn=conn)[0] == [{"url": "u3"}]
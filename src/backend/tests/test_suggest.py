@@ -0,0 +1,139 @@
+import random
+import time
+
+import pytest
+
+import snapshot
+import suggest
+from csv_index import normalize_title
+from suggest import PrefixIndex
+
+WORDS = ["micro", "microgravity", "mice", "Müller", "müller", "Éclair", "straße", "bone", "a", "ab", "abc"]
+
+
+def random_counts(n, seed=0):
+    rng = random.Random(seed)
+    counts = {}
+    for _ in range(n):
+        term = " ".join(rng.choices(WORDS, k=rng.randint(1, 3)))
+        if rng.random() < 0.5:
+            term += f" {rng.randint(0, 300)}"
+        counts[term] = counts.get(term, 0) + rng.randint(1, 9)
+    counts["unknown"] = 1000
+    return counts
+
+
+def word_starts(term):
+    return [0] + [i + 1 for i, c in enumerate(term) if c == " "]
+
+
+def normalized_totals(counts):
+    totals = {}
+    for term, count in counts.items():
+        normalized = normalize_title(term)
+        if normalized not in suggest.IGNORED:
+            totals[normalized] = totals.get(normalized, 0) + count
+    return totals
+
+
+def brute_force(totals, prefix, limit):
+    prefix = normalize_title(prefix)
+    if not prefix:
+        return []
+    found = [t for t in totals if any(t[i:].startswith(prefix) for i in word_starts(t))]
+    found.sort(key=lambda t: (-totals[t], t))
+    return [(t, totals[t]) for t in found[:limit]]
+
+
+@pytest.fixture
+def small_scan_limit(monkeypatch):
+    # Precompute prefixes at a size the test data reaches, so both lookup paths are exercised.
+    monkeypatch.setattr(suggest, "SCAN_LIMIT", 64)
+
+
+def prefixes(counts, n=100, seed=1):
+    rng = random.Random(seed)
+    picked = ["m", "mi", "mu", "mü", "e", "é", "st", "stra", "a", "ab", "1", "12", "zz", "bone 1", "ß", "", "  "]
+    picked += [term[:rng.randint(1, 8)] for term in rng.sample(sorted(counts), n)]
+    return picked
+
+
+def test_prefix_index_matches_brute_force(small_scan_limit):
+    counts = random_counts(3000)
+    index = PrefixIndex.from_counts(counts)
+    totals = normalized_totals(counts)
+    assert index._top  # some prefixes were precomputed
+    for prefix in prefixes(counts):
+        for limit in (1, 5, 20):
+            got = [(normalize_title(term), count) for term, count in index.suggest(prefix, limit)]
+            assert got == brute_force(totals, prefix, limit), (prefix, limit)
+
+
+def test_prefix_index_shows_most_common_spelling():
+    index = PrefixIndex.from_counts({"John Smith": 3, "john smith": 1, "SMITH J": 2})
+    assert index.suggest("smi") == [("John Smith", 4), ("SMITH J", 2)]
+    assert index.suggest("unknown") == []
+
+
+def test_written_index_matches_in_memory(tmp_path, small_scan_limit):
+    rng = random.Random(2)
+    authors = [f"{first} {last}" for first in ("Ana", "Bo", "Chen") for last in ("Smith", "Müller", "Ito")]
+    records = [{"url": f"https://example.org/{i}", "title": f"Paper {i}", "date": "2020",
+                "authors": ", ".join(rng.sample(authors, 2)),
+                "keywords": ", ".join(rng.sample(WORDS, 2) + [WORDS[0]])} for i in range(300)]
+    path = str(tmp_path / "publications.snapshot")
+    rows, columns = snapshot.build_columns(records)
+    suggest.write_suggestions(columns, path, 123.0)
+    snapshot.write_columns(path, columns, rows=rows, created_at=123.0)
+
+    mapped = suggest.load_suggestions(snapshot.Snapshot(path))
+    in_memory = suggest.build(records)
+    for field in suggest.FIELDS:
+        for prefix in ("a", "mi", "mü", "sm", "ito", "x"):
+            assert mapped[field].suggest(prefix, 10) == in_memory[field].suggest(prefix, 10)
+
+    snapshot.write_columns(path, columns, rows=rows, created_at=456.0)
+    assert suggest.load_suggestions(snapshot.Snapshot(path)) is None  # written for another snapshot
+
+
+class FakeReader:
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+
+    def get(self):
+        return self.snapshot
+
+
+def wait_for(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_suggester_builds_in_background_and_retries_after_a_failure(tmp_path, monkeypatch):
+    records = [{"url": f"https://example.org/{i}", "title": f"Paper {i}", "date": "2020",
+                "authors": "Ana Smith", "keywords": "microgravity, bone"} for i in range(20)]
+    path = str(tmp_path / "publications.snapshot")
+    rows, columns = snapshot.build_columns(records)
+    snapshot.write_columns(path, columns, rows=rows)  # no suggestions file yet
+    suggester = suggest.Suggester(FakeReader(snapshot.Snapshot(path)))
+
+    write = suggest.write_suggestions
+    calls = []
+
+    def failing_once(*args):
+        calls.append(args)
+        if len(calls) == 1:
+            raise OSError("disk full")
+        write(*args)
+
+    monkeypatch.setattr(suggest, "write_suggestions", failing_once)
+    assert suggester.suggest("mic") is None
+    wait_for(lambda: suggester._building is None)
+    assert suggester._current is None
+
+    assert suggester.suggest("mic") is None  # the failed build is retried
+    wait_for(lambda: suggester._current is not None)
+    assert len(calls) == 2
+    assert suggester.suggest("mic") == [{"text": "microgravity", "field": "keyword", "count": 20}]
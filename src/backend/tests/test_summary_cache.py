@@ -0,0 +1,99 @@
+import os
+import threading
+import time
+
+import summary_cache
+from summary_cache import SummaryCache, cache_key, url_key
+
+
+def test_keys_depend_on_model_template_and_text():
+    key = cache_key("model", "v1", "text")
+    assert key == cache_key("model", "v1", "text")
+    assert len({key, cache_key("other", "v1", "text"), cache_key("model", "v2", "text"),
+                cache_key("model", "v1", "other")}) == 4
+    assert url_key("model", "v1", "https://example.org/") != cache_key("model", "v1", "https://example.org/")
+
+
+def test_set_then_get_from_memory_and_disk(tmp_path):
+    cache = SummaryCache(str(tmp_path))
+    cache.set("ab12", "summary")
+    assert cache.get("ab12") == "summary"
+    assert os.path.exists(tmp_path / "ab" / "ab12.json")
+    # A new instance has an empty memory LRU and reads the file.
+    assert SummaryCache(str(tmp_path)).get("ab12") == "summary"
+    assert cache.get("cd34") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_memory_lru_is_bounded(tmp_path):
+    cache = SummaryCache(str(tmp_path), max_memory_entries=2)
+    for key in ("aa01", "aa02", "aa03"):
+        cache.set(key, key)
+    assert list(cache._memory) == ["aa02", "aa03"]
+    assert cache.get("aa01") == "aa01"  # still on disk
+
+
+def test_expired_entries_are_misses_and_removed(tmp_path):
+    cache = SummaryCache(str(tmp_path), max_age=60)
+    cache.set("ab12", "summary")
+    cache._memory.clear()
+    path = cache._path("ab12")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"created": %f, "value": "summary"}' % (time.time() - 120))
+    assert cache.get("ab12") is None
+    assert not os.path.exists(path)
+
+
+def test_evict_removes_least_recently_used_over_max_bytes(tmp_path):
+    cache = SummaryCache(str(tmp_path), max_bytes=0)
+    for n, key in enumerate(("aa01", "aa02", "aa03")):
+        cache.set(key, "x" * 100)
+        os.utime(cache._path(key), (1000 + n, 1000 + n))
+    size = os.path.getsize(cache._path("aa03"))
+    cache.max_bytes = size
+    cache.max_age = float("inf")
+    assert cache.evict() == 2
+    assert not cache._memory
+    assert [cache.get(k) for k in ("aa01", "aa02", "aa03")] == [None, None, "x" * 100]
+
+
+def test_get_or_generate_calls_once_and_skips_empty_results(tmp_path):
+    cache = SummaryCache(str(tmp_path))
+    calls = []
+
+    def generate():
+        calls.append(1)
+        return "summary"
+
+    assert cache.get_or_generate("ab12", generate) == "summary"
+    assert cache.get_or_generate("ab12", generate) == "summary"
+    assert len(calls) == 1
+    assert cache.get_or_generate("cd34", lambda: "") == ""
+    assert cache.get("cd34") is None
+
+
+def test_memory_hits_expire_like_disk_hits(tmp_path, monkeypatch):
+    cache = SummaryCache(str(tmp_path), max_age=60)
+    cache.set("ab12", "summary")
+    assert cache.get("ab12") == "summary"
+    now = time.time()
+    monkeypatch.setattr(summary_cache.time, "time", lambda: now + 120)
+    assert cache.get("ab12") is None
+    assert "ab12" not in cache._memory
+    assert not os.path.exists(cache._path("ab12"))
+
+
+def test_concurrent_writes_are_all_counted(tmp_path, monkeypatch):
+    monkeypatch.setattr(summary_cache, "EVICT_EVERY", 10 ** 9)
+    cache = SummaryCache(str(tmp_path))
+
+    def write(n):
+        for i in range(50):
+            cache.set(f"{n:02d}{i:02d}", "x")
+
+    threads = [threading.Thread(target=write, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache._writes == 400
@@ -0,0 +1,58 @@
+import pytest
+
+import fetcher
+from fetcher import TokenBucket
+from llm_client import per_minute_bucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        # Like a real clock, time always moves on, even when rounding leaves a wait of ~1e-16 s.
+        self.now += max(seconds, 1e-6)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(fetcher, "time", clock)
+    return clock
+
+
+def test_full_bucket_serves_capacity_then_waits_for_refill(clock):
+    bucket = TokenBucket(rate=2.0, capacity=4)
+    for _ in range(4):
+        bucket.acquire()
+    assert clock.now == 0.0
+    bucket.acquire()
+    assert clock.now == pytest.approx(0.5)
+    bucket.acquire(2)
+    assert clock.now == pytest.approx(1.5)
+
+
+def test_refill_is_capped_at_capacity(clock):
+    bucket = TokenBucket(rate=1.0, capacity=2, tokens=0)
+    clock.now = 100.0
+    bucket.acquire(2)
+    assert clock.now == 100.0
+    bucket.acquire()
+    assert clock.now == pytest.approx(101.0)
+
+
+@pytest.mark.parametrize("limit, burst", [(60, 10), (60, 0), (60, 60), (1000, 500), (1, 1)])
+def test_per_minute_bucket_never_exceeds_limit_from_cold(clock, limit, burst):
+    bucket = per_minute_bucket(limit, burst)
+    times = []
+    for _ in range(3 * limit):
+        bucket.acquire()
+        times.append(clock.now)
+    for i, start in enumerate(times):
+        in_window = sum(1 for t in times[i:] if t < start + 60.0 - 1e-9)
+        assert in_window <= limit
+    # The quota is still usable: a full minute's worth goes through in about a minute.
+    assert times[limit - 1] <= 60.001
@@ -0,0 +1,121 @@
+# workers.py
+"""
+Keeps slow work off import and off the request threads.
+
+once() wraps a builder so it runs the first time its value is needed, which
+keeps importing the API modules cheap. FlightPool runs jobs on a bounded
+thread pool and coalesces them by key: while a job is running, everyone who
+asks for the same key follows that job's Flight instead of starting another.
+"""
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import Counter, log
+
+FLIGHTS = Counter("backend_flights_total", "FlightPool submissions by pool and result (started/joined/rejected).",
+                  ["pool", "result"])
+
+
+def once(build):
+    """Calls `build()` on first use only; every later call returns the same value."""
+    lock = threading.Lock()
+    box = []
+
+    @functools.wraps(build)
+    def get():
+        if not box:
+            with lock:
+                if not box:
+                    box.append(build())
+        return box[0]
+
+    get.built = lambda: bool(box)
+    return get
+
+
+class Busy(Exception):
+    """Raised by FlightPool.submit when too many jobs are already queued or running."""
+
+
+class Flight:
+    """One running job: the (event, data) pairs it has produced so far, shared by everyone following it."""
+
+    def __init__(self, key):
+        self.key = key
+        self.events = []
+        self.done = False
+        self._cond = threading.Condition()
+
+    def publish(self, event):
+        with self._cond:
+            self.events.append(event)
+            self._cond.notify_all()
+
+    def finish(self):
+        with self._cond:
+            self.done = True
+            self._cond.notify_all()
+
+    def wait(self, timeout=None):
+        """Blocks until the job finishes or `timeout` seconds pass; returns whether it finished."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.done, timeout)
+
+    def follow(self):
+        """Yields every event from the first one on, waiting for new ones until the job finishes."""
+        seen = 0
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: len(self.events) > seen or self.done)
+                events, done = self.events[seen:], self.done
+            seen += len(events)
+            yield from events
+            if done:
+                return
+
+
+class FlightPool:
+    def __init__(self, name, max_workers=8, max_queued=64):
+        self.name = name
+        self.max_queued = max_queued
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._flights)
+
+    def submit(self, key, job):
+        """
+        Runs `job()`, a generator of (event, data) pairs, on the pool and
+        returns its Flight. While a job for `key` is queued or running, its
+        Flight is returned instead. Raises Busy when `max_queued` jobs are.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                FLIGHTS.inc(pool=self.name, result="joined")
+                return flight
+            if len(self._flights) >= self.max_queued:
+                FLIGHTS.inc(pool=self.name, result="rejected")
+                raise Busy(f"{len(self._flights)} {self.name} jobs already in progress")
+            flight = self._flights[key] = Flight(key)
+        FLIGHTS.inc(pool=self.name, result="started")
+        self._pool.submit(self._run, flight, job)
+        return flight
+
+    def _run(self, flight, job):
+        try:
+            for event in job():
+                flight.publish(event)
+        except Exception as e:
+            log("ERROR", "%s job for %s failed: %s", self.name, flight.key, e)
+            flight.publish(("error", {"error": str(e), "status": 500}))
+        finally:
+            with self._lock:
+                self._flights.pop(flight.key, None)
+            flight.finish()
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
@@ -13,78 +13,23 @@ function KnowledgeGraph() {
   useEffect(() => {
     let mounted = true;
 
-    // TEST DATA - Remove this and uncomment fetch below when backend is ready
-    const testData = [
-      {
-        id: 1,
-        title: "Microgravity Effects on Mouse Bone Structure",
-        authors: "Smith et al.",
-        year: "2013",
-        keywords: "microgravity, bone loss, osteocytes, spaceflight, mice"
-      },
-      {
-        id: 2,
-        title: "Cardiovascular Adaptation in Space Missions",
-        authors: "Johnson et al.",
-        year: "2014",
-        keywords: "cardiovascular, microgravity, adaptation, heart, spaceflight"
-      },
-      {
-        id: 3,
-        title: "Immune System Response to Microgravity",
-        authors: "Williams et al.",
-        year: "2013",
-        keywords: "immune system, microgravity, t-cells, spaceflight, health"
-      },
-      {
-        id: 4,
-        title: "Muscle Atrophy During Extended Spaceflight",
-        authors: "Brown et al.",
-        year: "2014",
-        keywords: "muscle atrophy, microgravity, spaceflight, exercise, countermeasures"
-      },
-      {
-        id: 5,
-        title: "Regenerative Medicine Applications in Microgravity",
-        authors: "Davis et al.",
-        year: "2024",
-        keywords: "regenerative medicine, stem cells, microgravity, cardiomyocytes, therapy"
-      },
-      {
-        id: 6,
-        title: "Cancer Cell Behavior in Microgravity Environment",
-        authors: "Martinez et al.",
-        year: "2024",
-        keywords: "cancer, microgravity, spheroids, oncology, research"
-      }
-    ];
-
-    // Small delay to ensure DOM is ready
-    setTimeout(() => {
-      if (mounted && containerRef.current) {
-        initializeCytoscape(testData);
-        setLoading(false);
-      }
-    }, 100);
-
-    // REAL BACKEND FETCH - Uncomment this when your backend is ready
-    /*
-    fetch('http://localhost:5000/data')
+    // The backend precomputes the graph (publication, year and keyword nodes
+    // plus similarity edges), so the elements can be rendered as they are.
+    fetch('http://localhost:5000/graph')
       .then(response => response.json())
-      .then(data => {
+      .then(elements => {
         if (mounted && containerRef.current) {
-          initializeCytoscape(data);
+          initializeCytoscape(elements);
         }
         setLoading(false);
       })
       .catch(err => {
-        console.error('Error fetching data:', err);
+        console.error('Error fetching graph:', err);
         if (mounted) {
           setError('Failed to load publications data');
           setLoading(false);
         }
       });
-    */
 
     // Cleanup
     return () => {
@@ -100,7 +45,7 @@ function KnowledgeGraph() {
     };
   }, []);
 
-  const initializeCytoscape = (publications) => {
+  const initializeCytoscape = (elements) => {
     // Destroy existing instance if it exists
     if (cyRef.current) {
       try {
@@ -117,8 +62,6 @@ function KnowledgeGraph() {
       return;
     }
 
-    const elements = buildGraphElements(publications);
-
     try {
       cyRef.current = cytoscape({
       container: containerRef.current,
@@ -181,6 +124,15 @@ function KnowledgeGraph() {
             'opacity': 0.6
           }
         },
+        {
+          selector: 'edge[type="similar"]',
+          style: {
+            'width': 'mapData(weight, 0, 1, 1, 6)',
+            'line-color': '#4CAF50',
+            'target-arrow-shape': 'none',
+            'opacity': 0.5
+          }
+        },
         {
           selector: 'node:selected',
           style: {
@@ -215,103 +167,6 @@ function KnowledgeGraph() {
     }
   };
 
-  const buildGraphElements = (publications) => {
-    const elements = [];
-    const yearNodes = new Set();
-    const keywordNodes = new Map();
-    const maxKeywordsPerPub = 5;
-
-    // First pass: collect all years and keywords
-    publications.forEach(pub => {
-      if (pub.year && pub.year !== 'Unknown') {
-        yearNodes.add(pub.year);
-      }
-      
-      if (pub.keywords) {
-        const keywords = pub.keywords.split(',').map(k => k.trim().toLowerCase());
-        keywords.forEach(kw => {
-          if (kw && kw.length > 3) {
-            keywordNodes.set(kw, (keywordNodes.get(kw) || 0) + 1);
-          }
-        });
-      }
-    });
-
-    // Get top keywords by frequency
-    const topKeywords = Array.from(keywordNodes.entries())
-      .sort((a, b) => b[1] - a[1])
-      .slice(0, 20)
-      .map(([kw]) => kw);
-
-    // Add year nodes
-    yearNodes.forEach(year => {
-      elements.push({
-        data: {
-          id: `year-${year}`,
-          label: year,
-          type: 'year'
-        }
-      });
-    });
-
-    // Add keyword nodes
-    topKeywords.forEach(keyword => {
-      elements.push({
-        data: {
-          id: `keyword-${keyword}`,
-          label: keyword,
-          type: 'keyword'
-        }
-      });
-    });
-
-    // Add publication nodes and edges
-    publications.forEach((pub, index) => {
-      const pubId = `pub-${index}`;
-      
-      // Add publication node
-      elements.push({
-        data: {
-          id: pubId,
-          label: pub.title.substring(0, 30) + '...',
-          type: 'publication',
-          publication: pub
-        }
-      });
-
-      // Connect to year
-      if (pub.year && pub.year !== 'Unknown' && yearNodes.has(pub.year)) {
-        elements.push({
-          data: {
-            id: `edge-${pubId}-year-${pub.year}`,
-            source: pubId,
-            target: `year-${pub.year}`
-          }
-        });
-      }
-
-      // Connect to keywords
-      if (pub.keywords) {
-        const keywords = pub.keywords.split(',')
-          .map(k => k.trim().toLowerCase())
-          .filter(k => topKeywords.includes(k))
-          .slice(0, maxKeywordsPerPub);
-
-        keywords.forEach(keyword => {
-          elements.push({
-            data: {
-              id: `edge-${pubId}-keyword-${keyword}`,
-              source: pubId,
-              target: `keyword-${keyword}`
-            }
-          });
-        });
-      }
-    });
-
-    return elements;
-  };
-
   const handleReset = () => {
     if (cyRef.current) {
       cyRef.current.fit();
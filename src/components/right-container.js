@@ -80,6 +80,49 @@ function RightContainer(){
     const [summary, setSummary] = useState('');
     const [loading, setLoading] = useState(false);
 
+    // Reads the Server-Sent Events from /summarize and shows the summary as it is generated.
+    const readSummaryStream = async (res) => {
+        const reader = res.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let text = '';
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) {
+                break;
+            }
+            buffer += decoder.decode(value, { stream: true });
+            const events = buffer.split('\n\n');
+            buffer = events.pop();
+            for (const raw of events) {
+                let event = 'message';
+                let data = '';
+                for (const line of raw.split('\n')) {
+                    if (line.startsWith('event: ')) {
+                        event = line.slice(7);
+                    }
+                    else if (line.startsWith('data: ')) {
+                        data += line.slice(6);
+                    }
+                }
+                const payload = data ? JSON.parse(data) : {};
+                if (event === 'progress') {
+                    setSummary(payload.stage === 'summarizing' ? 'Summarizing...' : 'Fetching article...');
+                }
+                else if (event === 'chunk') {
+                    text += payload.text;
+                    setSummary(text);
+                }
+                else if (event === 'done') {
+                    setSummary(payload.summary);
+                }
+                else if (event === 'error') {
+                    throw new Error(payload.error);
+                }
+            }
+        }
+    };
+
     const handleSendToBackend = async (publicationTitle) => {
         setLoading(true);
         setSummary('');
@@ -88,6 +131,7 @@ function RightContainer(){
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
+                    'Accept': 'text/event-stream',
                 },
                 body: JSON.stringify({ title: publicationTitle}),
             });
@@ -96,8 +140,13 @@ function RightContainer(){
                 throw new Error(`HTTP Error! Status: ${res.status}`);
             }
 
-            const response = await res.json();
-            setSummary(response.summary)
+            if (res.body && (res.headers.get('Content-Type') || '').startsWith('text/event-stream')) {
+                await readSummaryStream(res);
+            }
+            else {
+                const response = await res.json();
+                setSummary(response.summary)
+            }
         }
         catch (error) {
             setSummary('Error: Could not connect to backend');